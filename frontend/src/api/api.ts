@@ -38,6 +38,33 @@ export interface LeaderboardDetail {
   >;
 }
 
+// Live scoreboard (/api/leaderboard/live) events, one per (leaderboard, GPU)
+export interface LiveRankingEntry {
+  user_id: string;
+  user_name: string;
+  score: number;
+  submission_id: number;
+  submission_time: string | null;
+  file_name: string;
+  submission_count: number;
+  rank: number;
+}
+
+export interface LiveScoreboardSnapshot {
+  leaderboard_id: number;
+  gpu_type: string;
+  ranking: LiveRankingEntry[];
+}
+
+export interface LiveRankingDiff {
+  leaderboard_id: number;
+  gpu_type: string;
+  total: number;
+  reset: boolean;
+  upserts: LiveRankingEntry[];
+  removed: string[];
+}
+
 export interface CodesResponse {
   results: Array<{
     submission_id: number;
@@ -461,6 +488,7 @@ export async function submitCode(
 
 export interface SubmissionStatusResponse {
   submission_id: number;
+  leaderboard_id?: number;
   status: string | null;
   submission_done: boolean;
   file_name?: string | null;
@@ -483,18 +511,15 @@ export async function fetchSubmissionStatus(
   leaderboardId: number | string,
   submissionId: number
 ): Promise<SubmissionStatusResponse | null> {
-  const res = await fetch(
-    `/api/submissions?leaderboard_id=${leaderboardId}&offset=0&limit=100`
-  );
+  // Reports are only rendered once the submission is done.
+  const res = await fetch(`/api/submissions/${submissionId}?report=done`);
+  if (res.status === 404) return null;
   if (!res.ok) {
     const json = await res.json();
     const message = json?.message || "Unknown error";
     throw new APIError(`Failed to fetch submission status: ${message}`, res.status);
   }
   const r = await res.json();
-  const items = r.data?.items || [];
-  const submission = items.find(
-    (item: SubmissionStatusResponse) => item.submission_id === submissionId
-  );
-  return submission || null;
+  const submission: SubmissionStatusResponse = r.data;
+  return submission.leaderboard_id === Number(leaderboardId) ? submission : null;
 }
@@ -79,6 +79,7 @@ export default function LeaderboardEditor() {
   const [editorStatus, setEditorStatus] = useState<SubmitStatus>({ kind: "idle" });
   const editorPollingRef = useRef<ReturnType<typeof setInterval> | null>(null);
   const editorTimeoutRef = useRef<ReturnType<typeof setTimeout> | null>(null);
+  const editorEventsRef = useRef<EventSource | null>(null);
   const fileInputRef = useRef<HTMLInputElement | null>(null);
 
   // Polling timeout (15 minutes)
@@ -159,6 +160,10 @@ export default function LeaderboardEditor() {
       clearTimeout(editorTimeoutRef.current);
       editorTimeoutRef.current = null;
     }
+    if (editorEventsRef.current) {
+      editorEventsRef.current.close();
+      editorEventsRef.current = null;
+    }
   }, []);
 
   const startEditorPolling = useCallback(
@@ -192,7 +197,17 @@ export default function LeaderboardEditor() {
       }, POLLING_TIMEOUT_MS);
 
       poll();
-      editorPollingRef.current = setInterval(poll, 5000);
+      if (typeof EventSource !== "undefined") {
+        // Refresh only when the server reports a change; EventSource
+        // reconnects by itself when the stream is closed.
+        const events = new EventSource(`/api/submissions/${submissionId}/events`);
+        for (const name of ["status", "runs", "done"]) {
+          events.addEventListener(name, poll);
+        }
+        editorEventsRef.current = events;
+      } else {
+        editorPollingRef.current = setInterval(poll, 5000);
+      }
     },
     [stopEditorPolling, id, POLLING_TIMEOUT_MS]
     );
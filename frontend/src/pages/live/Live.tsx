@@ -1,4 +1,4 @@
-import { useEffect, useState, useRef, useCallback } from "react";
+import { useEffect, useState, useCallback } from "react";
 import { useSearchParams } from "react-router-dom";
 import {
   Box,
@@ -16,6 +16,9 @@ import {
   fetchLeaderboardSummaries,
   type LeaderboardDetail,
   type LeaderboardSummary,
+  type LiveRankingDiff,
+  type LiveRankingEntry,
+  type LiveScoreboardSnapshot,
 } from "../../api/api";
 import { formatMicroseconds } from "../../lib/utils/ranking";
 import { getMedalIcon } from "../../components/common/medal";
@@ -26,6 +29,56 @@ const REFRESH_INTERVAL_MS = 30_000;
 interface LeaderboardData {
   id: number;
   detail: LeaderboardDetail;
+  fetchedAt: number;
+}
+
+type ColumnItem = Pick<
+  LeaderboardDetail["rankings"][string][number],
+  "rank" | "score" | "user_name" | "submission_id"
+>;
+
+// Rankings pushed by the live stream, keyed by `${leaderboardId}:${gpuType}`
+type LiveRankings = Record<
+  string,
+  { entries: LiveRankingEntry[]; receivedAt: number }
+>;
+
+function liveKey(leaderboardId: number, gpuType: string): string {
+  return `${leaderboardId}:${gpuType}`;
+}
+
+function sortByRank(entries: LiveRankingEntry[]): LiveRankingEntry[] {
+  return [...entries].sort((a, b) => a.rank - b.rank);
+}
+
+// Apply a `ranking` diff; undefined when a partial diff has nothing to apply
+// to (the next snapshot or refresh fills it in).
+function applyRankingDiff(
+  current: LiveRankingEntry[] | undefined,
+  diff: LiveRankingDiff,
+): LiveRankingEntry[] | undefined {
+  if (diff.reset) return sortByRank(diff.upserts);
+  if (!current) return undefined;
+  const byUser = new Map(current.map((e) => [e.user_id, e]));
+  diff.removed.forEach((userId) => byUser.delete(userId));
+  diff.upserts.forEach((e) => byUser.set(e.user_id, e));
+  return sortByRank([...byUser.values()]);
+}
+
+// The fetched rankings, with every GPU the live stream has pushed since the
+// fetch replaced by the pushed ranking.
+function mergeLiveRankings(
+  { id, detail, fetchedAt }: LeaderboardData,
+  live: LiveRankings,
+): Record<string, ColumnItem[]> {
+  const rankings: Record<string, ColumnItem[]> = { ...detail.rankings };
+  for (const [key, { entries, receivedAt }] of Object.entries(live)) {
+    const sep = key.indexOf(":");
+    const gpu = key.slice(sep + 1);
+    if (Number(key.slice(0, sep)) !== id) continue;
+    if (receivedAt >= fetchedAt || !(gpu in rankings)) rankings[gpu] = entries;
+  }
+  return rankings;
 }
 
 export default function Live() {
@@ -35,7 +88,7 @@ export default function Live() {
   const [boards, setBoards] = useState<LeaderboardData[]>([]);
   const [loading, setLoading] = useState(false);
   const [lastRefresh, setLastRefresh] = useState<Date | null>(null);
-  const intervalRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const [live, setLive] = useState<LiveRankings>({});
 
   // Parse selected IDs from URL
   const idsParam = searchParams.get("ids") || "";
@@ -75,7 +128,7 @@ export default function Live() {
       const results = await Promise.all(
         ids.map(async (id) => {
           const detail = await fetchLeaderBoard(String(id));
-          return { id, detail };
+          return { id, detail, fetchedAt: Date.now() };
         }),
       );
       setBoards(results);
@@ -92,14 +145,56 @@ export default function Live() {
     fetchAll();
   }, [fetchAll]);
 
-  // Auto-refresh
+  // Auto-refresh: apply the rankings the server pushes (a snapshot on
+  // connect, then diffs) without refetching. Poll on a timer only while the
+  // stream is down, or if the browser has no EventSource.
   useEffect(() => {
+    setLive({});
     if (selectedIds.length === 0) return;
-    intervalRef.current = setInterval(fetchAll, REFRESH_INTERVAL_MS);
+
+    let timer: ReturnType<typeof setInterval> | null = null;
+    const startPolling = () => {
+      if (timer === null) timer = setInterval(fetchAll, REFRESH_INTERVAL_MS);
+    };
+    const stopPolling = () => {
+      if (timer !== null) clearInterval(timer);
+      timer = null;
+    };
+    if (typeof EventSource === "undefined") {
+      startPolling();
+      return stopPolling;
+    }
+
+    const events = new EventSource(`/api/leaderboard/live?ids=${idsParam}`);
+    events.addEventListener("open", stopPolling);
+    events.addEventListener("error", startPolling);
+    events.addEventListener("snapshot", (e) => {
+      const snapshot: LiveScoreboardSnapshot = JSON.parse(
+        (e as MessageEvent).data,
+      );
+      const key = liveKey(snapshot.leaderboard_id, snapshot.gpu_type);
+      setLive((prev) => ({
+        ...prev,
+        [key]: { entries: sortByRank(snapshot.ranking), receivedAt: Date.now() },
+      }));
+      setLastRefresh(new Date());
+    });
+    events.addEventListener("ranking", (e) => {
+      const diff: LiveRankingDiff = JSON.parse((e as MessageEvent).data);
+      const key = liveKey(diff.leaderboard_id, diff.gpu_type);
+      setLive((prev) => {
+        const next = applyRankingDiff(prev[key]?.entries, diff);
+        return next
+          ? { ...prev, [key]: { entries: next, receivedAt: Date.now() } }
+          : prev;
+      });
+      setLastRefresh(new Date());
+    });
     return () => {
-      if (intervalRef.current) clearInterval(intervalRef.current);
+      events.close();
+      stopPolling();
     };
-  }, [fetchAll, selectedIds.length]);
+  }, [fetchAll, idsParam, selectedIds.length]);
 
   const handleSelectionChange = (
     _: unknown,
@@ -142,7 +237,11 @@ export default function Live() {
         )}
         {selectedIds.length > 0 && (
           <Chip
-            label={`Auto-refresh ${REFRESH_INTERVAL_MS / 1000}s`}
+            label={
+              typeof EventSource !== "undefined"
+                ? "Live"
+                : `Auto-refresh ${REFRESH_INTERVAL_MS / 1000}s`
+            }
             size="small"
             color="success"
             variant="outlined"
@@ -190,8 +289,13 @@ export default function Live() {
             overflow: "auto",
           }}
         >
-          {boards.map(({ id, detail }) => (
-            <LeaderboardColumn key={id} id={id} detail={detail} />
+          {boards.map((board) => (
+            <LeaderboardColumn
+              key={board.id}
+              id={board.id}
+              name={board.detail.name}
+              rankings={mergeLiveRankings(board, live)}
+            />
           ))}
         </Box>
       )}
@@ -207,13 +311,15 @@ export default function Live() {
 
 function LeaderboardColumn({
   id,
-  detail,
+  name,
+  rankings,
 }: {
   id: number;
-  detail: LeaderboardDetail;
+  name: string;
+  rankings: Record<string, ColumnItem[]>;
 }) {
   // Show the priority GPU type rankings (first one), or all if only one
-  const gpuTypes = Object.keys(detail.rankings);
+  const gpuTypes = Object.keys(rankings);
 
   return (
     <Box
@@ -234,18 +340,18 @@ function LeaderboardColumn({
           overflow: "hidden",
           textOverflow: "ellipsis",
         }}
-        title={detail.name}
+        title={name}
       >
         <a
           href={`/leaderboard/${id}`}
           style={{ color: "inherit", textDecoration: "none" }}
         >
-          {detail.name}
+          {name}
         </a>
       </Typography>
 
       {gpuTypes.map((gpu) => {
-        const items = detail.rankings[gpu] || [];
+        const items = rankings[gpu] || [];
         return (
           <Box key={gpu} sx={{ mb: 1.5 }}>
             {gpuTypes.length > 1 && (
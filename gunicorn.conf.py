@@ -7,9 +7,20 @@ bind = f"0.0.0.0:{PORT}"
 backlog = 2048
 
 # Worker processes
+#
+# GUNICORN_WORKER_CLASS selects the concurrency model:
+# - "gthread" (default): each worker serves GUNICORN_THREADS requests at once,
+#   so slow submission forwards and SSE streams only tie up one thread.
+#   Keep DB_POOL_MAX_SIZE >= GUNICORN_THREADS.
+# - "gevent": greenlets, up to GUNICORN_WORKER_CONNECTIONS per worker.
+#   Requires `pip install gevent`; psycopg2 is made cooperative in post_fork.
+# - "sync": one request per worker (the previous behaviour). SSE streams are
+#   then capped to a couple of seconds (see kernelboard/lib/sse.py).
 workers = int(os.getenv("WEB_CONCURRENCY", 2))
-worker_class = "sync"
-worker_connections = 100
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+# gunicorn silently turns "sync" into "gthread" when threads > 1
+threads = int(os.getenv("GUNICORN_THREADS", 8)) if worker_class == "gthread" else 1
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100))
 timeout = 30
 keepalive = 2
 
@@ -20,3 +31,15 @@ loglevel = "info"
 
 # Process naming
 proc_name = "kernelboard"
+
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        # gunicorn's gevent worker monkey-patches the stdlib (sockets,
+        # threading) itself, which covers redis-py and the connection pool's
+        # locks. psycopg2 talks to the server from C, so it needs a wait
+        # callback that yields to the gevent hub instead.
+        from kernelboard.lib.db_gevent import make_psycopg2_green
+
+        make_psycopg2_green()
+        server.log.info("worker %s: psycopg2 patched for gevent", worker.pid)
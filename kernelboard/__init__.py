@@ -1,29 +1,42 @@
+"""
+Kernelboard web app.
+
+The app and everything it pulls in (Flask extensions, blueprints, CLI
+groups) are imported inside create_app, so importing a kernelboard
+submodule, e.g. kernelboard.lib.http_client from ranking_worker.py, does
+not load the app.
+"""
+
 import http
 import os
 
-from dotenv import load_dotenv
-from flask import Flask, make_response, redirect, send_from_directory
-from flask_login import LoginManager
-from flask_session import Session
-from flask_talisman import Talisman
-from werkzeug.middleware.proxy_fix import ProxyFix
-
-from kernelboard import color, health
-from kernelboard import error as error
-from kernelboard import index as index
-from kernelboard import leaderboard as leaderboard
-from kernelboard import news as news
-from kernelboard.api import create_api_blueprint
-from kernelboard.api.auth import User, providers
-from kernelboard.lib import db, env, score, time
-from kernelboard.lib.logging import configure_logging
-from kernelboard.lib.rate_limiter import limiter
-from kernelboard.lib.redis_connection import get_redis_connection
-from kernelboard.lib.status_code import http_error
-from kernelboard.og_tags import get_og_tags_for_path, inject_og_tags, is_social_crawler
-
 
 def create_app(test_config=None):
+    from dotenv import load_dotenv
+    from flask import Flask, make_response, redirect, send_from_directory
+    from flask_login import LoginManager
+    from flask_session import Session
+    from flask_talisman import Talisman
+    from werkzeug.middleware.proxy_fix import ProxyFix
+
+    from kernelboard import color, health
+    from kernelboard import error as error
+    from kernelboard import index as index
+    from kernelboard import leaderboard as leaderboard
+    from kernelboard import news as news
+    from kernelboard.api import create_api_blueprint
+    from kernelboard.api.auth import User, providers
+    from kernelboard.lib import db, env, score, sse, time
+    from kernelboard.lib.cache_warmer import cache_cli
+    from kernelboard.lib.logging import configure_logging
+    from kernelboard.lib.participants import participants_cli
+    from kernelboard.lib.personal_best import personal_best_cli
+    from kernelboard.lib.rate_limiter import limiter
+    from kernelboard.lib.record_history import record_history_cli
+    from kernelboard.lib.redis_connection import get_redis_connection
+    from kernelboard.lib.status_code import http_error
+    from kernelboard.og_tags import get_og_tags_for_path, inject_og_tags, is_social_crawler
+
     # Check if we're in development mode:
     is_dev = os.getenv("FLASK_DEBUG") == "1"
     if is_dev:
@@ -45,7 +58,21 @@ def create_app(test_config=None):
     app.config.from_mapping(
         SECRET_KEY=os.getenv("SECRET_KEY"),
         DATABASE_URL=os.getenv("DATABASE_URL"),
+        # Per-process PostgreSQL connection pool (see kernelboard/lib/db_pool.py)
+        DB_POOL_MIN_SIZE=int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+        DB_POOL_MAX_SIZE=int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+        DB_POOL_TIMEOUT=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        DB_POOL_MAX_LIFETIME=float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+        DB_POOL_HEALTH_CHECK_INTERVAL=float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", 30)),
         REDIS_URL=os.getenv("REDIS_URL"),
+        # Server-Sent Events streams (see kernelboard/lib/sse.py).
+        # Streams end before gunicorn's worker timeout (much sooner under
+        # sync workers); clients reconnect.
+        SSE_MAX_DURATION=float(os.getenv("SSE_MAX_DURATION", sse.default_max_duration())),
+        SSE_KEEPALIVE=float(os.getenv("SSE_KEEPALIVE", 10)),
+        SUBMISSION_EVENTS_POLL_INTERVAL=float(os.getenv("SUBMISSION_EVENTS_POLL_INTERVAL", 1)),
+        # Live scoreboard watcher (see kernelboard/lib/scoreboard.py)
+        SCOREBOARD_POLL_INTERVAL=float(os.getenv("SCOREBOARD_POLL_INTERVAL", 2)),
         TALISMAN_FORCE_HTTPS=not is_dev,
         SESSION_COOKIE_SECURE=not is_dev,
         SESSION_COOKIE_HTTPONLY=True,
@@ -107,6 +134,10 @@ def create_app(test_config=None):
             raise
 
     db.init_app(app)
+    app.cli.add_command(personal_best_cli)
+    app.cli.add_command(cache_cli)
+    app.cli.add_command(record_history_cli)
+    app.cli.add_command(participants_cli)
 
 
     # Initialize rate limiter
@@ -18,6 +18,7 @@ from flask import (
 from flask_login import UserMixin, current_user, login_user, logout_user
 
 from kernelboard.lib.auth_utils import ensure_user_info_with_token, get_user_info_from_session
+from kernelboard.lib.http_client import get_http_client
 from kernelboard.lib.status_code import http_success
 
 auth_bp = Blueprint("auth", __name__)
@@ -232,7 +233,7 @@ def callback(provider: str):
         redirect_uri = url_for(
             "api.auth.callback", provider=provider, _external=True
         )
-        token_res = requests.post(
+        token_res = get_http_client().post(
             provider_data["token_url"],
             data={
                 "client_id": provider_data["client_id"],
@@ -270,7 +271,7 @@ def callback(provider: str):
         return redirect_with_error("token_error", "Access token missing")
 
     try:
-        me_res = requests.get(
+        me_res = get_http_client().get(
             provider_data["userinfo"]["url"],
             headers={
                 "Authorization": f"Bearer {access_token}",
@@ -1,88 +1,241 @@
+"""
+Discord scheduled events.
+
+The events list is cached in Redis (shared by every worker) as
+`{"events": [...], "fetched_at": <unix time>}`:
+- soft TTL (EVENTS_SOFT_TTL_SECONDS): after it, the next request starts a
+  background refresh, guarded by a Redis lock so only one worker calls
+  Discord. Requests never wait for Discord; they get the last good value.
+- hard TTL (EVENTS_HARD_TTL_SECONDS): the Redis key expiry, so a value is
+  never served if Discord has been unreachable for that long.
+
+A failed refresh keeps the last good value. Each process also keeps the
+last value it fetched in memory, served when Redis has none (unavailable,
+flushed or evicted); without Redis, refreshes run under a local lock.
+
+On a cold cache the worker that takes the refresh lock fetches from
+Discord within the request. Others answer with an empty list, the
+EVENTS_WARMING_MESSAGE message and a `Retry-After` header instead of
+waiting.
+"""
+
+import json
 import logging
 import os
+import threading
 import time
+import uuid
 from http import HTTPStatus
 
 import requests
 from flask import Blueprint
 
+from kernelboard.lib.http_client import get_http_client
+from kernelboard.lib.redis_connection import get_redis_connection
 from kernelboard.lib.status_code import http_error, http_success
 
 logger = logging.getLogger(__name__)
 
 events_bp = Blueprint("events_api", __name__, url_prefix="/events")
 
-# Simple in-memory cache
+EVENTS_CACHE_KEY = "discord_events"
+EVENTS_REFRESH_LOCK_KEY = "discord_events:refresh"
+EVENTS_SOFT_TTL_SECONDS = 300  # 5 minutes
+EVENTS_HARD_TTL_SECONDS = 24 * 3600
+# Longer than a refresh can take (10s timeout per attempt, with retries)
+EVENTS_REFRESH_LOCK_SECONDS = 60
+EVENTS_WARMING_MESSAGE = "Warming up"
+EVENTS_WARMING_RETRY_AFTER_SECONDS = 5
+
+# Per-process last good value, used when Redis has none
 _cache = {
     "data": None,
     "timestamp": 0,
 }
-CACHE_TTL_SECONDS = 300  # 5 minutes
+_local_refresh_lock = threading.Lock()
+
+
+def _get_discord_events() -> tuple[list | None, float | None]:
+    """
+    Return `(events, fetched_at)` from the cache, starting a background
+    refresh when the value is past its soft TTL. On a cold cache, fetch
+    from Discord now if no other worker is already doing so; otherwise
+    return `(None, None)` ("warming"). `fetched_at` is None when the
+    events were not fetched from Discord.
+    """
+    if not os.environ.get("DISCORD_BOT_TOKEN") or not os.environ.get("DISCORD_GUILD_ID"):
+        logger.warning("Discord credentials not configured")
+        return [], None
+
+    redis_conn = _get_redis()
+    entry = _read_cached_events(redis_conn) or _read_local_events()
 
+    if entry is None:
+        _schedule_refresh(redis_conn, wait=True)
+        entry = _read_local_events()
+        if entry is None:
+            return None, None
+    elif time.time() - entry["fetched_at"] >= EVENTS_SOFT_TTL_SECONDS:
+        _schedule_refresh(redis_conn)
 
-def _get_discord_events():
-    """Fetch scheduled events from Discord API with caching."""
-    now = time.time()
+    return entry["events"], entry["fetched_at"]
 
-    # Return cached data if still valid
-    if _cache["data"] is not None and (now - _cache["timestamp"]) < CACHE_TTL_SECONDS:
-        logger.info("Returning cached Discord events")
-        return _cache["data"]
 
+def _read_local_events() -> dict | None:
+    """This process's last fetched events, unless past the hard TTL."""
+    if _cache["data"] is None or time.time() - _cache["timestamp"] >= EVENTS_HARD_TTL_SECONDS:
+        return None
+    return {"events": _cache["data"], "fetched_at": _cache["timestamp"]}
+
+
+def _fetch_discord_events() -> list:
+    """Fetch scheduled events from the Discord API. Raises on failure."""
     bot_token = os.environ.get("DISCORD_BOT_TOKEN")
     guild_id = os.environ.get("DISCORD_GUILD_ID")
 
-    if not bot_token or not guild_id:
-        logger.warning("Discord credentials not configured")
-        return []
-
+    url = f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events"
+    headers = {
+        "Authorization": f"Bot {bot_token}",
+    }
+
+    response = get_http_client().get(url, headers=headers, timeout=10)
+    response.raise_for_status()
+
+    events = response.json()
+
+    # Transform to our API format
+    result = []
+    for event in events:
+        result.append({
+            "id": event.get("id"),
+            "name": event.get("name"),
+            "description": event.get("description", ""),
+            "scheduled_start_time": event.get("scheduled_start_time"),
+            "scheduled_end_time": event.get("scheduled_end_time"),
+            "event_url": f"https://discord.com/events/{guild_id}/{event.get('id')}",
+        })
+
+    # Sort by start time (soonest first)
+    result.sort(key=lambda x: x.get("scheduled_start_time", ""))
+    return result
+
+
+def _schedule_refresh(redis_conn, wait: bool = False):
+    """
+    Start a background refresh unless another one holds the lock. With
+    `wait`, run it in the calling thread instead.
+    """
+    token = uuid.uuid4().hex
+    if redis_conn is not None:
+        try:
+            acquired = bool(
+                redis_conn.set(EVENTS_REFRESH_LOCK_KEY, token, nx=True, ex=EVENTS_REFRESH_LOCK_SECONDS)
+            )
+        except Exception:
+            logger.warning("Redis events lock failed", exc_info=True)
+            redis_conn = None
+    if redis_conn is None:
+        acquired = _local_refresh_lock.acquire(blocking=False)
+        token = None
+    if not acquired:
+        return
+    if wait:
+        _refresh_events(redis_conn, token)
+        return
+
+    threading.Thread(
+        target=_refresh_events, args=(redis_conn, token), name="discord-events-refresh", daemon=True
+    ).start()
+
+
+def _refresh_events(redis_conn, token: str | None):
+    """Fetch events and store them; on failure the last good value stays."""
+    start = time.perf_counter()
     try:
-        url = f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events"
-        headers = {
-            "Authorization": f"Bot {bot_token}",
-        }
-
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        events = response.json()
-
-        # Transform to our API format
-        result = []
-        for event in events:
-            result.append({
-                "id": event.get("id"),
-                "name": event.get("name"),
-                "description": event.get("description", ""),
-                "scheduled_start_time": event.get("scheduled_start_time"),
-                "scheduled_end_time": event.get("scheduled_end_time"),
-                "event_url": f"https://discord.com/events/{guild_id}/{event.get('id')}",
-            })
-
-        # Sort by start time (soonest first)
-        result.sort(key=lambda x: x.get("scheduled_start_time", ""))
-
-        # Update cache
-        _cache["data"] = result
-        _cache["timestamp"] = now
-
-        logger.info(f"Fetched {len(result)} Discord events")
-        return result
-
+        events = _fetch_discord_events()
+        fetched_at = time.time()
+        _cache["data"] = events
+        _cache["timestamp"] = fetched_at
+        _write_cached_events(redis_conn, events, fetched_at)
+        logger.info(
+            "[Perf] discord events refresh | events=%d | took %.2fms",
+            len(events),
+            (time.perf_counter() - start) * 1000,
+        )
     except requests.RequestException as e:
         logger.error(f"Failed to fetch Discord events: {e}")
-        # Return cached data if available, even if stale
-        if _cache["data"] is not None:
-            return _cache["data"]
-        return []
+    except Exception:
+        logger.exception("Discord events refresh failed")
+    finally:
+        _release_refresh_lock(redis_conn, token)
+
+
+def _release_refresh_lock(redis_conn, token: str | None):
+    if token is None:
+        _local_refresh_lock.release()
+        return
+    try:
+        holder = redis_conn.get(EVENTS_REFRESH_LOCK_KEY)
+        if holder is not None and holder.decode("utf-8") == token:
+            redis_conn.delete(EVENTS_REFRESH_LOCK_KEY)
+    except Exception:
+        logger.warning("Redis events lock release failed", exc_info=True)
+
+
+# =============================================================================
+# Redis Cache Helpers
+# =============================================================================
+
+
+def _get_redis():
+    """Get Redis connection (singleton)."""
+    cert_reqs = os.getenv("REDIS_SSL_CERT_REQS")
+    return get_redis_connection(cert_reqs=cert_reqs)
+
+
+def _read_cached_events(redis_conn) -> dict | None:
+    if not redis_conn:
+        return None
+    try:
+        value = redis_conn.get(EVENTS_CACHE_KEY)
+        return json.loads(value) if value else None
+    except Exception:
+        logger.warning("Redis events cache read failed", exc_info=True)
+        return None
+
+
+def _write_cached_events(redis_conn, events: list, fetched_at: float):
+    if not redis_conn:
+        return
+    try:
+        redis_conn.set(
+            EVENTS_CACHE_KEY,
+            json.dumps({"events": events, "fetched_at": fetched_at}),
+            ex=EVENTS_HARD_TTL_SECONDS,
+        )
+    except Exception:
+        logger.warning("Redis events cache write failed", exc_info=True)
 
 
 @events_bp.route("", methods=["GET"])
 def list_events():
-    """Return upcoming Discord scheduled events."""
+    """
+    Return upcoming Discord scheduled events. The `Age` header is the
+    number of seconds since they were fetched from Discord.
+
+    While another worker fills a cold cache, answer with no events, the
+    EVENTS_WARMING_MESSAGE message and a `Retry-After` header.
+    """
     try:
-        events = _get_discord_events()
-        return http_success(data=events)
+        events, fetched_at = _get_discord_events()
+        if events is None:
+            response, status = http_success(data=[], message=EVENTS_WARMING_MESSAGE)
+            response.headers["Retry-After"] = str(EVENTS_WARMING_RETRY_AFTER_SECONDS)
+            return response, status
+        response, status = http_success(data=events)
+        if fetched_at is not None:
+            response.headers["Age"] = str(max(0, int(time.time() - fetched_at)))
+        return response, status
     except Exception as e:
         logger.error(f"Error fetching events: {e}")
         return http_error(
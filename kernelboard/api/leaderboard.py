@@ -1,12 +1,20 @@
+import hashlib
 import logging
+import os
+import queue
 import time
+from datetime import datetime, timezone
 from http import HTTPStatus
 from typing import Any, List
 
-from flask import Blueprint
+from flask import Blueprint, current_app, request
 
+from kernelboard.lib import participants
 from kernelboard.lib.db import get_db_connection
-from kernelboard.lib.status_code import http_error, http_success
+from kernelboard.lib.redis_connection import get_redis_connection
+from kernelboard.lib.scoreboard import get_scoreboard_hub
+from kernelboard.lib.sse import KEEPALIVE_COMMENT, format_sse, sse_response
+from kernelboard.lib.status_code import check_not_modified, http_error, http_success, http_success_json
 from kernelboard.lib.time import to_time_left
 
 logger = logging.getLogger(__name__)
@@ -15,17 +23,82 @@ leaderboard_bp = Blueprint(
     "leaderboard_bp", __name__, url_prefix="/leaderboard"
 )
 
+# Redis caches for detail and fastest_trend payloads, keyed by leaderboard id
+# + version token. Old versions are never read again and simply expire.
+DETAIL_CACHE_KEY_PREFIX = "lb_detail:"
+DETAIL_CACHE_TTL_SECONDS = 600
+FASTEST_TREND_CACHE_KEY_PREFIX = "lb_fastest_trend:"
+FASTEST_TREND_CACHE_TTL_SECONDS = 600
+
+# Browser/CDN cache lifetime for the metadata endpoint.
+METADATA_MAX_AGE_SECONDS = 3600
+
+# Upper bound on the page size of the rankings endpoint.
+RANKINGS_MAX_LIMIT = 1000
+
+# Upper bound on the number of leaderboards watched by one live stream.
+LIVE_MAX_LEADERBOARDS = 20
+
+# Points per series returned by the user/custom trend endpoints; longer
+# series are downsampled (see _downsampled_trend_sql).
+TREND_DEFAULT_MAX_POINTS = 1000
+TREND_MAX_POINTS = 5000
+
+# `bucket` query parameter units, in seconds.
+_BUCKET_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
 
 @leaderboard_bp.route("/<int:leaderboard_id>", methods=["GET"])
 def leaderboard(leaderboard_id: int):
     total_start = time.perf_counter()
 
-    # 1. Database connection
+    # 1. Database & Redis connection
     db_conn_start = time.perf_counter()
     conn = get_db_connection()
+    redis_conn = _get_redis()
     db_conn_time = (time.perf_counter() - db_conn_start) * 1000
 
-    # 2. Query execution
+    # 2. Cheap version probe; serve the cached payload if nothing changed
+    version_start = time.perf_counter()
+    version = _get_leaderboard_version(conn, leaderboard_id)
+    version_time = (time.perf_counter() - version_start) * 1000
+
+    if version is None:
+        return _leaderboard_not_found(leaderboard_id)
+
+    not_modified = check_not_modified(version)
+    if not_modified is not None:
+        return not_modified
+
+    payload, hit = get_leaderboard_detail_payload(conn, redis_conn, leaderboard_id, version)
+    if payload is None:
+        return _leaderboard_not_found(leaderboard_id)
+
+    logger.info(
+        "[Perf] leaderboard_id=%s cache=%s | "
+        "db_conn=%.2fms | version=%.2fms | total=%.2fms",
+        leaderboard_id,
+        "hit" if hit else "miss",
+        db_conn_time,
+        version_time,
+        (time.perf_counter() - total_start) * 1000,
+    )
+
+    return http_success_json(payload, etag=version)
+
+
+def get_leaderboard_detail_payload(conn, redis_conn, leaderboard_id: int, version: str) -> tuple[str | None, bool]:
+    """
+    Serialized detail payload for this version, from the cache or built and
+    cached. Returns `(payload, cache_hit)`; payload is None if the
+    leaderboard does not exist.
+    """
+    cache_key = f"{DETAIL_CACHE_KEY_PREFIX}{leaderboard_id}:{version}"
+    cached = _get_cached_payload(redis_conn, cache_key)
+    if cached is not None:
+        return cached, True
+
+    # Query execution
     query = _get_query()
     query_start = time.perf_counter()
     with conn.cursor() as cur:
@@ -34,56 +107,370 @@ def leaderboard(leaderboard_id: int):
     query_time = (time.perf_counter() - query_start) * 1000
 
     if is_result_invalid(result):
-        return http_error(
-            f"canonot find leaderboard with id {leaderboard_id}",
-            10000 + HTTPStatus.NOT_FOUND,
-            HTTPStatus.NOT_FOUND,
-        )
+        return None, False
 
     data = result[0]
 
-    # 3. Data transformation
+    # Data transformation
     transform_start = time.perf_counter()
     res = to_api_leaderboard_item(data)
+    payload = current_app.json.dumps(res)
     transform_time = (time.perf_counter() - transform_start) * 1000
 
-    total_time = (time.perf_counter() - total_start) * 1000
+    _set_cached_payload(redis_conn, cache_key, payload, DETAIL_CACHE_TTL_SECONDS)
 
-    # Log timing breakdown
     logger.info(
-        "[Perf] leaderboard_id=%s | "
-        "db_conn=%.2fms | query=%.2fms | transform=%.2fms | total=%.2fms",
+        "[Perf] leaderboard_id=%s build | query=%.2fms | transform=%.2fms",
         leaderboard_id,
-        db_conn_time,
         query_time,
         transform_time,
+    )
+    return payload, False
+
+
+def _leaderboard_not_found(leaderboard_id: int):
+    return http_error(
+        f"canonot find leaderboard with id {leaderboard_id}",
+        10000 + HTTPStatus.NOT_FOUND,
+        HTTPStatus.NOT_FOUND,
+    )
+
+
+@leaderboard_bp.route("/<int:leaderboard_id>/metadata", methods=["GET"])
+def get_leaderboard_metadata(leaderboard_id: int):
+    """
+    GET /leaderboard/<leaderboard_id>/metadata
+
+    The rarely-changing part of the leaderboard detail (name, deadline,
+    description, reference code, benchmarks, GPU types), served with
+    long-lived cache headers. Clients derive the time left from `deadline`.
+    """
+    total_start = time.perf_counter()
+
+    conn = get_db_connection()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT jsonb_build_object(
+                'name', l.name,
+                'deadline', l.deadline,
+                'lang', l.task->>'lang',
+                'description', l.description,
+                'reference', l.task->'files'->>'reference.py',
+                'benchmarks', l.task->'benchmarks',
+                'gpu_types', (
+                    SELECT jsonb_agg(DISTINCT g.gpu_type)
+                    FROM leaderboard.gpu_type g
+                    WHERE g.leaderboard_id = l.id
+                )
+            )
+            FROM leaderboard.leaderboard l
+            WHERE l.id = %s
+            """,
+            (leaderboard_id,),
+        )
+        result = cur.fetchone()
+
+    if result is None:
+        return _leaderboard_not_found(leaderboard_id)
+
+    res = to_api_leaderboard_metadata(result[0])
+
+    logger.info(
+        "[Perf] leaderboard_metadata leaderboard_id=%s | total=%.2fms",
+        leaderboard_id,
+        (time.perf_counter() - total_start) * 1000,
+    )
+
+    return http_success(data=res, etag=True, max_age=METADATA_MAX_AGE_SECONDS)
+
+
+@leaderboard_bp.route("/<int:leaderboard_id>/rankings", methods=["GET"])
+def get_leaderboard_rankings(leaderboard_id: int):
+    """
+    GET /leaderboard/<leaderboard_id>/rankings
+
+    Rankings only, without the leaderboard metadata.
+
+    Query parameters:
+    - gpu_type: Only return the ranking for this GPU type
+    - limit: Number of entries per GPU type (top-N; default all, max 1000)
+    - offset: Number of entries to skip per GPU type (default 0)
+
+    `rank` and `prev_score` are relative to the full ranking, and `totals`
+    holds the full ranking length per GPU type, so pages can be stitched
+    together client-side.
+    """
+    total_start = time.perf_counter()
+
+    gpu_type = request.args.get("gpu_type") or None
+    # Invalid values fall back to the defaults.
+    limit = request.args.get("limit", type=_non_negative_int)
+    offset = request.args.get("offset", 0, type=_non_negative_int)
+    if limit is not None:
+        limit = min(limit, RANKINGS_MAX_LIMIT)
+
+    conn = get_db_connection()
+
+    # 1. Cheap version probe; answer 304 if the client is up to date
+    version = _get_leaderboard_version(conn, leaderboard_id)
+    if version is None:
+        return _leaderboard_not_found(leaderboard_id)
+
+    etag = hashlib.sha1(
+        f"{version}|{gpu_type}|{limit}|{offset}".encode("utf-8")
+    ).hexdigest()[:16]
+    not_modified = check_not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    # 2. Query the requested window of each ranking
+    query_start = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(
+            _get_rankings_query(),
+            {
+                "leaderboard_id": leaderboard_id,
+                "gpu_type": gpu_type,
+                "limit": limit,
+                "offset": offset,
+            },
+        )
+        rows = cur.fetchall()
+    query_time = (time.perf_counter() - query_start) * 1000
+
+    rankings = {}
+    totals = {}
+    for runner, entry, total in rows:
+        totals[runner] = total
+        if entry is not None:
+            rankings.setdefault(runner, []).append(entry)
+
+    total_time = (time.perf_counter() - total_start) * 1000
+    logger.info(
+        "[Perf] leaderboard_rankings leaderboard_id=%s gpu_type=%s limit=%s offset=%s | "
+        "query=%.2fms | total=%.2fms",
+        leaderboard_id,
+        gpu_type,
+        limit,
+        offset,
+        query_time,
         total_time,
     )
 
-    return http_success(res)
+    return http_success(
+        data={
+            "leaderboard_id": leaderboard_id,
+            "rankings": rankings,
+            "totals": totals,
+            "limit": limit,
+            "offset": offset,
+        },
+        etag=etag,
+    )
 
 
-# converts db record to api
-def to_api_leaderboard_item(data: dict[str, Any]):
-    leaderboard_data = data["leaderboard"]
-    name = leaderboard_data["name"]
-    deadline = leaderboard_data["deadline"]
-    time_left = to_time_left(deadline)
+@leaderboard_bp.route("/live", methods=["GET"])
+def live_scoreboard():
+    """
+    GET /leaderboard/live?ids=1,2,3
+
+    Server-Sent Events stream of ranking changes for the given leaderboards:
+    - `snapshot`: the latest full ranking per (leaderboard, gpu_type), sent
+      on connect
+    - `ranking`: a diff per changed (leaderboard, gpu_type) with `upserts`
+      (changed entries), `removed` (user ids) and `reset` (replace the
+      ranking with `upserts`)
+    Served from Redis only; see kernelboard/lib/scoreboard.py.
+    """
+    ids = []
+    for raw in request.args.get("ids", "").split(","):
+        if raw.strip().isdigit():
+            ids.append(int(raw))
+    if not ids or len(ids) > LIVE_MAX_LEADERBOARDS:
+        return http_error(
+            f"ids must list 1 to {LIVE_MAX_LEADERBOARDS} leaderboard ids",
+            10000 + HTTPStatus.BAD_REQUEST,
+            HTTPStatus.BAD_REQUEST,
+        )
 
-    lang = leaderboard_data["lang"]
-    if lang == "py":
-        lang = "Python"
+    hub = get_scoreboard_hub()
+    if hub is None:
+        return http_error(
+            "live scoreboard is unavailable",
+            10000 + HTTPStatus.SERVICE_UNAVAILABLE,
+            HTTPStatus.SERVICE_UNAVAILABLE,
+        )
 
-    description = leaderboard_data["description"] or ""
-    description = description.replace("\\n", "\n")
+    # Subscribe before reading the snapshot so no change is missed; the
+    # stream unsubscribes when it closes, so only a failure before that
+    # has to.
+    q = hub.subscribe(ids)
+    try:
+        states = hub.get_states(ids)
+        return sse_response(
+            _stream_scoreboard(
+                states,
+                q,
+                max_duration=current_app.config["SSE_MAX_DURATION"],
+                keepalive=current_app.config["SSE_KEEPALIVE"],
+            ),
+            on_close=lambda: hub.unsubscribe(ids, q),
+        )
+    except Exception:
+        hub.unsubscribe(ids, q)
+        raise
 
-    reference = leaderboard_data["reference"] or ""
-    reference = reference.replace("\\n", "\n")
 
-    benchmarks = leaderboard_data.get("benchmarks") or []
+def _stream_scoreboard(states: list[dict], q, max_duration: float, keepalive: float):
+    deadline = time.perf_counter() + max_duration
 
-    gpu_types = leaderboard_data["gpu_types"]
-    gpu_types.sort()
+    for state in states:
+        yield format_sse("snapshot", state)
+
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        try:
+            message = q.get(timeout=min(keepalive, remaining))
+        except queue.Empty:
+            yield KEEPALIVE_COMMENT
+            continue
+        yield format_sse("ranking", message)
+
+
+def _non_negative_int(value: str) -> int:
+    n = int(value)
+    if n < 0:
+        raise ValueError(value)
+    return n
+
+
+def _get_rankings_query():
+    # Ranks and score deltas are computed over the full ranking before the
+    # window is applied. GPU types without entries in the window are still
+    # returned (with a NULL entry) so that their totals are reported.
+    return """
+        WITH gpu_types AS (
+            SELECT DISTINCT gpu_type
+            FROM leaderboard.gpu_type
+            WHERE leaderboard_id = %(leaderboard_id)s
+              AND (%(gpu_type)s::TEXT IS NULL OR gpu_type = %(gpu_type)s)
+        ),
+
+        ranked AS (
+            SELECT pb.runner,
+                u.user_name,
+                pb.score,
+                pb.submission_time,
+                pb.file_name,
+                pb.submission_id,
+                pb.submission_count,
+                ROW_NUMBER() OVER w AS rank,
+                pb.score - LAG(pb.score) OVER w AS prev_score,
+                COUNT(*) OVER (PARTITION BY pb.runner) AS total
+            FROM leaderboard.personal_best pb
+                JOIN gpu_types g ON g.gpu_type = pb.runner
+                LEFT JOIN leaderboard.user_info u ON pb.user_id = u.id
+            WHERE pb.leaderboard_id = %(leaderboard_id)s
+            WINDOW w AS (PARTITION BY pb.runner ORDER BY pb.score ASC, pb.submission_time ASC)
+        ),
+
+        totals AS (
+            SELECT g.gpu_type, COALESCE(MAX(r.total), 0) AS total
+            FROM gpu_types g
+                LEFT JOIN ranked r ON r.runner = g.gpu_type
+            GROUP BY g.gpu_type
+        )
+
+        SELECT t.gpu_type,
+            CASE WHEN r.rank IS NULL THEN NULL ELSE jsonb_build_object(
+                'user_name', r.user_name,
+                'score', r.score,
+                'file_name', r.file_name,
+                'submission_id', r.submission_id,
+                'submission_count', r.submission_count,
+                'submission_time', r.submission_time,
+                'rank', r.rank,
+                'prev_score', r.prev_score
+            ) END,
+            t.total
+        FROM totals t
+            LEFT JOIN ranked r ON r.runner = t.gpu_type
+                AND r.rank > %(offset)s
+                AND (%(limit)s::INTEGER IS NULL OR r.rank <= %(offset)s + %(limit)s)
+        ORDER BY t.gpu_type, r.rank
+    """
+
+
+# =============================================================================
+# Redis Cache Helpers
+# =============================================================================
+
+
+def _get_redis():
+    """Get Redis connection (singleton)."""
+    cert_reqs = os.getenv("REDIS_SSL_CERT_REQS")
+    return get_redis_connection(cert_reqs=cert_reqs)
+
+
+def _get_leaderboard_version(conn, leaderboard_id: int) -> str | None:
+    """
+    Cheap version token for a leaderboard's detail payload, or None if the
+    leaderboard does not exist.
+
+    Every personal_best refresh bumps the leaderboard's counters in
+    `personal_best_version`, so their sum changes whenever a ranking can
+    have, whatever order the writing transactions commit in. The deadline
+    and the rendered `time_left` are included so deadline edits and the
+    countdown text also produce a new version.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT l.deadline,
+                (SELECT SUM(version) FROM leaderboard.personal_best_version WHERE leaderboard_id = l.id)
+            FROM leaderboard.leaderboard l
+            WHERE l.id = %s
+            """,
+            (leaderboard_id,),
+        )
+        row = cur.fetchone()
+
+    if row is None:
+        return None
+
+    deadline, pb_version = row
+    raw = "|".join(str(v) for v in (deadline, to_time_left(deadline), pb_version))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _get_cached_payload(redis_conn, key: str) -> str | None:
+    """Get a serialized payload cached under a versioned key."""
+    if not redis_conn:
+        return None
+    try:
+        value = redis_conn.get(key)
+        return value.decode("utf-8") if value else None
+    except Exception:
+        logger.warning("Redis cache read failed", exc_info=True)
+        return None
+
+
+def _set_cached_payload(redis_conn, key: str, payload: str, ttl: int):
+    """Cache a serialized payload under a versioned key."""
+    if not redis_conn:
+        return
+    try:
+        redis_conn.set(key, payload, ex=ttl)
+    except Exception:
+        logger.warning("Redis cache write failed", exc_info=True)
+
+
+# converts db record to api
+def to_api_leaderboard_item(data: dict[str, Any]):
+    metadata = to_api_leaderboard_metadata(data["leaderboard"])
 
     rankings = {}
     for gpu_type, ranking_ in data["rankings"].items():
@@ -106,15 +493,34 @@ def to_api_leaderboard_item(data: dict[str, Any]):
         if len(ranking) > 0:
             rankings[gpu_type] = ranking
     return {
-        "name": name,
-        "deadline": deadline,
-        "time_left": time_left,
+        **metadata,
+        "time_left": to_time_left(metadata["deadline"]),
+        "rankings": rankings,
+    }
+
+
+def to_api_leaderboard_metadata(leaderboard_data: dict[str, Any]):
+    lang = leaderboard_data["lang"]
+    if lang == "py":
+        lang = "Python"
+
+    description = leaderboard_data["description"] or ""
+    description = description.replace("\\n", "\n")
+
+    reference = leaderboard_data["reference"] or ""
+    reference = reference.replace("\\n", "\n")
+
+    gpu_types = leaderboard_data["gpu_types"] or []
+    gpu_types.sort()
+
+    return {
+        "name": leaderboard_data["name"],
+        "deadline": leaderboard_data["deadline"],
         "lang": lang,
         "gpu_types": gpu_types,
         "description": description,
         "reference": reference,
-        "benchmarks": benchmarks,
-        "rankings": rankings,
+        "benchmarks": leaderboard_data.get("benchmarks") or [],
     }
 
 
@@ -142,35 +548,20 @@ def _get_query():
             WHERE leaderboard_id = %(leaderboard_id)s
         ),
 
-        -- Total submission count per user per GPU type for this leaderboard.
-        submission_counts AS (
-            SELECT s.user_id, r.runner, COUNT(DISTINCT s.id) AS submission_count
-            FROM leaderboard.submission s
-            JOIN leaderboard.runs r ON r.submission_id = s.id
-            WHERE s.leaderboard_id = %(leaderboard_id)s
-            GROUP BY s.user_id, r.runner
-        ),
-
-        -- All the runs on this leaderboard. For each user and GPU type, the
-        -- user's runs on that GPU type are ranked by score.
-        ranked_runs AS (
-            SELECT r.runner AS runner,
+        -- Each user's best run per GPU type, maintained incrementally in
+        -- leaderboard.personal_best (see kernelboard/lib/personal_best.py).
+        top_runs AS (
+            SELECT pb.runner AS runner,
                 u.user_name AS user_name,
-                r.score AS score,
-                s.submission_time AS submission_time,
-                s.file_name AS file_name,
-                r.submission_id AS submission_id,
-                COALESCE(sc.submission_count, 0) AS submission_count,
-                RANK() OVER (PARTITION BY r.runner, u.id ORDER BY r.score ASC) AS rank
-            FROM leaderboard.runs r
-                JOIN leaderboard.submission s ON r.submission_id = s.id
-                LEFT JOIN leaderboard.user_info u ON s.user_id = u.id
-                LEFT JOIN submission_counts sc ON s.user_id = sc.user_id AND r.runner = sc.runner
-            WHERE NOT r.secret AND r.score IS NOT NULL AND r.passed AND s.leaderboard_id = %(leaderboard_id)s
-        ),
-
-        -- From ranked_runs, keep only the top run per user.
-        top_runs AS (SELECT * FROM ranked_runs WHERE rank = 1)
+                pb.score AS score,
+                pb.submission_time AS submission_time,
+                pb.file_name AS file_name,
+                pb.submission_id AS submission_id,
+                pb.submission_count AS submission_count
+            FROM leaderboard.personal_best pb
+                LEFT JOIN leaderboard.user_info u ON pb.user_id = u.id
+            WHERE pb.leaderboard_id = %(leaderboard_id)s
+        )
 
         SELECT jsonb_build_object(
             'rankings', (SELECT jsonb_object_agg(g.gpu_type, (
@@ -225,14 +616,22 @@ def get_custom_trend(leaderboard_id: int):
     - H100_claude-opus-4.5_ka_submission
     - H100_gpt-5-2_ka_submission
     - H100_gpt-5_ka_submission
+
+    Accepts the same from/to/bucket/max_points/format parameters as user_trend.
     """
     total_start = time.perf_counter()
 
+    try:
+        params = _parse_trend_params(request.args)
+        columnar = _is_columnar(request.args)
+    except ValueError as e:
+        return http_error(str(e), 10000 + HTTPStatus.BAD_REQUEST, HTTPStatus.BAD_REQUEST)
+
     conn = get_db_connection()
     query_start = time.perf_counter()
 
     with conn.cursor() as cur:
-        sql = """
+        points_sql = """
             SELECT
                 s.id AS submission_id,
                 s.file_name,
@@ -240,25 +639,57 @@ def get_custom_trend(leaderboard_id: int):
                 r.score,
                 r.passed,
                 r.runner AS gpu_type,
-                r.mode
+                r.mode,
+                r.id AS run_id,
+                -- Same segment as parse_model_from_filename()
+                substring(s.file_name from '_([^_]*)_ka_submission\\.py$') AS model
             FROM leaderboard.submission s
             JOIN leaderboard.runs r ON r.submission_id = s.id
-            WHERE s.user_id = %s
-              AND s.leaderboard_id = %s
+            WHERE s.user_id = %(user_id)s
+              AND s.leaderboard_id = %(leaderboard_id)s
               AND r.score IS NOT NULL
               AND r.passed = true
               AND NOT r.secret
-            ORDER BY s.submission_time ASC
-        """
-        cur.execute(sql, (HARDCODED_USER_ID, leaderboard_id))
+        """ + _TREND_WINDOW_FILTER
+        if columnar:
+            sql = _columnar_trend_sql(points_sql, series="gpu_type, model")
+        else:
+            sql = _downsampled_trend_sql(
+                points_sql,
+                series="gpu_type, model",
+                columns="submission_id, file_name, submission_time, score, passed, gpu_type, mode",
+            )
+        cur.execute(sql, {**params, "user_id": HARDCODED_USER_ID, "leaderboard_id": leaderboard_id})
         rows = cur.fetchall()
 
     query_time = (time.perf_counter() - query_start) * 1000
 
+    if columnar:
+        series_by_model = {}
+        for gpu_type, model, times, scores, submission_ids in rows:
+            if not gpu_type or gpu_type == "unknown" or not model or model == "unknown":
+                continue
+            series_by_model.setdefault(gpu_type, {})[model] = {
+                "submission_time": times,
+                "score": scores,
+                "submission_id": submission_ids,
+            }
+        logger.info(
+            "[Perf] custom_trend leaderboard_id=%s format=columnar series=%d | query=%.2fms | total=%.2fms",
+            leaderboard_id, len(rows), query_time, (time.perf_counter() - total_start) * 1000,
+        )
+        return http_success(etag=True, data={
+            "leaderboard_id": leaderboard_id,
+            "format": "columnar",
+            "time_series": series_by_model,
+            **_trend_params_echo(params),
+        })
+
     if not rows:
-        return http_success(data={
+        return http_success(etag=True, data={
             "leaderboard_id": leaderboard_id,
             "time_series": {},
+            **_trend_params_echo(params),
         })
 
     items = []
@@ -288,13 +719,14 @@ def get_custom_trend(leaderboard_id: int):
 
     total_time = (time.perf_counter() - total_start) * 1000
     logger.info(
-        "[Perf] custom_trend leaderboard_id=%s | query=%.2fms | total=%.2fms",
-        leaderboard_id, query_time, total_time,
+        "[Perf] custom_trend leaderboard_id=%s points=%d | query=%.2fms | total=%.2fms",
+        leaderboard_id, len(rows), query_time, total_time,
     )
 
-    return http_success(data={
+    return http_success(etag=True, data={
         "leaderboard_id": leaderboard_id,
         "time_series": series_by_model,
+        **_trend_params_echo(params),
     })
 
 
@@ -305,15 +737,22 @@ def get_user_trend(leaderboard_id: int):
 
     Query parameters:
     - user_id: User ID(s), comma-separated for multiple (required)
+    - from, to: Only submissions in this ISO 8601 time range (inclusive)
+    - bucket: Keep the fastest run per time bucket, e.g. 15m, 6h, 1d
+    - max_points: Upper bound on points per series (default 1000, max 5000)
+    - format: `columnar` returns each series as parallel arrays
+      (`submission_time` in epoch ms, `score` as floats, `submission_id`)
+      instead of one object per point
 
     Examples:
     - ?user_id=123
     - ?user_id=123,456,789
+    - ?user_id=123&from=2025-06-01T00:00:00Z&bucket=1d
+    - ?user_id=123&format=columnar
 
-    Returns time series data for all submissions from the specified users.
+    Returns time series data for the submissions from the specified users,
+    downsampled to at most `max_points` per (user, GPU type).
     """
-    from flask import request
-
     total_start = time.perf_counter()
 
     user_id_param = request.args.get("user_id", "")
@@ -326,6 +765,12 @@ def get_user_trend(leaderboard_id: int):
             HTTPStatus.BAD_REQUEST,
         )
 
+    try:
+        params = _parse_trend_params(request.args)
+        columnar = _is_columnar(request.args)
+    except ValueError as e:
+        return http_error(str(e), 10000 + HTTPStatus.BAD_REQUEST, HTTPStatus.BAD_REQUEST)
+
     conn = get_db_connection()
     user_map = {}  # user_id -> display_name
 
@@ -350,9 +795,8 @@ def get_user_trend(leaderboard_id: int):
 
         # Query for all users at once
         user_id_list = list(user_map.keys())
-        placeholders = ",".join(["%s"] * len(user_id_list))
 
-        sql = f"""
+        points_sql = """
             SELECT
                 s.id AS submission_id,
                 s.user_id,
@@ -361,26 +805,59 @@ def get_user_trend(leaderboard_id: int):
                 r.score,
                 r.passed,
                 r.runner AS gpu_type,
-                r.mode
+                r.mode,
+                r.id AS run_id
             FROM leaderboard.submission s
             JOIN leaderboard.runs r ON r.submission_id = s.id
-            WHERE s.user_id IN ({placeholders})
-              AND s.leaderboard_id = %s
+            WHERE s.user_id = ANY(%(user_ids)s)
+              AND s.leaderboard_id = %(leaderboard_id)s
               AND r.score IS NOT NULL
               AND r.passed = true
               AND NOT r.secret
-            ORDER BY s.submission_time ASC
-        """
-        cur.execute(sql, (*user_id_list, leaderboard_id))
+        """ + _TREND_WINDOW_FILTER
+        if columnar:
+            sql = _columnar_trend_sql(points_sql, series="user_id, gpu_type")
+        else:
+            sql = _downsampled_trend_sql(
+                points_sql,
+                series="user_id, gpu_type",
+                columns="submission_id, user_id, file_name, submission_time, score, passed, gpu_type, mode",
+            )
+        cur.execute(sql, {**params, "user_ids": user_id_list, "leaderboard_id": leaderboard_id})
         rows = cur.fetchall()
 
     query_time = (time.perf_counter() - query_start) * 1000
 
+    if columnar:
+        series_by_gpu = {}
+        for user_id, gpu_type, times, scores, submission_ids in rows:
+            if not gpu_type or gpu_type == "unknown":
+                continue
+            user_id_str = str(user_id)
+            series_by_gpu.setdefault(gpu_type, {})[user_id_str] = {
+                "user_name": user_map.get(user_id_str, user_id_str),
+                "submission_time": times,
+                "score": scores,
+                "submission_id": submission_ids,
+            }
+        logger.info(
+            "[Perf] user_trend leaderboard_id=%s format=columnar series=%d | query=%.2fms | total=%.2fms",
+            leaderboard_id, len(rows), query_time, (time.perf_counter() - total_start) * 1000,
+        )
+        return http_success(etag=True, data={
+            "leaderboard_id": leaderboard_id,
+            "user_ids": user_id_list,
+            "format": "columnar",
+            "time_series": series_by_gpu,
+            **_trend_params_echo(params),
+        })
+
     if not rows:
-        return http_success(data={
+        return http_success(etag=True, data={
             "leaderboard_id": leaderboard_id,
             "user_ids": user_id_list,
             "time_series": {},
+            **_trend_params_echo(params),
         })
 
     # Group items by user_id first
@@ -412,18 +889,133 @@ def get_user_trend(leaderboard_id: int):
 
     total_time = (time.perf_counter() - total_start) * 1000
     logger.info(
-        "[Perf] user_trend leaderboard_id=%s users=%s | "
+        "[Perf] user_trend leaderboard_id=%s users=%s points=%d | "
         "query=%.2fms | total=%.2fms",
-        leaderboard_id, list(user_map.values()), query_time, total_time,
+        leaderboard_id, list(user_map.values()), len(rows), query_time, total_time,
     )
 
-    return http_success(data={
+    return http_success(etag=True, data={
         "leaderboard_id": leaderboard_id,
         "user_ids": user_id_list,
         "time_series": series_by_gpu,
+        **_trend_params_echo(params),
     })
 
 
+# Optional `from` / `to` bounds of the trend queries.
+_TREND_WINDOW_FILTER = """
+              AND (%(from)s::TIMESTAMPTZ IS NULL OR s.submission_time >= %(from)s::TIMESTAMPTZ)
+              AND (%(to)s::TIMESTAMPTZ IS NULL OR s.submission_time <= %(to)s::TIMESTAMPTZ)
+"""
+
+
+def _parse_trend_params(args) -> dict:
+    """
+    Parse `from`, `to`, `bucket` and `max_points` into the SQL parameters
+    of _downsampled_trend_sql(). Raises ValueError with a client-facing
+    message on invalid values.
+    """
+    params = {"from": None, "to": None, "bucket": None, "max_points": TREND_DEFAULT_MAX_POINTS}
+
+    for name in ("from", "to"):
+        raw = args.get(name)
+        if not raw:
+            continue
+        try:
+            value = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"{name} must be an ISO 8601 datetime") from None
+        params[name] = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    raw = args.get("bucket")
+    if raw:
+        unit = _BUCKET_UNITS.get(raw[-1:])
+        if unit is None or not raw[:-1].isdigit() or int(raw[:-1]) == 0:
+            raise ValueError("bucket must be a duration like 30s, 15m, 6h, 1d or 1w")
+        params["bucket"] = int(raw[:-1]) * unit
+
+    raw = args.get("max_points")
+    if raw:
+        if not raw.isdigit() or not 2 <= int(raw) <= TREND_MAX_POINTS:
+            raise ValueError(f"max_points must be between 2 and {TREND_MAX_POINTS}")
+        params["max_points"] = int(raw)
+
+    return params
+
+
+def _is_columnar(args) -> bool:
+    """Whether the `format` query parameter asks for columnar series."""
+    fmt = args.get("format") or "rows"
+    if fmt not in ("rows", "columnar"):
+        raise ValueError("format must be rows or columnar")
+    return fmt == "columnar"
+
+
+def _trend_params_echo(params: dict) -> dict:
+    return {"max_points": params["max_points"], "bucket_seconds": params["bucket"]}
+
+
+def _downsampled_trend_sql(points_sql: str, series: str, columns: str) -> str:
+    """
+    Wrap a trend query so each series (the `series` columns) is reduced to
+    its fastest run per time bucket, in one set-based pass in Postgres:
+    - with `bucket`, buckets are that many seconds wide;
+    - a series longer than `max_points` gets buckets of span / (max_points - 1),
+      so at most max_points remain. Shorter series are left untouched.
+    Buckets start at the series' first run, not at the epoch, so a span cut
+    into max_points - 1 buckets never straddles an extra bucket boundary.
+    Keeping the minimum (rather than e.g. LTTB) preserves every record drop,
+    which is what the charts are about. `points_sql` must select
+    `submission_time`, `score` and `run_id`. Rows come back in time order.
+    """
+    return f"""
+        WITH points AS ({points_sql}),
+        binned AS (
+            SELECT p.*,
+                CASE
+                    WHEN %(bucket)s::FLOAT8 IS NULL AND COUNT(*) OVER w <= %(max_points)s
+                        THEN ROW_NUMBER() OVER w
+                    ELSE FLOOR(EXTRACT(EPOCH FROM p.submission_time - MIN(p.submission_time) OVER w) / GREATEST(
+                        COALESCE(%(bucket)s::FLOAT8, 0),
+                        EXTRACT(EPOCH FROM MAX(p.submission_time) OVER w - MIN(p.submission_time) OVER w)
+                            / (%(max_points)s - 1),
+                        0.001
+                    ))
+                END AS bucket
+            FROM points p
+            WINDOW w AS (PARTITION BY {series})
+        )
+        SELECT {columns}
+        FROM (
+            SELECT DISTINCT ON ({series}, bucket) *
+            FROM binned
+            ORDER BY {series}, bucket, score ASC, submission_time ASC, run_id ASC
+        ) d
+        ORDER BY submission_time ASC, run_id ASC
+    """
+
+
+def _columnar_trend_sql(points_sql: str, series: str) -> str:
+    """
+    Downsampled trend query returning one row per series: the `series`
+    columns, then parallel arrays of submission times (epoch ms), scores
+    (float) and submission ids, in time order. Built by Postgres, so no
+    per-point Python objects beyond the array elements.
+    """
+    inner = _downsampled_trend_sql(
+        points_sql, series=series, columns=f"{series}, submission_time, score, submission_id, run_id"
+    )
+    return f"""
+        SELECT {series},
+            array_agg((EXTRACT(EPOCH FROM submission_time) * 1000)::BIGINT ORDER BY submission_time, run_id),
+            array_agg(score::FLOAT8 ORDER BY submission_time, run_id),
+            array_agg(submission_id ORDER BY submission_time, run_id)
+        FROM ({inner}) t
+        GROUP BY {series}
+        ORDER BY {series}
+    """
+
+
 @leaderboard_bp.route("/<int:leaderboard_id>/fastest_trend", methods=["GET"])
 def get_fastest_trend(leaderboard_id: int):
     """
@@ -432,81 +1024,155 @@ def get_fastest_trend(leaderboard_id: int):
     Returns time series data showing the fastest submission across ALL users
     over time for each GPU type. This creates a "world record" line showing
     the best performance achieved at any point in time.
+
+    `format=columnar` returns each line as parallel arrays, like user_trend.
     """
     total_start = time.perf_counter()
 
+    try:
+        columnar = _is_columnar(request.args)
+    except ValueError as e:
+        return http_error(str(e), 10000 + HTTPStatus.BAD_REQUEST, HTTPStatus.BAD_REQUEST)
+
     conn = get_db_connection()
+    redis_conn = _get_redis()
+    payload, _, hit = get_fastest_trend_payload(conn, redis_conn, leaderboard_id, columnar=columnar)
+
+    logger.info(
+        "[Perf] fastest_trend leaderboard_id=%s format=%s cache=%s | total=%.2fms",
+        leaderboard_id,
+        "columnar" if columnar else "rows",
+        "hit" if hit else "miss",
+        (time.perf_counter() - total_start) * 1000,
+    )
+
+    return http_success_json(payload, etag=True)
+
+
+def get_fastest_trend_payload(
+    conn, redis_conn, leaderboard_id: int, columnar: bool = False
+) -> tuple[str, str | None, bool]:
+    """
+    Serialized fastest_trend data, cached under the leaderboard version
+    (new passed runs change it). Returns `(payload, version, cache_hit)`.
+    """
+    version = _get_leaderboard_version(conn, leaderboard_id)
+    cache_key = f"{FASTEST_TREND_CACHE_KEY_PREFIX}{leaderboard_id}:{version}"
+    if columnar:
+        cache_key += ":columnar"
+    if version is not None:
+        cached = _get_cached_payload(redis_conn, cache_key)
+        if cached is not None:
+            return cached, version, True
+
+    build = _build_fastest_trend_columnar if columnar else _build_fastest_trend
+    payload = current_app.json.dumps(build(conn, leaderboard_id))
+    if version is not None:
+        _set_cached_payload(redis_conn, cache_key, payload, FASTEST_TREND_CACHE_TTL_SECONDS)
+    return payload, version, False
+
+
+def _build_fastest_trend(conn, leaderboard_id: int) -> dict:
+    """
+    Record line per GPU type, read from `leaderboard.record_history`
+    (see kernelboard/lib/record_history.py), which holds only the runs that
+    beat the previous best.
+    """
     query_start = time.perf_counter()
 
     with conn.cursor() as cur:
         sql = """
             SELECT
-                s.id AS submission_id,
+                h.submission_id,
                 s.user_id,
                 u.user_name,
-                s.file_name,
-                s.submission_time,
-                r.score,
-                r.runner AS gpu_type
-            FROM leaderboard.submission s
-            JOIN leaderboard.runs r ON r.submission_id = s.id
+                h.submission_time,
+                h.score,
+                h.runner AS gpu_type
+            FROM leaderboard.record_history h
+            JOIN leaderboard.submission s ON s.id = h.submission_id
             LEFT JOIN leaderboard.user_info u ON s.user_id = u.id
-            WHERE s.leaderboard_id = %s
-              AND r.score IS NOT NULL
-              AND r.passed = true
-              AND NOT r.secret
-            ORDER BY s.submission_time ASC
+            WHERE h.leaderboard_id = %s
+            ORDER BY h.submission_time ASC, h.run_id ASC
         """
         cur.execute(sql, (leaderboard_id,))
         rows = cur.fetchall()
 
     query_time = (time.perf_counter() - query_start) * 1000
 
-    if not rows:
-        return http_success(data={
-            "leaderboard_id": leaderboard_id,
-            "time_series": {},
+    series_by_gpu = {}
+    for row in rows:
+        (submission_id, user_id, user_name, submission_time, score, gpu_type) = row
+        series_by_gpu.setdefault(gpu_type, {"fastest": []})["fastest"].append({
+            "submission_time": (
+                submission_time.isoformat() if submission_time else None
+            ),
+            "score": score,
+            "user_id": str(user_id) if user_id else None,
+            "user_name": user_name or str(user_id) if user_id else "Unknown",
+            "gpu_type": gpu_type,
+            "submission_id": submission_id,
         })
 
-    # Group by GPU type and compute running minimum
-    series_by_gpu = {}
-    running_min_by_gpu = {}
+    logger.info(
+        "[Perf] fastest_trend leaderboard_id=%s build | records=%d | query=%.2fms",
+        leaderboard_id, len(rows), query_time,
+    )
 
-    for row in rows:
-        (submission_id, user_id, user_name, file_name, submission_time,
-         score, gpu_type) = row
+    return {
+        "leaderboard_id": leaderboard_id,
+        "time_series": series_by_gpu,
+    }
 
-        if not gpu_type or gpu_type == "unknown":
-            continue
 
-        if gpu_type not in series_by_gpu:
-            series_by_gpu[gpu_type] = {"fastest": []}
-            running_min_by_gpu[gpu_type] = float("inf")
-
-        # Only add a point if this submission beats the current record
-        if score < running_min_by_gpu[gpu_type]:
-            running_min_by_gpu[gpu_type] = score
-            series_by_gpu[gpu_type]["fastest"].append({
-                "submission_time": (
-                    submission_time.isoformat() if submission_time else None
-                ),
-                "score": score,
-                "user_id": str(user_id) if user_id else None,
-                "user_name": user_name or str(user_id) if user_id else "Unknown",
-                "gpu_type": gpu_type,
-                "submission_id": submission_id,
-            })
+def _build_fastest_trend_columnar(conn, leaderboard_id: int) -> dict:
+    """Like _build_fastest_trend, with each line aggregated into arrays by Postgres."""
+    query_start = time.perf_counter()
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+                h.runner,
+                array_agg((EXTRACT(EPOCH FROM h.submission_time) * 1000)::BIGINT
+                    ORDER BY h.submission_time, h.run_id),
+                array_agg(h.score::FLOAT8 ORDER BY h.submission_time, h.run_id),
+                array_agg(h.submission_id ORDER BY h.submission_time, h.run_id),
+                array_agg(s.user_id ORDER BY h.submission_time, h.run_id),
+                array_agg(COALESCE(NULLIF(u.user_name, ''), s.user_id)
+                    ORDER BY h.submission_time, h.run_id)
+            FROM leaderboard.record_history h
+            JOIN leaderboard.submission s ON s.id = h.submission_id
+            LEFT JOIN leaderboard.user_info u ON s.user_id = u.id
+            WHERE h.leaderboard_id = %s
+            GROUP BY h.runner
+            ORDER BY h.runner
+            """,
+            (leaderboard_id,),
+        )
+        rows = cur.fetchall()
 
-    total_time = (time.perf_counter() - total_start) * 1000
     logger.info(
-        "[Perf] fastest_trend leaderboard_id=%s | query=%.2fms | total=%.2fms",
-        leaderboard_id, query_time, total_time,
+        "[Perf] fastest_trend leaderboard_id=%s build columnar | query=%.2fms",
+        leaderboard_id, (time.perf_counter() - query_start) * 1000,
     )
 
-    return http_success(data={
+    return {
         "leaderboard_id": leaderboard_id,
-        "time_series": series_by_gpu,
-    })
+        "format": "columnar",
+        "time_series": {
+            runner: {
+                "fastest": {
+                    "submission_time": times,
+                    "score": scores,
+                    "submission_id": submission_ids,
+                    "user_id": user_ids,
+                    "user_name": user_names,
+                },
+            }
+            for runner, times, scores, submission_ids, user_ids, user_names in rows
+        },
+    }
 
 
 @leaderboard_bp.route("/<int:leaderboard_id>/users", methods=["GET"])
@@ -519,44 +1185,24 @@ def search_users(leaderboard_id: int):
     - q: Search query for username (partial match, case-insensitive)
     - limit: Maximum number of results to return (default 20)
 
-    Returns list of users with their user_id and username.
+    Returns list of users with their user_id and username, exact and prefix
+    matches first. Served from leaderboard.participant (see
+    kernelboard/lib/participants.py).
     """
-    from flask import request
+    total_start = time.perf_counter()
 
     query = request.args.get("q", "").strip()
     limit = min(int(request.args.get("limit", 20)), 100)
 
-    conn = get_db_connection()
-
-    with conn.cursor() as cur:
-        if query:
-            sql = """
-                SELECT DISTINCT u.id, u.user_name
-                FROM leaderboard.user_info u
-                JOIN leaderboard.submission s ON s.user_id = u.id
-                WHERE s.leaderboard_id = %s
-                  AND u.user_name ILIKE %s
-                ORDER BY u.user_name
-                LIMIT %s
-            """
-            cur.execute(sql, (leaderboard_id, f"%{query}%", limit))
-        else:
-            sql = """
-                SELECT DISTINCT u.id, u.user_name
-                FROM leaderboard.user_info u
-                JOIN leaderboard.submission s ON s.user_id = u.id
-                WHERE s.leaderboard_id = %s
-                ORDER BY u.user_name
-                LIMIT %s
-            """
-            cur.execute(sql, (leaderboard_id, limit))
+    users, hit = participants.search(get_db_connection(), leaderboard_id, query, limit)
 
-        rows = cur.fetchall()
-
-    users = [
-        {"user_id": str(row[0]), "username": row[1] or str(row[0])}
-        for row in rows
-    ]
+    logger.info(
+        "[Perf] search_users leaderboard_id=%s q_len=%d cache=%s | total=%.2fms",
+        leaderboard_id,
+        len(query),
+        "hit" if hit else "miss",
+        (time.perf_counter() - total_start) * 1000,
+    )
 
     return http_success(data={
         "leaderboard_id": leaderboard_id,
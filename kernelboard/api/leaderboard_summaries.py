@@ -1,15 +1,22 @@
+import hashlib
 import json
 import logging
+import math
 import os
+import random
+import threading
 import time
+import uuid
 from datetime import datetime, timezone
 
-from flask import Blueprint, request
+from flask import Blueprint, current_app, request
 
+from kernelboard.lib import response_cache
 from kernelboard.lib.auth_utils import get_id_and_username_from_session, get_whitelist
 from kernelboard.lib.db import get_db_connection
 from kernelboard.lib.redis_connection import get_redis_connection
-from kernelboard.lib.status_code import http_success
+from kernelboard.lib.response_cache import SUMMARIES_RESPONSE_KEY, CachedResponse
+from kernelboard.lib.status_code import envelope_prefix, envelope_suffix, http_success, http_success_raw
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +24,28 @@ leaderboard_summaries_bp = Blueprint("leaderboard_summaries_bp", __name__, url_p
 
 # Redis cache key prefix for ended leaderboard top_users
 CACHE_KEY_PREFIX = "lb_top_users:"
+# Active leaderboards: short-lived entries, recomputed early (see _should_recompute)
+ACTIVE_CACHE_KEY_PREFIX = "lb_top_users:active:"
+# New runs invalidate through the version; the TTL only bounds staleness
+# of anything the version misses (e.g. user renames).
+ACTIVE_CACHE_TTL_SECONDS = 60
+# Probabilistic early expiration: higher recomputes earlier
+EARLY_EXPIRATION_BETA = 1.0
+
+# Single-flight recomputation: one request computes a leaderboard's
+# top_users while the others reuse the previous value or wait for it.
+RECOMPUTE_LOCK_PREFIX = "lb_top_users:lock:"
+RECOMPUTE_LOCK_SECONDS = 10
+RECOMPUTE_WAIT_SECONDS = 2.0
+RECOMPUTE_POLL_SECONDS = 0.05
+
+# Whole serialized response (see kernelboard/lib/response_cache.py). After
+# the soft TTL or an invalidation it is rebuilt in the background while the
+# previous one is still served; the hard TTL bounds how stale it can get.
+RESPONSE_SOFT_TTL_SECONDS = 15
+RESPONSE_HARD_TTL_SECONDS = 600
+RESPONSE_REBUILD_LOCK_KEY = "lb_summaries:rebuild"
+RESPONSE_REBUILD_LOCK_SECONDS = 30
 
 
 # =============================================================================
@@ -60,15 +89,115 @@ def _set_cached_top_users(redis_conn, leaderboard_id: int, top_users: list):
         logger.warning("Redis cache write failed", exc_info=True)
 
 
-def _delete_cached_top_users(redis_conn, leaderboard_ids: list[int]):
-    """Delete cached top_users for leaderboards (e.g., when deadline extended)."""
+def _get_cached_active_top_users(redis_conn, leaderboard_ids: list[int]) -> dict[int, dict]:
+    """
+    Get cached entries for active leaderboards:
+    `{"top_users": [...], "delta": compute seconds, "expires_at": unix time}`.
+    """
+    if not redis_conn or not leaderboard_ids:
+        return {}
+
+    keys = [f"{ACTIVE_CACHE_KEY_PREFIX}{lb_id}" for lb_id in leaderboard_ids]
+    try:
+        values = redis_conn.mget(keys)
+        return {lb_id: json.loads(value) for lb_id, value in zip(leaderboard_ids, values) if value}
+    except Exception:
+        logger.warning("Redis cache read failed", exc_info=True)
+        return {}
+
+
+def _set_cached_active_top_users(
+    redis_conn,
+    leaderboard_id: int,
+    top_users: list | None,
+    delta: float,
+    version: str | None = None,
+):
+    """
+    Cache top_users for an active leaderboard for ACTIVE_CACHE_TTL_SECONDS,
+    tagged with its version.
+
+    Also drops the leaderboard's ended-cache entry, which is stale once a
+    deadline was extended; it is recomputed when the leaderboard ends again.
+    """
+    if not redis_conn:
+        return
+
+    entry = {
+        "top_users": top_users,
+        "version": version,
+        "delta": delta,
+        "expires_at": time.time() + ACTIVE_CACHE_TTL_SECONDS,
+    }
+    try:
+        pipe = redis_conn.pipeline()
+        pipe.set(
+            f"{ACTIVE_CACHE_KEY_PREFIX}{leaderboard_id}",
+            json.dumps(entry),
+            ex=ACTIVE_CACHE_TTL_SECONDS,
+        )
+        pipe.delete(f"{CACHE_KEY_PREFIX}{leaderboard_id}")
+        pipe.execute()
+    except Exception:
+        logger.warning("Redis cache write failed", exc_info=True)
+
+
+def _top_users_version(pb_version: int | None) -> str | None:
+    """Version of an active leaderboard's priority-GPU personal bests."""
+    if pb_version is None:
+        return None
+    return str(pb_version)
+
+
+def _should_recompute(entry: dict, now: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch): recompute before `expires_at`
+    with a probability that grows as expiry nears, scaled by how long the
+    value took to compute, so concurrent requests don't all miss at once.
+    """
+    return now - entry["delta"] * EARLY_EXPIRATION_BETA * math.log(1.0 - random.random()) >= entry["expires_at"]
+
+
+def _acquire_recompute_locks(redis_conn, leaderboard_ids: list[int]) -> tuple[dict[int, str | None], list[int]]:
+    """
+    Try to take the recompute lock of each leaderboard. Returns
+    `(owned {id: token}, contended [id])`. Without Redis every id is owned.
+    """
     if not redis_conn or not leaderboard_ids:
+        return {lb_id: None for lb_id in leaderboard_ids}, []
+
+    tokens = {lb_id: uuid.uuid4().hex for lb_id in leaderboard_ids}
+    try:
+        pipe = redis_conn.pipeline()
+        for lb_id, token in tokens.items():
+            pipe.set(f"{RECOMPUTE_LOCK_PREFIX}{lb_id}", token, nx=True, ex=RECOMPUTE_LOCK_SECONDS)
+        acquired = pipe.execute()
+    except Exception:
+        logger.warning("Redis recompute lock failed", exc_info=True)
+        return {lb_id: None for lb_id in leaderboard_ids}, []
+
+    owned = {lb_id: tokens[lb_id] for lb_id, ok in zip(leaderboard_ids, acquired) if ok}
+    contended = [lb_id for lb_id, ok in zip(leaderboard_ids, acquired) if not ok]
+    return owned, contended
+
+
+def _release_recompute_locks(redis_conn, owned: dict[int, str | None]):
+    """Release the locks still held with our token."""
+    ids = [lb_id for lb_id, token in owned.items() if token is not None]
+    if not redis_conn or not ids:
         return
+
+    keys = [f"{RECOMPUTE_LOCK_PREFIX}{lb_id}" for lb_id in ids]
     try:
-        keys = [f"{CACHE_KEY_PREFIX}{lb_id}" for lb_id in leaderboard_ids]
-        redis_conn.delete(*keys)
+        holders = redis_conn.mget(keys)
+        ours = [
+            key for key, lb_id, holder in zip(keys, ids, holders)
+            if holder is not None and holder.decode("utf-8") == owned[lb_id]
+        ]
+        if ours:
+            redis_conn.delete(*ours)
     except Exception:
-        logger.warning("Redis cache delete failed", exc_info=True)
+        logger.warning("Redis recompute lock release failed", exc_info=True)
 
 
 # =============================================================================
@@ -112,7 +241,105 @@ def index():
 
 def _get_leaderboards_cached(total_start: float, force_refresh: bool = False):
     """
-    Get leaderboard summaries with Redis caching for ended leaderboards.
+    Serve the whole response from the Redis response cache, rebuilding it
+    in the background once stale. Only a cold cache (or force_refresh)
+    builds it inline, through _build_leaderboards_cached.
+    """
+    redis_conn = _get_redis()
+
+    if not force_refresh:
+        entry, fresh = response_cache.load(redis_conn, SUMMARIES_RESPONSE_KEY)
+        if entry is not None:
+            if not fresh:
+                _schedule_response_rebuild(redis_conn)
+            response = _summaries_response(entry)
+            logger.info(
+                "[Perf] leaderboard_summaries (response cache) | fresh=%s | total=%.2fms",
+                fresh,
+                (time.perf_counter() - total_start) * 1000,
+            )
+            return response
+
+    leaderboards = _build_leaderboards_cached(total_start, force_refresh)
+    entry = _make_summaries_entry(leaderboards)
+    response_cache.store(
+        redis_conn, SUMMARIES_RESPONSE_KEY, entry, RESPONSE_SOFT_TTL_SECONDS, RESPONSE_HARD_TTL_SECONDS
+    )
+    return _summaries_response(entry)
+
+
+def rebuild_summaries_response() -> CachedResponse:
+    """
+    Recompute the summaries and replace the cached response. Needs an app
+    context; used by the background rebuild.
+    """
+    leaderboards = _build_leaderboards_cached(time.perf_counter())
+    entry = _make_summaries_entry(leaderboards)
+    response_cache.store(
+        _get_redis(), SUMMARIES_RESPONSE_KEY, entry, RESPONSE_SOFT_TTL_SECONDS, RESPONSE_HARD_TTL_SECONDS
+    )
+    return entry
+
+
+def _make_summaries_entry(leaderboards: list) -> CachedResponse:
+    """Compress the response up to the `now` value, which changes per request."""
+    leaderboards_json = current_app.json.dumps(leaderboards)
+    etag = hashlib.sha1(leaderboards_json.encode("utf-8")).hexdigest()
+    prefix = f'{envelope_prefix()}{{"leaderboards":{leaderboards_json},"now":'
+    return CachedResponse.from_prefix(prefix.encode("utf-8"), etag)
+
+
+def _summaries_response(entry: CachedResponse):
+    """
+    The cached response, gzipped when the client accepts it. Each encoding
+    gets its own ETag, since the bodies differ byte for byte.
+    """
+    now_json = current_app.json.dumps(datetime.now(timezone.utc))
+    suffix = f"{now_json}}}{envelope_suffix()}".encode("utf-8")
+    if request.accept_encodings["gzip"]:
+        response, status = http_success_raw(
+            entry.gzip(suffix), etag=f"{entry.etag}-gzip", content_encoding="gzip"
+        )
+    else:
+        response, status = http_success_raw(entry.body(suffix), etag=entry.etag)
+    response.vary.add("Accept-Encoding")
+    return response, status
+
+
+def _schedule_response_rebuild(redis_conn):
+    """Rebuild the cached response in a background thread, one worker at a time."""
+    if not redis_conn:
+        return
+    token = uuid.uuid4().hex
+    try:
+        if not redis_conn.set(RESPONSE_REBUILD_LOCK_KEY, token, nx=True, ex=RESPONSE_REBUILD_LOCK_SECONDS):
+            return
+    except Exception:
+        logger.warning("Redis response rebuild lock failed", exc_info=True)
+        return
+
+    app = current_app._get_current_object()
+
+    def _rebuild():
+        try:
+            with app.app_context():
+                rebuild_summaries_response()
+        except Exception:
+            logger.exception("leaderboard summaries rebuild failed")
+        finally:
+            try:
+                holder = redis_conn.get(RESPONSE_REBUILD_LOCK_KEY)
+                if holder is not None and holder.decode("utf-8") == token:
+                    redis_conn.delete(RESPONSE_REBUILD_LOCK_KEY)
+            except Exception:
+                logger.warning("Redis response rebuild lock release failed", exc_info=True)
+
+    threading.Thread(target=_rebuild, name="summaries-rebuild", daemon=True).start()
+
+
+def _build_leaderboards_cached(total_start: float, force_refresh: bool = False) -> list:
+    """
+    Build leaderboard summaries with Redis caching of top_users.
 
     Args:
         total_start: Start time for performance logging
@@ -120,8 +347,12 @@ def _get_leaderboards_cached(total_start: float, force_refresh: bool = False):
 
     Strategy:
     - Ended leaderboards (deadline < NOW): Read from Redis cache
-    - Active leaderboards (deadline >= NOW): Compute in real-time
+    - Active leaderboards (deadline >= NOW): Cached for ACTIVE_CACHE_TTL_SECONDS
+      under the version of their priority-GPU personal bests; a new run there
+      changes the version, and entries are also recomputed early with a
+      probability that rises towards expiry
     - Uncached ended leaderboards: Compute and store in cache
+    - Recomputation is single-flight per leaderboard (Redis lock)
     """
     # 1. Database & Redis connection
     db_conn_start = time.perf_counter()
@@ -133,20 +364,13 @@ def _get_leaderboards_cached(total_start: float, force_refresh: bool = False):
 
     with conn.cursor() as cur:
         # 2. Get all leaderboards and identify ended vs active
-        cur.execute("""
-            SELECT id, name, deadline,
-                   deadline < NOW() AS is_ended
-            FROM leaderboard.leaderboard
-            ORDER BY id DESC
-        """)
+        cur.execute(_get_leaderboards_with_versions_query())
         all_leaderboards = cur.fetchall()
 
         ended_ids = [row[0] for row in all_leaderboards if row[3]]
         active_ids = [row[0] for row in all_leaderboards if not row[3]]
-
-        # 3. Delete stale cache for active leaderboards (ex. deadline extended)
-        if active_ids:
-            _delete_cached_top_users(redis_conn, active_ids)
+        # 3. Active leaderboards' top_users version (new runs on the priority GPU change it)
+        active_versions = {row[0]: _top_users_version(row[4]) for row in all_leaderboards if not row[3]}
 
         # 4. Try to get cached top_users for ended leaderboards
         cache_start = time.perf_counter()
@@ -155,12 +379,26 @@ def _get_leaderboards_cached(total_start: float, force_refresh: bool = False):
             cached_top_users = {}
         else:
             cached_top_users = _get_cached_top_users(redis_conn, ended_ids)
+
+        # Active entries are reused until a new run changes their version or
+        # they (probabilistically) expire
+        active_entries = _get_cached_active_top_users(redis_conn, active_ids)
+        now = time.time()
+        expired_active_ids = [
+            lb_id for lb_id in active_ids
+            if lb_id not in active_entries
+            or active_entries[lb_id].get("version") != active_versions[lb_id]
+            or _should_recompute(active_entries[lb_id], now)
+        ]
+        for lb_id, entry in active_entries.items():
+            if lb_id not in expired_active_ids:
+                cached_top_users[lb_id] = entry["top_users"]
         cache_time = (time.perf_counter() - cache_start) * 1000
 
         # Find ended leaderboards not in cache
         uncached_ended_ids = [lb_id for lb_id in ended_ids if lb_id not in cached_top_users]
-        # 4. Compute top_users for: active + uncached ended leaderboards
-        ids_to_compute = active_ids + uncached_ended_ids
+        # 5. Compute top_users for: expired active + uncached ended leaderboards
+        ids_to_compute = expired_active_ids + uncached_ended_ids
 
         logger.info(
             "[Cache] cached=%d | uncached=%d | active=%d | ids_to_compute=%d",
@@ -171,19 +409,12 @@ def _get_leaderboards_cached(total_start: float, force_refresh: bool = False):
         )
 
         compute_start = time.perf_counter()
-        if ids_to_compute:
-            ids_tuple = tuple(ids_to_compute)
-            cur.execute(_get_query_for_ids(), (ids_tuple, ids_tuple))
-            computed_results = {row[0]: row[1] for row in cur.fetchall()}
-        else:
-            computed_results = {}
+        previous = {lb_id: entry["top_users"] for lb_id, entry in active_entries.items()}
+        computed_results = _compute_top_users_single_flight(
+            cur, redis_conn, ids_to_compute, set(ended_ids), previous, active_versions
+        )
         compute_time = (time.perf_counter() - compute_start) * 1000
 
-        # 5. Cache newly computed ended leaderboards
-        for lb_id in uncached_ended_ids:
-            if lb_id in computed_results:
-                _set_cached_top_users(redis_conn, lb_id, computed_results[lb_id])
-
         # 6. Get metadata for all leaderboards
         cur.execute(_get_leaderboard_metadata_query())
         metadata = {row[0]: row[1] for row in cur.fetchall()}
@@ -195,7 +426,7 @@ def _get_leaderboards_cached(total_start: float, force_refresh: bool = False):
         lb_data = metadata.get(lb_id, {})
 
         # Get top_users from cache or computed results
-        lb_data["top_users"] = cached_top_users.get(lb_id, computed_results.get(lb_id))
+        lb_data["top_users"] = computed_results.get(lb_id, cached_top_users.get(lb_id))
 
         if lb_data.get("gpu_types") is None:
             lb_data["gpu_types"] = []
@@ -218,12 +449,102 @@ def _get_leaderboards_cached(total_start: float, force_refresh: bool = False):
         len(computed_results),
     )
 
-    return http_success(
-        {
-            "leaderboards": leaderboards,
-            "now": datetime.now(timezone.utc),
-        }
+    return leaderboards
+
+
+def _compute_top_users_single_flight(
+    cur,
+    redis_conn,
+    leaderboard_ids: list[int],
+    ended_ids: set[int],
+    previous: dict[int, list | None],
+    active_versions: dict[int, str | None] | None = None,
+) -> dict[int, list | None]:
+    """
+    Compute and cache top_users for `leaderboard_ids`, at most once at a
+    time per leaderboard across all workers.
+
+    Leaderboards whose recompute lock is held elsewhere get their previous
+    value (from `previous`) if there is one, otherwise the cache is polled
+    for up to RECOMPUTE_WAIT_SECONDS. Anything still missing after that is
+    computed here, so a stuck lock holder only costs a short delay.
+
+    Active entries are stored with their `active_versions` version.
+    """
+    active_versions = active_versions or {}
+    if not leaderboard_ids:
+        return {}
+
+    owned, contended = _acquire_recompute_locks(redis_conn, leaderboard_ids)
+    try:
+        results = _compute_and_cache_top_users(cur, redis_conn, list(owned), ended_ids, active_versions)
+    finally:
+        _release_recompute_locks(redis_conn, owned)
+
+    waiting = []
+    for lb_id in contended:
+        if lb_id in previous:
+            results[lb_id] = previous[lb_id]
+        else:
+            waiting.append(lb_id)
+
+    if waiting:
+        results.update(_wait_for_top_users(redis_conn, waiting, ended_ids))
+        missing = [lb_id for lb_id in waiting if lb_id not in results]
+        if missing:
+            logger.warning("[Cache] recompute of %s still running elsewhere, computing here", missing)
+            results.update(_compute_and_cache_top_users(cur, redis_conn, missing, ended_ids, active_versions))
+
+    logger.info(
+        "[Cache] single-flight | computed=%d | reused_previous=%d | waited=%d",
+        len(owned),
+        len(contended) - len(waiting),
+        len(waiting),
     )
+    return results
+
+
+def _compute_and_cache_top_users(
+    cur,
+    redis_conn,
+    leaderboard_ids: list[int],
+    ended_ids: set[int],
+    active_versions: dict[int, str | None],
+) -> dict:
+    """Run the top_users query for `leaderboard_ids` and cache every result."""
+    if not leaderboard_ids:
+        return {}
+
+    start = time.perf_counter()
+    ids_tuple = tuple(leaderboard_ids)
+    cur.execute(_get_query_for_ids(), (ids_tuple, ids_tuple))
+    rows = {row[0]: row[1] for row in cur.fetchall()}
+    delta = time.perf_counter() - start
+
+    # Leaderboards without runs are cached as None too, so they aren't
+    # recomputed on every request.
+    results = {lb_id: rows.get(lb_id) for lb_id in leaderboard_ids}
+    for lb_id, top_users in results.items():
+        if lb_id in ended_ids:
+            _set_cached_top_users(redis_conn, lb_id, top_users)
+        else:
+            _set_cached_active_top_users(redis_conn, lb_id, top_users, delta, active_versions.get(lb_id))
+    return results
+
+
+def _wait_for_top_users(redis_conn, leaderboard_ids: list[int], ended_ids: set[int]) -> dict:
+    """Poll the cache until another worker has stored these leaderboards."""
+    results: dict[int, list | None] = {}
+    deadline = time.perf_counter() + RECOMPUTE_WAIT_SECONDS
+    while True:
+        pending = [lb_id for lb_id in leaderboard_ids if lb_id not in results]
+        ended = [lb_id for lb_id in pending if lb_id in ended_ids]
+        active = [lb_id for lb_id in pending if lb_id not in ended_ids]
+        results.update(_get_cached_top_users(redis_conn, ended))
+        results.update({k: v["top_users"] for k, v in _get_cached_active_top_users(redis_conn, active).items()})
+        if len(results) == len(leaderboard_ids) or time.perf_counter() >= deadline:
+            return results
+        time.sleep(RECOMPUTE_POLL_SECONDS)
 
 
 # =============================================================================
@@ -269,10 +590,20 @@ def _get_leaderboards_original(total_start: float):
         {
             "leaderboards": leaderboards,
             "now": datetime.now(timezone.utc),
-        }
+        },
+        etag=_leaderboards_etag(leaderboards),
     )
 
 
+def _leaderboards_etag(leaderboards: list) -> str:
+    """
+    ETag over the leaderboards only: `now` changes on every request, so
+    hashing the full body would never let a client revalidate.
+    """
+    payload = current_app.json.dumps(leaderboards).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
 # =============================================================================
 # SQL Query Builders
 # =============================================================================
@@ -323,6 +654,48 @@ def _get_leaderboard_metadata_query():
     """
 
 
+def _get_leaderboards_with_versions_query():
+    """
+    All leaderboards (id, name, deadline, is_ended) plus, for active ones,
+    the `personal_best_version` counter of their priority GPU. The
+    personal_best triggers bump it on every run that lands there.
+    """
+    return """
+        WITH
+        priority_gpu AS (
+            SELECT DISTINCT ON (leaderboard_id)
+                leaderboard_id,
+                gpu_type
+            FROM leaderboard.gpu_type
+            ORDER BY leaderboard_id,
+                CASE gpu_type
+                    WHEN 'B200' THEN 1
+                    WHEN 'H100' THEN 2
+                    WHEN 'MI300' THEN 3
+                    WHEN 'A100' THEN 4
+                    WHEN 'L4'   THEN 5
+                    WHEN 'T4'   THEN 6
+                    ELSE 7
+                END,
+                gpu_type
+        ),
+        active_versions AS (
+            SELECT v.leaderboard_id, v.version
+            FROM leaderboard.personal_best_version v
+            JOIN priority_gpu p ON p.leaderboard_id = v.leaderboard_id
+                AND p.gpu_type = v.runner
+            JOIN leaderboard.leaderboard l ON l.id = v.leaderboard_id
+            WHERE l.deadline >= NOW() OR l.deadline IS NULL
+        )
+        SELECT l.id, l.name, l.deadline,
+               l.deadline < NOW() AS is_ended,
+               v.version
+        FROM leaderboard.leaderboard l
+        LEFT JOIN active_versions v ON v.leaderboard_id = l.id
+        ORDER BY l.id DESC;
+    """
+
+
 def _get_query_for_ids():
     """
     Get top_users for specific leaderboard IDs only.
@@ -350,30 +723,18 @@ def _get_query_for_ids():
                 END,
                 gpu_type
         ),
-        personal_best_candidates AS (
+        personal_best_runs AS (
             SELECT
-                r.runner,
-                s.leaderboard_id,
-                s.user_id,
+                pb.runner,
+                pb.leaderboard_id,
+                pb.user_id,
                 u.user_name,
-                r.score,
-                RANK() OVER (
-                    PARTITION BY s.leaderboard_id, r.runner, s.user_id
-                    ORDER BY r.score ASC
-                ) AS personal_submission_rank
-            FROM leaderboard.runs r
-            JOIN leaderboard.submission s ON r.submission_id = s.id
-            JOIN priority_gpu p ON p.leaderboard_id = s.leaderboard_id
-                AND p.gpu_type = r.runner
-            LEFT JOIN leaderboard.user_info u ON s.user_id = u.id
-            WHERE NOT r.secret
-                AND r.score IS NOT NULL
-                AND r.passed
-                AND s.leaderboard_id IN %s
-        ),
-        personal_best_runs AS (
-            SELECT * FROM personal_best_candidates
-            WHERE personal_submission_rank = 1
+                pb.score
+            FROM leaderboard.personal_best pb
+            JOIN priority_gpu p ON p.leaderboard_id = pb.leaderboard_id
+                AND p.gpu_type = pb.runner
+            LEFT JOIN leaderboard.user_info u ON pb.user_id = u.id
+            WHERE pb.leaderboard_id IN %s
         ),
         ranked_users AS (
             SELECT
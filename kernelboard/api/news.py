@@ -1,53 +1,38 @@
+import hashlib
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from http import HTTPStatus
 
 import yaml
 from flask import Blueprint, current_app
 
-from kernelboard.lib.status_code import HttpError, http_error, http_success
+from kernelboard.lib.redis_connection import get_redis_connection
+from kernelboard.lib.status_code import HttpError, http_error, http_success_json
 
 # logger for blueprint news_bp
 logger = logging.getLogger(__name__)
 
 news_bp = Blueprint("news_api", __name__, url_prefix="/news")
 
+# Parsed news list, keyed by a version of the news files
+NEWS_CACHE_KEY_PREFIX = "news:"
+NEWS_CACHE_TTL_SECONDS = 24 * 3600
+
 
 @news_bp.route("", methods=["GET"])
 def list_news_items():
     try:
         news_dir = os.path.join(current_app.root_path, "static/news")
-        news_contents = []
-        for filename in os.listdir(news_dir):
-            if filename.endswith(".md"):
-                target_file = os.path.join(news_dir, filename)
-                logger.info(f"detecting news md file: {target_file}")
-                with open(target_file, "r", encoding="utf-8") as f:
-                    raw = f.read()
-                    try:
-                        news_content = _to_api_news(raw)
-                        news_contents.append(news_content)
-                    except HttpError as e:
-                        logger.warning(
-                            f"[warning] failed to load news content:{target_file}, due to: {e.message}"
-                        )
-                        # skip the error news content
-                        continue
-        if not news_contents:
+        payload, _, last_modified, _ = get_news_payload(news_dir, _get_redis())
+        if payload is None:
             return http_error(
                 code=10000 + HTTPStatus.NOT_FOUND,
                 status_code=HTTPStatus.NOT_FOUND,
                 message="cannot find any news content from server",
             )
 
-        sorted_news_contents = sorted(
-            news_contents,
-            key=lambda item: safe_parse_date(item.get("date")),
-            reverse=True,
-        )
-
-        return http_success(data=sorted_news_contents)
+        return http_success_json(payload, etag=True, last_modified=last_modified)
     except Exception as e:
         return http_error(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -55,6 +40,98 @@ def list_news_items():
         )
 
 
+def get_news_payload(news_dir: str, redis_conn) -> tuple[str | None, str | None, datetime | None, bool]:
+    """
+    Serialized news list, cached in Redis under a version of the news files
+    (names, sizes and mtimes). Returns
+    `(payload, version, last_modified, cache_hit)`; payload is None when
+    there is no valid news.
+    """
+    filenames = [f for f in os.listdir(news_dir) if f.endswith(".md")]
+    version, last_modified = _get_news_version(news_dir, filenames)
+
+    cached = _get_cached_news(redis_conn, version)
+    if cached is not None:
+        return cached, version, last_modified, True
+
+    news_contents = []
+    for filename in filenames:
+        target_file = os.path.join(news_dir, filename)
+        logger.info(f"detecting news md file: {target_file}")
+        with open(target_file, "r", encoding="utf-8") as f:
+            raw = f.read()
+            try:
+                news_content = _to_api_news(raw)
+                news_contents.append(news_content)
+            except HttpError as e:
+                logger.warning(
+                    f"[warning] failed to load news content:{target_file}, due to: {e.message}"
+                )
+                # skip the error news content
+                continue
+    if not news_contents:
+        return None, version, last_modified, False
+
+    sorted_news_contents = sorted(
+        news_contents,
+        key=lambda item: safe_parse_date(item.get("date")),
+        reverse=True,
+    )
+    payload = current_app.json.dumps(sorted_news_contents)
+    _set_cached_news(redis_conn, version, payload)
+    return payload, version, last_modified, False
+
+
+def _get_news_version(news_dir: str, filenames: list[str]) -> tuple[str | None, datetime | None]:
+    """
+    Version token and latest mtime of the news files. The version is None
+    if any file can't be stat'ed, so such a listing is never cached.
+    """
+    parts = []
+    last_modified = None
+    for filename in sorted(filenames):
+        try:
+            stat = os.stat(os.path.join(news_dir, filename))
+        except OSError:
+            return None, None
+        parts.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}")
+        mtime = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+        if last_modified is None or mtime > last_modified:
+            last_modified = mtime
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16], last_modified
+
+
+# =============================================================================
+# Redis Cache Helpers
+# =============================================================================
+
+
+def _get_redis():
+    """Get Redis connection (singleton)."""
+    cert_reqs = os.getenv("REDIS_SSL_CERT_REQS")
+    return get_redis_connection(cert_reqs=cert_reqs)
+
+
+def _get_cached_news(redis_conn, version: str | None) -> str | None:
+    if not redis_conn or version is None:
+        return None
+    try:
+        value = redis_conn.get(f"{NEWS_CACHE_KEY_PREFIX}{version}")
+        return value.decode("utf-8") if value else None
+    except Exception:
+        logger.warning("Redis cache read failed", exc_info=True)
+        return None
+
+
+def _set_cached_news(redis_conn, version: str | None, payload: str):
+    if not redis_conn or version is None:
+        return
+    try:
+        redis_conn.set(f"{NEWS_CACHE_KEY_PREFIX}{version}", payload, ex=NEWS_CACHE_TTL_SECONDS)
+    except Exception:
+        logger.warning("Redis cache write failed", exc_info=True)
+
+
 def _to_api_news(raw: str):
     if raw.startswith("---"):
         parts = raw.split("---", 2)
@@ -3,12 +3,13 @@ import http
 import json
 import logging
 import os
+import queue
 import textwrap
 import time
 from typing import Any, List, Optional, Tuple
 
 import requests
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_login import current_user, login_required
 
 from kernelboard.lib.auth_utils import (
@@ -18,8 +19,17 @@ from kernelboard.lib.auth_utils import (
 from kernelboard.lib.db import get_db_connection
 from kernelboard.lib.error import ValidationError, validate_required_fields
 from kernelboard.lib.file_handler import get_submission_file_info
+from kernelboard.lib.http_client import get_http_client
+from kernelboard.lib.multipart import MultipartFileStream
 from kernelboard.lib.rate_limiter import limiter
+from kernelboard.lib.sse import KEEPALIVE_COMMENT, format_sse, sse_response
 from kernelboard.lib.status_code import http_error, http_success
+from kernelboard.lib.submission_events import (
+    diff_events,
+    fetch_submission_states,
+    get_submission_event_hub,
+    is_finished,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +45,21 @@ REQUIRED_SUBMISSION_REQUEST_FIELDS = [
 WEB_AUTH_HEADER = "X-Web-Auth-Id"
 MAX_CONTENT_LENGTH = 1 * 1024 * 1024  # 1MB max file size
 
+# Fields selectable with GET /submissions/<id>?fields=...
+SUBMISSION_FIELDS = (
+    "submission_id",
+    "leaderboard_id",
+    "file_name",
+    "submitted_at",
+    "submission_done",
+    "status",
+    "error",
+    "last_heartbeat",
+    "job_created_at",
+    "runs",
+)
+REPORT_MODES = ("always", "done", "never")
+
 # This blocks the leaderboard to show all the ranking codes when the leaderboard is ended
 BLOCKED_CODE_LEADERBOARD_LIST: list[str] = ["598"]  # leaderboard id to block show
 
@@ -69,6 +94,7 @@ def submission():
         )
     req = request.form.to_dict()
 
+    validate_start = time.perf_counter()
     try:
         validate_required_fields(req, REQUIRED_SUBMISSION_REQUEST_FIELDS)
         filename, mime, f = get_submission_file_info(request)
@@ -85,6 +111,7 @@ def submission():
             message=str(e),
             status_code=http.HTTPStatus.INTERNAL_SERVER_ERROR,
         )
+    logger.info("[Perf] submission validate | took %.2fms", (time.perf_counter() - validate_start) * 1000)
 
     logger.info("prepare sending submission request")
     # form request to cluster-management api
@@ -110,20 +137,29 @@ def submission():
 
     base = get_cluster_manager_endpoint()
     url = f"{base}/submission/{leaderboard_name}/{gpu_type}/{submission_mode}"
-    files = {
-        # requests expects (filename, fileobj, content_type)
-        "file": (filename, f.stream, mime),
-    }
+    # Stream the validated upload from its spooled file instead of letting
+    # requests build the multipart body in memory.
+    body = MultipartFileStream("file", filename, f.stream, mime)
     headers = {
         WEB_AUTH_HEADER: web_token,
+        "Content-Type": body.content_type,
     }
 
     logger.info("send submission request to leaderboard")
+    forward_start = time.perf_counter()
     try:
-        resp = requests.post(url, headers=headers, files=files, timeout=180)
+        # No retries: the body stream can't be replayed, and a resent
+        # submission could be queued twice.
+        resp = get_http_client().post(url, headers=headers, data=body, timeout=180, retries=0)
     except requests.RequestException as e:
         logger.error(f"forward failed: {e}")
         return jsonify({"error": f"forward failed: {e}"}), 502
+    finally:
+        logger.info(
+            "[Perf] submission forward | bytes=%d | took %.2fms",
+            len(body),
+            (time.perf_counter() - forward_start) * 1000,
+        )
 
     logger.info("submission request is sent")
     try:
@@ -295,6 +331,129 @@ def list_submissions():
     )
 
 
+@submission_bp.route("/submissions/<int:submission_id>", methods=["GET"])
+@login_required
+def get_submission(submission_id: int):
+    """
+    GET /submissions/<submission_id>?fields=status,submission_done,runs&report=done
+    Returns a single submission of the current user.
+
+    Query parameters:
+    - fields: comma-separated subset of SUBMISSION_FIELDS to return
+      (default all). `submission_id` is always included.
+    - report: when to render run reports: `always` (default), `done` (only
+      once the submission is done) or `never`. Unrendered reports are null,
+      and the run result/compilation blobs are not even read from the DB.
+    """
+    user_id, _ = get_id_and_username_from_session()
+
+    fields_param = request.args.get("fields", "")
+    fields = [f.strip() for f in fields_param.split(",") if f.strip()] or list(SUBMISSION_FIELDS)
+    unknown = [f for f in fields if f not in SUBMISSION_FIELDS]
+    report_mode = request.args.get("report", "always")
+    if unknown or report_mode not in REPORT_MODES:
+        return http_error(
+            message=(
+                f"invalid fields {unknown}" if unknown else f"report must be one of {list(REPORT_MODES)}"
+            ),
+            code=10000 + http.HTTPStatus.BAD_REQUEST.value,
+            status_code=http.HTTPStatus.BAD_REQUEST,
+        )
+
+    item = get_user_submission_with_status(
+        submission_id=submission_id,
+        user_id=user_id,
+        include_runs="runs" in fields,
+        report_mode=report_mode,
+    )
+    if item is None:
+        return http_error(
+            message=f"cannot find submission {submission_id}",
+            code=10000 + http.HTTPStatus.NOT_FOUND.value,
+            status_code=http.HTTPStatus.NOT_FOUND,
+        )
+
+    return http_success(
+        data={k: v for k, v in item.items() if k == "submission_id" or k in fields}
+    )
+
+
+@submission_bp.route("/submissions/<int:submission_id>/events", methods=["GET"])
+@login_required
+def submission_events(submission_id: int):
+    """
+    GET /submissions/<submission_id>/events
+    Server-Sent Events stream of a submission's progress:
+    - `status`: job status, error and done flag
+    - `runs`: run summaries (mode, runner, passed, score, start/end time)
+    - `heartbeat`: the job's last heartbeat
+    - `done`: sent once the submission is finished, then the stream ends
+    Events are only sent when something changed. The stream is closed after
+    SSE_MAX_DURATION seconds; EventSource clients reconnect.
+    """
+    user_id, _ = get_id_and_username_from_session()
+
+    conn = get_db_connection()
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT user_id FROM leaderboard.submission WHERE id = %s",
+            (submission_id,),
+        )
+        row = cur.fetchone()
+    if row is None or str(row[0]) != str(user_id):
+        return http_error(
+            message=f"cannot find submission {submission_id}",
+            code=10000 + http.HTTPStatus.NOT_FOUND.value,
+            status_code=http.HTTPStatus.NOT_FOUND,
+        )
+
+    # Subscribe before reading the initial state so no change is missed.
+    hub = get_submission_event_hub()
+    q = hub.subscribe(submission_id)
+    state = fetch_submission_states(conn, [submission_id])[submission_id]
+
+    return sse_response(
+        _stream_submission_events(
+            submission_id,
+            state,
+            q,
+            max_duration=current_app.config["SSE_MAX_DURATION"],
+            keepalive=current_app.config["SSE_KEEPALIVE"],
+        ),
+        on_close=lambda: hub.unsubscribe(submission_id, q),
+    )
+
+
+def _stream_submission_events(
+    submission_id: int,
+    state: dict,
+    q: queue.Queue,
+    max_duration: float,
+    keepalive: float,
+):
+    # Runs outside the request context: the DB connection has already been
+    # returned to the pool, only the hub's queue is read from here.
+    deadline = time.monotonic() + max_duration
+    previous = None
+
+    while True:
+        for name, payload in diff_events(previous, state):
+            yield format_sse(name, payload)
+        previous = state
+
+        if is_finished(state):
+            yield format_sse("done", {"submission_id": submission_id})
+            return
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            state = q.get(timeout=min(keepalive, remaining))
+        except queue.Empty:
+            yield KEEPALIVE_COMMENT
+
+
 def list_codes(
     leaderboard_id: int,
     submission_ids: List[int],
@@ -393,6 +552,47 @@ def list_user_submissions_with_status(
     return items, total
 
 
+def get_user_submission_with_status(
+    submission_id: int,
+    user_id: int,
+    include_runs: bool = True,
+    report_mode: str = "always",
+) -> Optional[dict[str, Any]]:
+    conn = get_db_connection()
+    with conn.cursor() as cur:
+        # Only read the per-run result/compilation blobs if reports may be
+        # rendered; `report_mode=done` still needs them once the submission
+        # is done, which the query decides per row.
+        sql, params = _query_get_submission(
+            submission_id, user_id, include_runs, report_mode
+        )
+        cur.execute(sql, params)
+        r = cur.fetchone()
+
+    if r is None:
+        return None
+
+    item = {
+        "submission_id": r[0],
+        "leaderboard_id": r[1],
+        "file_name": r[2],
+        "submitted_at": r[3],
+        "submission_done": r[4],
+        "status": r[5],
+        "error": r[6],
+        "last_heartbeat": r[7],
+        "job_created_at": r[8],
+    }
+    if include_runs:
+        item["runs"] = r[9] or []
+        render = report_mode == "always" or (report_mode == "done" and item["submission_done"])
+        for run in item["runs"]:
+            run["report"] = toReport(run) if render else None
+            run["result"] = {}
+            run.pop("compilation", None)
+    return item
+
+
 def toReport(run: any):
     mode = run["mode"]
     passed = run["passed"]
@@ -625,6 +825,69 @@ def _query_list_submission(
     return sql, params
 
 
+def _query_get_submission(
+    submission_id: int,
+    user_id: int,
+    include_runs: bool,
+    report_mode: str,
+) -> tuple[str, tuple]:
+    if not include_runs:
+        runs_sql = "NULL::jsonb"
+    else:
+        if report_mode == "always":
+            with_blobs = "TRUE"
+        elif report_mode == "done":
+            with_blobs = "s.done"
+        else:
+            with_blobs = "FALSE"
+        runs_sql = f"""
+                COALESCE(
+                    (
+                    SELECT jsonb_agg(
+                        jsonb_build_object(
+                        'start_time', r.start_time,
+                        'end_time',   r.end_time,
+                        'mode',       r.mode,
+                        'passed',     r.passed,
+                        'score',      r.score,
+                        'meta',       COALESCE(r.meta::jsonb, '{{}}'::jsonb),
+                        'result',     CASE WHEN {with_blobs}
+                                      THEN COALESCE(r.result::jsonb, '{{}}'::jsonb)
+                                      ELSE '{{}}'::jsonb END,
+                        'compilation', CASE WHEN {with_blobs}
+                                      THEN COALESCE(r.compilation::jsonb, '{{}}'::jsonb)
+                                      ELSE '{{}}'::jsonb END
+                        )
+                        ORDER BY r.start_time
+                    )
+                    FROM leaderboard.runs AS r
+                    WHERE r.submission_id = s.id AND r.secret = false
+                    ),
+                    '[]'::jsonb
+                )"""
+
+    sql = f"""
+            SELECT
+                s.id                AS submission_id,
+                s.leaderboard_id,
+                s.file_name,
+                s.submission_time   AS submitted_at,
+                s.done              AS submission_done,
+                j.status,
+                j.error,
+                j.last_heartbeat,
+                j.created_at        AS job_created_at,
+                {runs_sql} AS runs_json
+            FROM leaderboard.submission AS s
+            LEFT JOIN leaderboard.submission_job_status AS j
+              ON j.submission_id = s.id
+            WHERE s.id = %s
+              AND s.user_id = %s
+            """
+    params = (submission_id, user_id)
+    return sql, params
+
+
 def format_time(
     nanoseconds: float | str, err: Optional[float | str] = None
 ):  # noqa: C901
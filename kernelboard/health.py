@@ -4,7 +4,8 @@ from http import HTTPStatus
 from flask import Blueprint
 from flask import current_app as app
 
-from kernelboard.lib.db import get_db_connection
+from kernelboard.lib.db import get_db_connection, get_db_pool_stats
+from kernelboard.lib.http_client import get_http_client_stats
 from kernelboard.lib.redis_connection import get_redis_connection
 from kernelboard.lib.status_code import (
     http_error,
@@ -39,11 +40,23 @@ def health():
             all_checks_passed = False
 
     if all_checks_passed:
-        return http_success({"status": "healthy", "service": "kernelboard"})
+        return http_success(
+            {
+                "status": "healthy",
+                "service": "kernelboard",
+                "db_pool": get_db_pool_stats(),
+                "http_client": get_http_client_stats(),
+            }
+        )
     else:
         return http_error(
             message="Kernelboard is unhealthy",
             code=10500,
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
-            data={"status": "unhealthy", "service": "kernelboard"},
+            data={
+                "status": "unhealthy",
+                "service": "kernelboard",
+                "db_pool": get_db_pool_stats(),
+                "http_client": get_http_client_stats(),
+            },
         )
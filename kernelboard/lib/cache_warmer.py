@@ -0,0 +1,169 @@
+"""
+Cache warmer: precomputes the expensive read payloads into Redis so user
+requests hit warm, version-tagged entries instead of building them.
+
+Each pass warms:
+- the leaderboard summaries response (when its soft TTL has passed),
+- detail and fastest_trend payloads of every active leaderboard,
+- the news list.
+
+Entries use the same keys and version tokens as the endpoints, so a target
+whose current version is already cached is reported as `fresh` and not
+rebuilt. Run it as its own process (see the Procfile):
+
+    flask --app kernelboard cache warm [--once] [--interval SECONDS]
+"""
+
+import logging
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from kernelboard.api import leaderboard as leaderboard_api
+from kernelboard.api import leaderboard_summaries, news
+from kernelboard.lib import response_cache
+from kernelboard.lib.db import get_db_connection
+from kernelboard.lib.redis_connection import get_redis_connection
+from kernelboard.lib.response_cache import SUMMARIES_RESPONSE_KEY
+
+logger = logging.getLogger(__name__)
+
+WARMED = "warmed"
+FRESH = "fresh"
+FAILED = "failed"
+
+DEFAULT_INTERVAL_SECONDS = 60
+
+
+class WarmResult:
+    """Outcome of warming one cache target."""
+
+    __slots__ = ("target", "status", "version", "took_ms")
+
+    def __init__(self, target: str, status: str, version: str | None, took_ms: float):
+        self.target = target
+        self.status = status
+        self.version = version
+        self.took_ms = took_ms
+
+
+def warm_all() -> list[WarmResult]:
+    """
+    Warm every target once and return one result per target. A failing
+    target is logged and reported but doesn't stop the others. Needs an
+    app context.
+    """
+    conn = get_db_connection()
+    redis_conn = get_redis_connection(cert_reqs=os.getenv("REDIS_SSL_CERT_REQS"))
+    if redis_conn is None:
+        logger.warning("[warm] Redis unavailable, nothing to warm")
+        return []
+
+    results = [_warm("summaries", _warm_summaries, redis_conn)]
+    try:
+        leaderboard_ids = _get_active_leaderboard_ids(conn)
+    except Exception:
+        logger.exception("[warm] failed to list active leaderboards")
+        get_db_connection().rollback()
+        leaderboard_ids = []
+    for leaderboard_id in leaderboard_ids:
+        results.append(_warm(f"detail:{leaderboard_id}", _warm_detail, conn, redis_conn, leaderboard_id))
+        results.append(
+            _warm(f"fastest_trend:{leaderboard_id}", _warm_fastest_trend, conn, redis_conn, leaderboard_id)
+        )
+    results.append(_warm("news", _warm_news, redis_conn))
+    return results
+
+
+def _warm(target: str, fn, *args) -> WarmResult:
+    start = time.perf_counter()
+    try:
+        status, version = fn(*args)
+    except Exception:
+        logger.exception("[warm] %s failed", target)
+        # Leave the connection usable for the next target
+        get_db_connection().rollback()
+        status, version = FAILED, None
+    result = WarmResult(target, status, version, (time.perf_counter() - start) * 1000)
+    logger.info("[warm] %s | status=%s | version=%s | took %.2fms", target, status, version, result.took_ms)
+    return result
+
+
+def _warm_summaries(redis_conn) -> tuple[str, str | None]:
+    entry, fresh = response_cache.load(redis_conn, SUMMARIES_RESPONSE_KEY)
+    if entry is not None and fresh:
+        return FRESH, entry.etag
+    return WARMED, leaderboard_summaries.rebuild_summaries_response().etag
+
+
+def _warm_detail(conn, redis_conn, leaderboard_id: int) -> tuple[str, str | None]:
+    version = leaderboard_api._get_leaderboard_version(conn, leaderboard_id)
+    if version is None:
+        return FAILED, None
+    payload, hit = leaderboard_api.get_leaderboard_detail_payload(conn, redis_conn, leaderboard_id, version)
+    if payload is None:
+        return FAILED, version
+    return (FRESH if hit else WARMED), version
+
+
+def _warm_fastest_trend(conn, redis_conn, leaderboard_id: int) -> tuple[str, str | None]:
+    _, version, hit = leaderboard_api.get_fastest_trend_payload(conn, redis_conn, leaderboard_id)
+    return (FRESH if hit else WARMED), version
+
+
+def _warm_news(redis_conn) -> tuple[str, str | None]:
+    news_dir = os.path.join(current_app.root_path, "static/news")
+    payload, version, _, hit = news.get_news_payload(news_dir, redis_conn)
+    if payload is None:
+        return FAILED, version
+    return (FRESH if hit else WARMED), version
+
+
+def _get_active_leaderboard_ids(conn) -> list[int]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id FROM leaderboard.leaderboard
+            WHERE deadline >= NOW() OR deadline IS NULL
+            ORDER BY id
+            """
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+# =============================================================================
+# Flask CLI
+# =============================================================================
+
+cache_cli = AppGroup("cache", help="Manage the Redis response caches.")
+
+
+@cache_cli.command("warm")
+@click.option("--once", is_flag=True, help="Warm a single time and exit.")
+@click.option("--interval", type=float, default=DEFAULT_INTERVAL_SECONDS, show_default=True,
+              help="Seconds between the start of two passes.")
+def warm_command(once: bool, interval: float):
+    """Precompute summaries, active leaderboard payloads and news into Redis."""
+    app = current_app._get_current_object()
+    while True:
+        start = time.perf_counter()
+        # Fresh context per pass so the pooled DB connection is returned.
+        with app.app_context():
+            results = warm_all()
+        elapsed = time.perf_counter() - start
+
+        counts = {status: 0 for status in (WARMED, FRESH, FAILED)}
+        for result in results:
+            counts[result.status] += 1
+            click.echo(f"{result.target:<24} {result.status:<7} {result.took_ms:8.1f}ms  {result.version or '-'}")
+        click.echo(
+            f"warmed={counts[WARMED]} fresh={counts[FRESH]} failed={counts[FAILED]} "
+            f"in {elapsed * 1000:.0f}ms"
+        )
+
+        if once:
+            break
+        time.sleep(max(0.0, interval - elapsed))
@@ -1,32 +1,82 @@
 import logging
+import threading
 
 import psycopg2
 from flask import Flask, current_app, g
 
+from kernelboard.lib.db_pool import ConnectionPool
+
 logger = logging.getLogger(__name__)
+
+# Key under app.extensions holding the process-wide connection pool.
+POOL_EXTENSION_KEY = "kernelboard_db_pool"
+
+# Serialises pool creation between a worker's request threads.
+_pool_lock = threading.Lock()
+
+
+def get_db_pool(app: Flask | None = None) -> ConnectionPool:
+    """
+    Get the connection pool for the app, creating it on first use. The pool
+    is created lazily so that each gunicorn worker builds its own after fork,
+    and under a lock so concurrent first requests share a single pool.
+    """
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get(POOL_EXTENSION_KEY)
+    if pool is not None:
+        return pool
+    with _pool_lock:
+        pool = app.extensions.get(POOL_EXTENSION_KEY)
+        if pool is None:
+            database_url = app.config["DATABASE_URL"]
+            if not database_url:
+                raise RuntimeError(
+                    "DATABASE_URL is not set in the application configuration."
+                )
+            pool = ConnectionPool(
+                database_url,
+                min_size=app.config["DB_POOL_MIN_SIZE"],
+                max_size=app.config["DB_POOL_MAX_SIZE"],
+                timeout=app.config["DB_POOL_TIMEOUT"],
+                max_lifetime=app.config["DB_POOL_MAX_LIFETIME"],
+                health_check_interval=app.config["DB_POOL_HEALTH_CHECK_INTERVAL"],
+            )
+            app.extensions[POOL_EXTENSION_KEY] = pool
+    return pool
+
+
+def get_db_pool_stats() -> dict | None:
+    """Return pool counters for the current app, or None if no pool exists yet."""
+    pool = current_app.extensions.get(POOL_EXTENSION_KEY)
+    return pool.stats() if pool is not None else None
+
+
+def close_db_pool(app: Flask):
+    """Close all pooled connections for the app (e.g. on shutdown or in tests)."""
+    pool = app.extensions.pop(POOL_EXTENSION_KEY, None)
+    if pool is not None:
+        pool.closeall()
+
+
 def get_db_connection() -> psycopg2.extensions.connection:
     """
     Get a database connection from the `g` object. If the connection is not
-    already in the `g` object, create a new connection using the DATABASE_URL
-    from the current app's configuration and store it in the `g` object.
+    already in the `g` object, check one out of the app's connection pool
+    and store it in the `g` object.
     """
     if "db_connection" not in g:
-        database_url = current_app.config["DATABASE_URL"]
-        if not database_url:
-            raise RuntimeError(
-                "DATABASE_URL is not set in the application configuration."
-            )
-        print("database_url", database_url)
-        g.db_connection = psycopg2.connect(database_url)
+        g.db_connection = get_db_pool().getconn()
     return g.db_connection
 
 
 def close_db_connection(e=None):
     """
-    Close the database connection from the `g` object.
+    Commit (or roll back on error) the connection from the `g` object and
+    return it to the pool.
     """
     db = g.pop("db_connection", None)
     if db is not None:
+        discard = False
         try:
             if e is not None:
                 db.rollback()
@@ -34,10 +84,14 @@ def close_db_connection(e=None):
 
             else:
                 db.commit()
+        except psycopg2.Error:
+            discard = True
+            raise
         finally:
-            db.close()
+            get_db_pool().putconn(db, discard=discard or db.closed)
 
 
 def init_app(app: Flask):
-    # close the database connection when the application context is destroyed (e.g. at the end of a api request)
+    # return the database connection to the pool when the application context is destroyed
+    # (e.g. at the end of a api request)
     app.teardown_appcontext(close_db_connection)
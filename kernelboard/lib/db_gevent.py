@@ -0,0 +1,33 @@
+"""
+Cooperative psycopg2 for gevent workers (see gunicorn.conf.py).
+
+psycopg2 does its network I/O in C, so gevent's monkey-patching does not
+reach it and every query would block the whole worker. Installing a wait
+callback makes psycopg2 run queries asynchronously and wait for the socket
+through gevent instead.
+"""
+
+import psycopg2
+from psycopg2 import extensions
+
+
+def make_psycopg2_green():
+    """Install the gevent wait callback (idempotent)."""
+    if not hasattr(extensions, "set_wait_callback"):
+        raise ImportError("psycopg2 is too old to support wait callbacks")
+    extensions.set_wait_callback(gevent_wait_callback)
+
+
+def gevent_wait_callback(conn, timeout=None):
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
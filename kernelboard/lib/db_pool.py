@@ -0,0 +1,284 @@
+import logging
+import os
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool.
+
+    - Keeps between `min_size` and `max_size` connections open.
+    - Checkout blocks up to `timeout` seconds when the pool is exhausted.
+    - Connections idle for longer than `health_check_interval` are pinged
+      before being handed out; dead ones are replaced transparently.
+    - Connections older than `max_lifetime` are recycled on return.
+    - The pool is fork-aware: a child process (e.g. a gunicorn worker forked
+      from a preloaded master) never reuses the parent's sockets.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        max_lifetime: float = 3600.0,
+        health_check_interval: float = 30.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"invalid pool size: min={min_size}, max={max_size}")
+
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        # idle connections, most recently returned last
+        self._idle: list[extensions.connection] = []
+        # id(conn) -> (created_at, last_used_at)
+        self._meta: dict[int, tuple[float, float]] = {}
+        self._in_use: set[int] = set()
+        # slots reserved for connections being opened outside the lock
+        self._pending = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+            "foreign": 0,
+        }
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def getconn(self, timeout: float | None = None) -> extensions.connection:
+        """
+        Check a connection out of the pool. Connecting and health-checking
+        happen outside the pool lock, on a reserved slot, so a slow handshake
+        or a stale socket only delays the thread that hit it.
+        """
+        self._check_fork()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        self._fill_to_min_size()
+
+        waited = False
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("connection pool is closed")
+                    conn = self._pop_idle()
+                    if conn is not None or self._size() < self.max_size:
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"no database connection available within {timeout:.1f}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    if not waited:
+                        self._stats["waits"] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+
+                if conn is None:
+                    self._pending += 1
+                else:
+                    self._in_use.add(id(conn))
+
+            if conn is None:
+                conn = self._connect_reserved(idle=False)
+            elif not self._is_healthy(conn):
+                with self._cond:
+                    self._in_use.discard(id(conn))
+                    self._stats["health_check_failures"] += 1
+                    self._close(conn)
+                    self._cond.notify()
+                continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+            return conn
+
+    def putconn(self, conn: extensions.connection, discard: bool = False):
+        """
+        Return a connection to the pool. The caller is expected to have
+        already committed or rolled back; anything left open is rolled back.
+        A connection this pool did not hand out is closed, not pooled.
+        """
+        if os.getpid() != self._pid:
+            # Checked out before a fork; the parent still owns the socket.
+            return
+
+        with self._cond:
+            if id(conn) not in self._in_use:
+                logger.warning("[db_pool] closing a connection returned to a pool that does not own it")
+                self._stats["foreign"] += 1
+                self._close(conn)
+                return
+            self._in_use.discard(id(conn))
+
+            if not discard and not conn.closed:
+                try:
+                    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+
+            if self._closed or discard or conn.closed:
+                self._stats["discarded"] += 1
+                self._close(conn)
+            elif self._is_expired(conn):
+                self._stats["recycled"] += 1
+                self._close(conn)
+            else:
+                created_at, _ = self._meta[id(conn)]
+                self._meta[id(conn)] = (created_at, time.monotonic())
+                self._idle.append(conn)
+
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every idle connection and stop handing out new ones."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._close(self._idle.pop())
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Snapshot of pool counters and current occupancy."""
+        with self._cond:
+            return {
+                **self._stats,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "size": self._size(),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+    # -------------------------------------------------------------------------
+    # Internals (call with self._cond held unless noted)
+    # -------------------------------------------------------------------------
+
+    def _check_fork(self):
+        if os.getpid() == self._pid:
+            return
+        with self._cond:
+            if os.getpid() == self._pid:
+                return
+            # Drop inherited connections without closing them: closing would
+            # send a Terminate message on a socket the parent is still using.
+            logger.info("[db_pool] fork detected, resetting connection pool")
+            self._reset_state()
+
+    def _size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._pending
+
+    def _fill_to_min_size(self):
+        """Open connections up to `min_size`. Call without the lock."""
+        with self._cond:
+            missing = 0 if self._closed else max(0, self.min_size - self._size())
+            self._pending += missing
+        for opened in range(missing):
+            try:
+                self._connect_reserved(idle=True)
+            except Exception:
+                with self._cond:
+                    self._pending -= missing - opened - 1
+                    self._cond.notify_all()
+                raise
+
+    def _pop_idle(self) -> extensions.connection | None:
+        """Most recently used unexpired idle connection; not yet health-checked."""
+        while self._idle:
+            conn = self._idle.pop()
+            if not self._is_expired(conn):
+                return conn
+            self._stats["recycled"] += 1
+            self._close(conn)
+        return None
+
+    def _is_expired(self, conn: extensions.connection) -> bool:
+        created_at, _ = self._meta.get(id(conn), (0.0, 0.0))
+        return time.monotonic() - created_at > self.max_lifetime
+
+    def _is_healthy(self, conn: extensions.connection) -> bool:
+        """Ping the connection if it has been idle a while. Call without the lock."""
+        if conn.closed:
+            return False
+
+        _, last_used_at = self._meta.get(id(conn), (0.0, 0.0))
+        if time.monotonic() - last_used_at < self.health_check_interval:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            logger.warning("[db_pool] idle connection failed health check", exc_info=True)
+            return False
+
+    def _connect_reserved(self, idle: bool) -> extensions.connection:
+        """
+        Open a connection for a slot reserved in `_pending` and register it
+        as idle or in use. The slot is given back if connecting fails. Call
+        without the lock.
+        """
+        try:
+            conn = psycopg2.connect(self.dsn)
+        except Exception:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify()
+            raise
+
+        now = time.monotonic()
+        with self._cond:
+            self._pending -= 1
+            self._meta[id(conn)] = (now, now)
+            self._stats["created"] += 1
+            if idle and self._closed:
+                self._close(conn)
+            elif idle:
+                self._idle.insert(0, conn)
+                self._cond.notify()
+            else:
+                self._in_use.add(id(conn))
+        return conn
+
+    def _close(self, conn: extensions.connection):
+        self._meta.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            logger.warning("[db_pool] failed to close connection", exc_info=True)
@@ -1,4 +1,5 @@
 import ast
+import codecs
 import mimetypes
 import re
 
@@ -15,6 +16,8 @@ ALLOWED_EXTS = {".py"}
 ALLOWED_PYTHON_MIMES = {"text/x-python", "text/x-script.python", "text/plain"}
 MAX_CONTENT_LENGTH = 1_000_000  # 1 MB cap for file content you parse
 _TEXT_CTRL_RE = re.compile(rb"[\x00-\x08\x0B\x0C\x0E-\x1F]")
+READ_CHUNK_SIZE = 64 * 1024
+MIME_SAMPLE_SIZE = 2048
 
 def get_submission_file_info(request):
     if "file" not in request.files:
@@ -35,40 +38,56 @@ def get_submission_file_info(request):
     if ext not in ALLOWED_EXTS:
         raise InvalidPythonExtensionError()
 
-    # Peek first 2KB for quick checks and MIME guessing
-    sample = f.stream.read(2048)
+    mime = _validate_python_stream(f.stream, filename)
     f.stream.seek(0)
 
-    # Reject binary content quickly
-    if b"\x00" in sample or _TEXT_CTRL_RE.search(sample):
-        raise InvalidMimeError(message="binary content detected; not Python text")
+    return filename, mime, f
 
-    # Guess MIME type without libmagic
-    mime = _guess_python_mime(filename, sample)
 
-    # Full read (bounded by MAX_CONTENT_LENGTH)
-    raw = f.stream.read(MAX_CONTENT_LENGTH + 1)
-    f.stream.seek(0)
-    if not raw:
-        raise InvalidSyntaxError("file is empty")
-    if len(raw) > MAX_CONTENT_LENGTH:
-        raise InvalidSyntaxError(f"file too large (> {MAX_CONTENT_LENGTH} bytes)")
-    if b"\x00" in raw or _TEXT_CTRL_RE.search(raw):
-        raise InvalidMimeError(message="binary content detected; not Python text")
+def _validate_python_stream(stream, filename: str) -> str:
+    """
+    Validate an uploaded Python file in one pass over `stream`, chunk by
+    chunk: size cap, binary content and UTF-8 decoding are checked as the
+    bytes arrive, so a bad upload is rejected without reading it all. Only
+    the decoded text (at most MAX_CONTENT_LENGTH) is kept for `ast.parse`.
 
-    # Decode as UTF-8
+    Returns the guessed MIME type. The caller rewinds the stream.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="strict")
+    parts: list[str] = []
+    sample = b""
+    size = 0
+
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        if not sample:
+            sample = chunk[:MIME_SAMPLE_SIZE]
+        size += len(chunk)
+        if size > MAX_CONTENT_LENGTH:
+            raise InvalidSyntaxError(f"file too large (> {MAX_CONTENT_LENGTH} bytes)")
+        if b"\x00" in chunk or _TEXT_CTRL_RE.search(chunk):
+            raise InvalidMimeError(message="binary content detected; not Python text")
+        try:
+            parts.append(decoder.decode(chunk))
+        except UnicodeDecodeError:
+            raise InvalidSyntaxError("file is not valid UTF-8 text")
+
+    if not size:
+        raise InvalidSyntaxError("file is empty")
     try:
-        text = raw.decode("utf-8", errors="strict")
+        parts.append(decoder.decode(b"", final=True))
     except UnicodeDecodeError:
         raise InvalidSyntaxError("file is not valid UTF-8 text")
 
     # Validate syntax with AST
     try:
-        ast.parse(text, filename=filename, mode="exec")
+        ast.parse("".join(parts), filename=filename, mode="exec")
     except SyntaxError as e:
         raise InvalidSyntaxError(f"{e.msg} at line {e.lineno}")
 
-    return filename, mime, f
+    return _guess_python_mime(filename, sample)
 
 
 def _guess_python_mime(filename: str, sample: bytes) -> str:
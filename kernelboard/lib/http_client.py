@@ -0,0 +1,243 @@
+"""
+Shared outbound HTTP client.
+
+All calls to other services (cluster manager, Discord, OAuth providers) go
+through one requests.Session per process, so connections are pooled per
+host and kept alive instead of paying a new TCP/TLS handshake per call.
+
+Retries:
+- 429 responses and connect failures are retried for every method (the
+  request was not processed).
+- 502/503/504 and read errors are retried only for idempotent methods.
+- The delay is exponential backoff with jitter, or the server's
+  `Retry-After` when it sends one.
+- A call gives up retrying once it would run past HTTP_CLIENT_DEADLINE
+  seconds from its first attempt (kept below gunicorn's worker timeout):
+  the last response is returned, e.g. a 429 whose `Retry-After` is too long.
+
+Per-host latency and error counters are kept in-process and exposed through
+`get_http_client_stats()` (reported by /health).
+
+No Flask dependency, so ranking_worker.py can use it too.
+"""
+
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Number of per-host pools kept, and keep-alive connections per host
+HTTP_CLIENT_POOL_CONNECTIONS = int(os.getenv("HTTP_CLIENT_POOL_CONNECTIONS", 10))
+HTTP_CLIENT_POOL_MAXSIZE = int(os.getenv("HTTP_CLIENT_POOL_MAXSIZE", 10))
+HTTP_CLIENT_RETRIES = int(os.getenv("HTTP_CLIENT_RETRIES", 2))
+HTTP_CLIENT_BACKOFF_FACTOR = float(os.getenv("HTTP_CLIENT_BACKOFF_FACTOR", 0.5))
+# Upper bound for any single wait, including a server-sent Retry-After
+HTTP_CLIENT_BACKOFF_MAX = float(os.getenv("HTTP_CLIENT_BACKOFF_MAX", 30))
+# Total time a call may take across its attempts and waits
+HTTP_CLIENT_DEADLINE = float(os.getenv("HTTP_CLIENT_DEADLINE", 20))
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+RATE_LIMITED_STATUS = 429
+
+
+class HostStats:
+    """Latency and error counters for one host."""
+
+    __slots__ = ("requests", "errors", "retries", "total_ms", "max_ms", "last_status")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_status: int | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total_ms / self.requests, 2) if self.requests else None,
+            "max_ms": round(self.max_ms, 2),
+            "last_status": self.last_status,
+        }
+
+
+class HttpClient:
+    """
+    Pooled, retrying wrapper around a requests.Session. Thread-safe: the
+    session's urllib3 pools are, and the stats are guarded by a lock.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = HTTP_CLIENT_POOL_CONNECTIONS,
+        pool_maxsize: int = HTTP_CLIENT_POOL_MAXSIZE,
+        retries: int = HTTP_CLIENT_RETRIES,
+        backoff_factor: float = HTTP_CLIENT_BACKOFF_FACTOR,
+        backoff_max: float = HTTP_CLIENT_BACKOFF_MAX,
+        deadline: float = HTTP_CLIENT_DEADLINE,
+    ):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+
+        self.session = requests.Session()
+        # Retries are handled here, so they are counted and honor Retry-After
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._stats: dict[str, HostStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, *, retries: int | None = None, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying as described in the module docstring.
+        `retries` overrides the client default; pass 0 for bodies that
+        cannot be replayed (streams). Raises requests.RequestException when
+        the last attempt fails; the last response is returned otherwise,
+        whatever its status.
+        """
+        method = method.upper()
+        retries = self.retries if retries is None else retries
+        host = urlsplit(url).netloc
+        idempotent = method in IDEMPOTENT_METHODS
+        deadline = time.monotonic() + self.deadline
+        timeout = kwargs.get("timeout")
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                self._record(host, start, status=None)
+                retryable = isinstance(e, requests.ConnectTimeout) or (
+                    idempotent and isinstance(e, (requests.ConnectionError, requests.Timeout))
+                )
+                if not retryable or attempt >= retries:
+                    raise
+                delay = self._backoff(attempt)
+                if delay >= deadline - time.monotonic():
+                    raise
+                logger.warning("[http] %s %s failed (%s), retrying in %.2fs", method, host, e, delay)
+            else:
+                self._record(host, start, status=resp.status_code)
+                retryable = resp.status_code == RATE_LIMITED_STATUS or (
+                    idempotent and resp.status_code in RETRY_STATUSES
+                )
+                if not retryable or attempt >= retries:
+                    return resp
+                delay = _retry_after(resp)
+                delay = self._backoff(attempt) if delay is None else min(delay, self.backoff_max)
+                if delay >= deadline - time.monotonic():
+                    logger.warning(
+                        "[http] %s %s returned %s, not retrying: %.2fs wait exceeds the call deadline",
+                        method, host, resp.status_code, delay,
+                    )
+                    return resp
+                logger.warning(
+                    "[http] %s %s returned %s, retrying in %.2fs", method, host, resp.status_code, delay
+                )
+                resp.close()
+
+            attempt += 1
+            with self._stats_lock:
+                self._stats[host].retries += 1
+            time.sleep(delay)
+            if isinstance(timeout, (int, float)):
+                # The retry must also finish before the deadline.
+                kwargs["timeout"] = max(0.1, min(timeout, deadline - time.monotonic()))
+
+    def stats(self) -> dict[str, dict]:
+        with self._stats_lock:
+            return {host: s.as_dict() for host, s in self._stats.items()}
+
+    def _backoff(self, attempt: int) -> float:
+        delay = self.backoff_factor * (2**attempt)
+        return min(self.backoff_max, delay * random.uniform(0.5, 1.5))
+
+    def _record(self, host: str, start: float, status: int | None):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info("[Perf] outbound %s | status=%s | took %.2fms", host, status, elapsed_ms)
+        with self._stats_lock:
+            s = self._stats.setdefault(host, HostStats())
+            s.requests += 1
+            s.total_ms += elapsed_ms
+            s.max_ms = max(s.max_ms, elapsed_ms)
+            s.last_status = status
+            if status is None or status >= 500:
+                s.errors += 1
+
+
+def _retry_after(resp: requests.Response) -> float | None:
+    """
+    Seconds to wait according to the response: the `Retry-After` header
+    (delta-seconds or HTTP-date), or Discord's `retry_after` JSON field.
+    """
+    header = resp.headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+        try:
+            when = email.utils.parsedate_to_datetime(header)
+        except (TypeError, ValueError):
+            when = None
+        if when is not None:
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=timezone.utc)
+            return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+    if resp.status_code == RATE_LIMITED_STATUS:
+        try:
+            return max(0.0, float(resp.json()["retry_after"]))
+        except (ValueError, KeyError, TypeError):
+            pass
+    return None
+
+
+_client: HttpClient | None = None
+_client_pid: int | None = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """
+    Get the client for the current process, creating it on first use.
+    Recreated after a fork so workers don't share sockets with the master.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = HttpClient()
+            _client_pid = os.getpid()
+        return _client
+
+
+def get_http_client_stats() -> dict[str, dict]:
+    """Per-host stats of this process's client (empty before first use)."""
+    client = _client
+    if client is None or _client_pid != os.getpid():
+        return {}
+    return client.stats()
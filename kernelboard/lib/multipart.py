@@ -0,0 +1,60 @@
+"""
+Streaming multipart/form-data bodies for forwarding uploads upstream.
+
+`requests` builds `files=` bodies in memory, copying the whole upload once
+more. MultipartFileStream instead exposes a file-like body (`read` and
+`__len__`) that requests/urllib3 send in blocks with a Content-Length, so
+the upload is read straight from the spooled file while it is sent.
+"""
+
+import io
+import os
+import uuid
+
+
+class MultipartFileStream:
+    """A multipart/form-data body with a single file part."""
+
+    def __init__(self, field: str, filename: str, fileobj, content_type: str, boundary: str | None = None):
+        self.boundary = boundary or uuid.uuid4().hex
+        head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{_quote(field)}"; filename="{_quote(filename)}"\r\n'
+            f"Content-Type: {content_type}\r\n"
+            "\r\n"
+        ).encode("utf-8")
+        tail = f"\r\n--{self.boundary}--\r\n".encode("ascii")
+
+        fileobj.seek(0, os.SEEK_END)
+        file_size = fileobj.tell()
+        fileobj.seek(0)
+
+        self._parts = [io.BytesIO(head), fileobj, io.BytesIO(tail)]
+        self._length = len(head) + file_size + len(tail)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to `size` bytes (everything left if negative). Returns b""
+        only once every part is exhausted.
+        """
+        chunks = []
+        while self._parts and (size < 0 or size > 0):
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
@@ -0,0 +1,310 @@
+"""
+Per-leaderboard participant index (`leaderboard.participant`) for the user
+typeahead of `/api/leaderboard/<id>/users`.
+
+One row per (leaderboard_id, user_id) with at least one submission, plus a
+copy of the user's name. Statement-level triggers on `leaderboard.submission`
+and `leaderboard.user_info` keep it current, so a search no longer scans and
+de-duplicates every submission of the leaderboard. Names are matched on
+`lower(user_name)` with a pg_trgm GIN index (substring matches) and a
+text_pattern_ops btree (prefix matches); without the pg_trgm extension only
+the btree is created and substring searches fall back to a filtered scan of
+the leaderboard's participants.
+
+Empty queries and one- or two-character prefixes, which make up most
+typeahead traffic, are answered from a small in-process LRU.
+
+Management commands (run with the app's environment):
+
+    flask --app kernelboard participants install   # idempotent, backfills on first install
+    flask --app kernelboard participants rebuild
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import click
+import psycopg2
+from flask.cli import AppGroup
+
+from kernelboard.lib.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Serializes concurrent installs (e.g. several release dynos).
+_INSTALL_LOCK_KEY = 7_301_003
+
+# In-process search cache: entries, lifetime, and the longest query cached.
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL_SECONDS = 30
+SEARCH_CACHE_MAX_QUERY_LENGTH = 2
+
+_CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS leaderboard.participant (
+        leaderboard_id  INTEGER NOT NULL,
+        user_id         TEXT NOT NULL,
+        user_name       TEXT,
+        PRIMARY KEY (leaderboard_id, user_id)
+    );
+    CREATE INDEX IF NOT EXISTS participant_name_prefix_idx
+        ON leaderboard.participant (leaderboard_id, lower(user_name) text_pattern_ops);
+    CREATE INDEX IF NOT EXISTS participant_user_idx
+        ON leaderboard.participant (user_id);
+
+    -- Lookup the delete path needs to stay cheap.
+    CREATE INDEX IF NOT EXISTS submission_leaderboard_user_idx
+        ON leaderboard.submission (leaderboard_id, user_id);
+"""
+
+_CREATE_TRGM_INDEX_SQL = """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS participant_name_trgm_idx
+        ON leaderboard.participant USING GIN (lower(user_name) gin_trgm_ops);
+"""
+
+_CREATE_FUNCTIONS_SQL = """
+    CREATE OR REPLACE FUNCTION leaderboard.participant_on_submission_change()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO leaderboard.participant (leaderboard_id, user_id, user_name)
+            SELECT DISTINCT n.leaderboard_id, n.user_id, u.user_name
+            FROM new_submissions n
+            JOIN leaderboard.user_info u ON u.id = n.user_id
+            ON CONFLICT DO NOTHING;
+        END IF;
+
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM leaderboard.participant p
+            USING (SELECT DISTINCT leaderboard_id, user_id FROM old_submissions) o
+            WHERE p.leaderboard_id = o.leaderboard_id
+                AND p.user_id = o.user_id
+                AND NOT EXISTS (
+                    SELECT 1 FROM leaderboard.submission s
+                    WHERE s.leaderboard_id = o.leaderboard_id AND s.user_id = o.user_id
+                );
+        END IF;
+        RETURN NULL;
+    EXCEPTION WHEN OTHERS THEN
+        -- Never block submissions; `participants rebuild` repairs any drift.
+        RAISE WARNING 'participant refresh failed: %', SQLERRM;
+        RETURN NULL;
+    END;
+    $fn$;
+
+    CREATE OR REPLACE FUNCTION leaderboard.participant_on_user_update()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        UPDATE leaderboard.participant p
+        SET user_name = n.user_name
+        FROM new_users n
+        WHERE p.user_id = n.id AND p.user_name IS DISTINCT FROM n.user_name;
+        RETURN NULL;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE WARNING 'participant refresh failed: %', SQLERRM;
+        RETURN NULL;
+    END;
+    $fn$;
+"""
+
+_CREATE_TRIGGERS_SQL = """
+    DROP TRIGGER IF EXISTS participant_submission_insert ON leaderboard.submission;
+    CREATE TRIGGER participant_submission_insert
+        AFTER INSERT ON leaderboard.submission
+        REFERENCING NEW TABLE AS new_submissions
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.participant_on_submission_change();
+
+    DROP TRIGGER IF EXISTS participant_submission_update ON leaderboard.submission;
+    CREATE TRIGGER participant_submission_update
+        AFTER UPDATE ON leaderboard.submission
+        REFERENCING OLD TABLE AS old_submissions NEW TABLE AS new_submissions
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.participant_on_submission_change();
+
+    DROP TRIGGER IF EXISTS participant_submission_delete ON leaderboard.submission;
+    CREATE TRIGGER participant_submission_delete
+        AFTER DELETE ON leaderboard.submission
+        REFERENCING OLD TABLE AS old_submissions
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.participant_on_submission_change();
+
+    DROP TRIGGER IF EXISTS participant_user_update ON leaderboard.user_info;
+    CREATE TRIGGER participant_user_update
+        AFTER UPDATE ON leaderboard.user_info
+        REFERENCING NEW TABLE AS new_users
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.participant_on_user_update();
+"""
+
+_REBUILD_SQL = """
+    INSERT INTO leaderboard.participant (leaderboard_id, user_id, user_name)
+    SELECT DISTINCT s.leaderboard_id, s.user_id, u.user_name
+    FROM leaderboard.submission s
+    JOIN leaderboard.user_info u ON u.id = s.user_id
+"""
+
+# Exact matches first, then prefix matches, then other substring matches.
+_SEARCH_SQL = """
+    SELECT user_id, user_name
+    FROM leaderboard.participant
+    WHERE leaderboard_id = %(leaderboard_id)s
+        AND lower(user_name) LIKE %(contains)s
+    ORDER BY
+        lower(user_name) = %(query)s DESC,
+        lower(user_name) LIKE %(prefix)s DESC,
+        lower(user_name),
+        user_name
+    LIMIT %(limit)s
+"""
+
+_LIST_SQL = """
+    SELECT user_id, user_name
+    FROM leaderboard.participant
+    WHERE leaderboard_id = %(leaderboard_id)s
+    ORDER BY user_name
+    LIMIT %(limit)s
+"""
+
+
+def install(conn) -> bool:
+    """
+    Create the table, indexes, functions and triggers (idempotent).
+    Backfills the table when it is created for the first time. The trigram
+    index is skipped, with a warning, if pg_trgm can't be installed.
+
+    Returns True if the table was newly created and backfilled.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (_INSTALL_LOCK_KEY,))
+        cur.execute("SELECT to_regclass('leaderboard.participant') IS NULL")
+        created = cur.fetchone()[0]
+
+        cur.execute(_CREATE_TABLE_SQL)
+        cur.execute("SAVEPOINT participant_trgm")
+        try:
+            cur.execute(_CREATE_TRGM_INDEX_SQL)
+        except psycopg2.Error as e:
+            cur.execute("ROLLBACK TO SAVEPOINT participant_trgm")
+            logger.warning("[participants] pg_trgm unavailable, substring search is unindexed: %s", e)
+        cur.execute(_CREATE_FUNCTIONS_SQL)
+        cur.execute(_CREATE_TRIGGERS_SQL)
+
+        if created:
+            cur.execute(_REBUILD_SQL)
+            logger.info("[participants] created and backfilled %d rows", cur.rowcount)
+    conn.commit()
+    return created
+
+
+def rebuild(conn) -> int:
+    """
+    Recompute the participant table from submissions in a single
+    transaction. Returns the number of rows written.
+    """
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE leaderboard.participant IN EXCLUSIVE MODE")
+        cur.execute("DELETE FROM leaderboard.participant")
+        cur.execute(_REBUILD_SQL)
+        written = cur.rowcount
+    conn.commit()
+    return written
+
+
+def search(conn, leaderboard_id: int, query: str, limit: int) -> tuple[list[dict], bool]:
+    """
+    Participants of a leaderboard whose name contains `query`
+    (case-insensitive), exact and prefix matches first; all participants
+    by name for an empty query. Returns `(users, cache_hit)`.
+    """
+    query = query.lower()
+    cacheable = len(query) <= SEARCH_CACHE_MAX_QUERY_LENGTH
+    key = (leaderboard_id, query, limit)
+    if cacheable:
+        cached = _search_cache.get(key)
+        if cached is not None:
+            return cached, True
+
+    with conn.cursor() as cur:
+        if query:
+            escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            cur.execute(
+                _SEARCH_SQL,
+                {
+                    "leaderboard_id": leaderboard_id,
+                    "query": query,
+                    "contains": f"%{escaped}%",
+                    "prefix": f"{escaped}%",
+                    "limit": limit,
+                },
+            )
+        else:
+            cur.execute(_LIST_SQL, {"leaderboard_id": leaderboard_id, "limit": limit})
+        rows = cur.fetchall()
+
+    users = [{"user_id": str(user_id), "username": user_name or str(user_id)} for user_id, user_name in rows]
+    if cacheable:
+        _search_cache.put(key, users)
+    return users, False
+
+
+class _LRUCache:
+    """Thread-safe LRU with a per-entry lifetime."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_search_cache = _LRUCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SECONDS)
+
+
+# =============================================================================
+# Flask CLI
+# =============================================================================
+
+participants_cli = AppGroup("participants", help="Manage the participant search index.")
+
+
+@participants_cli.command("install")
+def install_command():
+    """Create table, indexes, functions and triggers; backfill on first install."""
+    start = time.perf_counter()
+    created = install(get_db_connection())
+    click.echo(
+        f"participants installed ({'created and backfilled' if created else 'already present'}) "
+        f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+    )
+
+
+@participants_cli.command("rebuild")
+def rebuild_command():
+    """Recompute the participant table from submissions."""
+    start = time.perf_counter()
+    written = rebuild(get_db_connection())
+    click.echo(f"participants rebuilt: {written} rows in {(time.perf_counter() - start) * 1000:.0f}ms")
@@ -0,0 +1,461 @@
+"""
+Materialized per-user personal bests (`leaderboard.personal_best`).
+
+One row per (leaderboard_id, runner, user_id) holding the user's best passed,
+non-secret run on that GPU type plus their total submission count there. The
+table is kept up to date by statement-level triggers on `leaderboard.runs` and
+`leaderboard.submission`, so readers never have to re-rank every run.
+
+Those tables are written by kernelbot, so a trigger error is caught and
+raised as a Postgres WARNING instead of failing its inserts; the table may
+then drift until `check` reports it and `rebuild` repairs it.
+
+Management commands (run with the app's environment):
+
+    flask --app kernelboard personal-best install   # idempotent, backfills on first install
+    flask --app kernelboard personal-best rebuild [--leaderboard-id ID ...]
+    flask --app kernelboard personal-best check [--leaderboard-id ID ...]
+"""
+
+import logging
+import sys
+import time
+
+import click
+from flask.cli import AppGroup
+
+from kernelboard.lib.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Serializes concurrent installs (e.g. several release dynos).
+_INSTALL_LOCK_KEY = 7_301_001
+
+_CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS leaderboard.personal_best (
+        leaderboard_id    INTEGER NOT NULL,
+        runner            TEXT NOT NULL,
+        user_id           TEXT NOT NULL,
+        run_id            INTEGER NOT NULL,
+        submission_id     INTEGER NOT NULL,
+        score             NUMERIC NOT NULL,
+        submission_time   TIMESTAMPTZ NOT NULL,
+        file_name         TEXT,
+        submission_count  INTEGER NOT NULL,
+        updated_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (leaderboard_id, runner, user_id)
+    );
+    CREATE INDEX IF NOT EXISTS personal_best_leaderboard_score_idx
+        ON leaderboard.personal_best (leaderboard_id, runner, score);
+
+    -- Bumped whenever a (leaderboard, runner)'s personal bests are refreshed.
+    -- Readers use it as a cache version: the row lock orders the bumps by
+    -- commit, which a timestamp column does not.
+    CREATE TABLE IF NOT EXISTS leaderboard.personal_best_version (
+        leaderboard_id  INTEGER NOT NULL,
+        runner          TEXT NOT NULL,
+        version         BIGINT NOT NULL DEFAULT 1,
+        PRIMARY KEY (leaderboard_id, runner)
+    );
+
+    -- Lookups the refresh function needs to stay cheap per key.
+    CREATE INDEX IF NOT EXISTS submission_leaderboard_user_idx
+        ON leaderboard.submission (leaderboard_id, user_id);
+    CREATE INDEX IF NOT EXISTS runs_submission_runner_idx
+        ON leaderboard.runs (submission_id, runner);
+"""
+
+# Best run per key, ties broken by earliest submission then lowest run id.
+# Expects a `submission_counts` CTE restricted to the keys being written.
+_BEST_RUNS_SELECT = """
+    SELECT DISTINCT ON (s.leaderboard_id, r.runner, s.user_id)
+        s.leaderboard_id,
+        r.runner,
+        s.user_id,
+        r.id,
+        s.id,
+        r.score,
+        s.submission_time,
+        s.file_name,
+        sc.submission_count,
+        NOW()
+    FROM leaderboard.runs r
+    JOIN leaderboard.submission s ON r.submission_id = s.id
+    JOIN submission_counts sc
+        ON sc.leaderboard_id = s.leaderboard_id
+        AND sc.runner = r.runner
+        AND sc.user_id = s.user_id
+    WHERE NOT r.secret AND r.score IS NOT NULL AND r.passed
+    ORDER BY s.leaderboard_id, r.runner, s.user_id,
+        r.score ASC, s.submission_time ASC, r.id ASC
+"""
+
+_INSERT_COLUMNS = """
+    INSERT INTO leaderboard.personal_best (
+        leaderboard_id, runner, user_id, run_id, submission_id, score,
+        submission_time, file_name, submission_count, updated_at
+    )
+"""
+
+_CREATE_FUNCTIONS_SQL = (
+    """
+    CREATE OR REPLACE FUNCTION leaderboard.personal_best_refresh(
+        p_leaderboard_ids INTEGER[],
+        p_runners TEXT[],
+        p_user_ids TEXT[]
+    ) RETURNS VOID
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        IF p_leaderboard_ids IS NULL OR cardinality(p_leaderboard_ids) = 0 THEN
+            RETURN;
+        END IF;
+
+        -- Serialize refreshes of the same key so concurrent writers always
+        -- recompute from each other's committed runs. Taken in key order to
+        -- avoid deadlocks.
+        PERFORM pg_advisory_xact_lock(
+            hashtext(format('personal_best:%s:%s:%s', k.leaderboard_id, k.runner, k.user_id))
+        )
+        FROM (
+            SELECT DISTINCT leaderboard_id, runner, user_id
+            FROM unnest(p_leaderboard_ids, p_runners, p_user_ids)
+                AS k(leaderboard_id, runner, user_id)
+            ORDER BY 1, 2, 3
+        ) k;
+
+        DELETE FROM leaderboard.personal_best pb
+        USING unnest(p_leaderboard_ids, p_runners, p_user_ids)
+            AS k(leaderboard_id, runner, user_id)
+        WHERE pb.leaderboard_id = k.leaderboard_id
+            AND pb.runner = k.runner
+            AND pb.user_id = k.user_id;
+
+        WITH keys AS (
+            SELECT DISTINCT leaderboard_id, runner, user_id
+            FROM unnest(p_leaderboard_ids, p_runners, p_user_ids)
+                AS k(leaderboard_id, runner, user_id)
+        ),
+        submission_counts AS (
+            SELECT k.leaderboard_id, k.runner, k.user_id,
+                COUNT(DISTINCT s.id) AS submission_count
+            FROM keys k
+            JOIN leaderboard.submission s
+                ON s.leaderboard_id = k.leaderboard_id AND s.user_id = k.user_id
+            JOIN leaderboard.runs r
+                ON r.submission_id = s.id AND r.runner = k.runner
+            GROUP BY k.leaderboard_id, k.runner, k.user_id
+        )
+    """
+    + _INSERT_COLUMNS
+    + _BEST_RUNS_SELECT
+    + """;
+
+        INSERT INTO leaderboard.personal_best_version AS v (leaderboard_id, runner)
+        SELECT DISTINCT leaderboard_id, runner
+        FROM unnest(p_leaderboard_ids, p_runners) AS k(leaderboard_id, runner)
+        ORDER BY 1, 2
+        ON CONFLICT (leaderboard_id, runner) DO UPDATE SET version = v.version + 1;
+    END;
+    $fn$;
+
+    CREATE OR REPLACE FUNCTION leaderboard.personal_best_on_runs_change()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql AS $fn$
+    DECLARE
+        lb_ids INTEGER[];
+        runners TEXT[];
+        user_ids TEXT[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(s.leaderboard_id), array_agg(r.runner), array_agg(s.user_id)
+            INTO lb_ids, runners, user_ids
+            FROM (SELECT DISTINCT submission_id, runner FROM new_runs) r
+            JOIN leaderboard.submission s ON s.id = r.submission_id;
+        ELSIF TG_OP = 'UPDATE' THEN
+            SELECT array_agg(s.leaderboard_id), array_agg(r.runner), array_agg(s.user_id)
+            INTO lb_ids, runners, user_ids
+            FROM (
+                SELECT submission_id, runner FROM new_runs
+                UNION
+                SELECT submission_id, runner FROM old_runs
+            ) r
+            JOIN leaderboard.submission s ON s.id = r.submission_id;
+        ELSE
+            SELECT array_agg(s.leaderboard_id), array_agg(r.runner), array_agg(s.user_id)
+            INTO lb_ids, runners, user_ids
+            FROM (SELECT DISTINCT submission_id, runner FROM old_runs) r
+            JOIN leaderboard.submission s ON s.id = r.submission_id;
+        END IF;
+
+        PERFORM leaderboard.personal_best_refresh(lb_ids, runners, user_ids);
+        RETURN NULL;
+    EXCEPTION WHEN OTHERS THEN
+        -- Never block run ingestion; `personal-best check` reports any drift.
+        RAISE WARNING 'personal_best refresh failed: %', SQLERRM;
+        RETURN NULL;
+    END;
+    $fn$;
+
+    CREATE OR REPLACE FUNCTION leaderboard.personal_best_on_submission_update()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql AS $fn$
+    DECLARE
+        lb_ids INTEGER[];
+        runners TEXT[];
+        user_ids TEXT[];
+    BEGIN
+        SELECT array_agg(k.leaderboard_id), array_agg(k.runner), array_agg(k.user_id)
+        INTO lb_ids, runners, user_ids
+        FROM (
+            SELECT o.leaderboard_id, r.runner, o.user_id
+            FROM old_submissions o
+            JOIN new_submissions n ON n.id = o.id
+            JOIN leaderboard.runs r ON r.submission_id = o.id
+            WHERE o.leaderboard_id IS DISTINCT FROM n.leaderboard_id
+                OR o.user_id IS DISTINCT FROM n.user_id
+            UNION
+            SELECT n.leaderboard_id, r.runner, n.user_id
+            FROM old_submissions o
+            JOIN new_submissions n ON n.id = o.id
+            JOIN leaderboard.runs r ON r.submission_id = n.id
+            WHERE o.leaderboard_id IS DISTINCT FROM n.leaderboard_id
+                OR o.user_id IS DISTINCT FROM n.user_id
+        ) k;
+
+        PERFORM leaderboard.personal_best_refresh(lb_ids, runners, user_ids);
+        RETURN NULL;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE WARNING 'personal_best refresh failed: %', SQLERRM;
+        RETURN NULL;
+    END;
+    $fn$;
+    """
+)
+
+_CREATE_TRIGGERS_SQL = """
+    DROP TRIGGER IF EXISTS personal_best_runs_insert ON leaderboard.runs;
+    CREATE TRIGGER personal_best_runs_insert
+        AFTER INSERT ON leaderboard.runs
+        REFERENCING NEW TABLE AS new_runs
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.personal_best_on_runs_change();
+
+    DROP TRIGGER IF EXISTS personal_best_runs_update ON leaderboard.runs;
+    CREATE TRIGGER personal_best_runs_update
+        AFTER UPDATE ON leaderboard.runs
+        REFERENCING OLD TABLE AS old_runs NEW TABLE AS new_runs
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.personal_best_on_runs_change();
+
+    DROP TRIGGER IF EXISTS personal_best_runs_delete ON leaderboard.runs;
+    CREATE TRIGGER personal_best_runs_delete
+        AFTER DELETE ON leaderboard.runs
+        REFERENCING OLD TABLE AS old_runs
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.personal_best_on_runs_change();
+
+    DROP TRIGGER IF EXISTS personal_best_submission_update ON leaderboard.submission;
+    CREATE TRIGGER personal_best_submission_update
+        AFTER UPDATE ON leaderboard.submission
+        REFERENCING OLD TABLE AS old_submissions NEW TABLE AS new_submissions
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.personal_best_on_submission_update();
+"""
+
+_REBUILD_SQL = (
+    """
+    WITH submission_counts AS (
+        SELECT s.leaderboard_id, r.runner, s.user_id,
+            COUNT(DISTINCT s.id) AS submission_count
+        FROM leaderboard.submission s
+        JOIN leaderboard.runs r ON r.submission_id = s.id
+        WHERE %(leaderboard_ids)s::INTEGER[] IS NULL
+            OR s.leaderboard_id = ANY(%(leaderboard_ids)s::INTEGER[])
+        GROUP BY s.leaderboard_id, r.runner, s.user_id
+    )
+    """
+    + _INSERT_COLUMNS
+    + _BEST_RUNS_SELECT
+)
+
+# Bump the versions of rebuilt leaderboards; add any (leaderboard, runner)
+# that has personal bests but no version yet.
+_BUMP_VERSIONS_SQL = """
+    UPDATE leaderboard.personal_best_version
+    SET version = version + 1
+    WHERE %(leaderboard_ids)s::INTEGER[] IS NULL
+        OR leaderboard_id = ANY(%(leaderboard_ids)s::INTEGER[]);
+
+    INSERT INTO leaderboard.personal_best_version (leaderboard_id, runner)
+    SELECT DISTINCT leaderboard_id, runner
+    FROM leaderboard.personal_best
+    WHERE %(leaderboard_ids)s::INTEGER[] IS NULL
+        OR leaderboard_id = ANY(%(leaderboard_ids)s::INTEGER[])
+    ON CONFLICT DO NOTHING;
+"""
+
+# The ranking CTE the readers used before personal_best existed. Used only by
+# `check` to verify the materialized rows.
+_REFERENCE_SQL = """
+    WITH
+    submission_counts AS (
+        SELECT s.leaderboard_id, s.user_id, r.runner, COUNT(DISTINCT s.id) AS submission_count
+        FROM leaderboard.submission s
+        JOIN leaderboard.runs r ON r.submission_id = s.id
+        WHERE %(leaderboard_ids)s::INTEGER[] IS NULL
+            OR s.leaderboard_id = ANY(%(leaderboard_ids)s::INTEGER[])
+        GROUP BY s.leaderboard_id, s.user_id, r.runner
+    ),
+    ranked_runs AS (
+        SELECT s.leaderboard_id,
+            r.runner,
+            s.user_id,
+            r.score,
+            COALESCE(sc.submission_count, 0) AS submission_count,
+            RANK() OVER (
+                PARTITION BY s.leaderboard_id, r.runner, s.user_id
+                ORDER BY r.score ASC
+            ) AS rank
+        FROM leaderboard.runs r
+        JOIN leaderboard.submission s ON r.submission_id = s.id
+        LEFT JOIN submission_counts sc
+            ON sc.leaderboard_id = s.leaderboard_id
+            AND sc.user_id = s.user_id
+            AND sc.runner = r.runner
+        WHERE NOT r.secret AND r.score IS NOT NULL AND r.passed
+            AND (%(leaderboard_ids)s::INTEGER[] IS NULL
+                OR s.leaderboard_id = ANY(%(leaderboard_ids)s::INTEGER[]))
+    )
+    SELECT DISTINCT leaderboard_id, runner, user_id, score, submission_count
+    FROM ranked_runs
+    WHERE rank = 1
+"""
+
+
+def install(conn) -> bool:
+    """
+    Create the table, refresh function and triggers (idempotent). Backfills
+    the table when it is created for the first time.
+
+    Returns True if the table was newly created and backfilled.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (_INSTALL_LOCK_KEY,))
+        cur.execute("SELECT to_regclass('leaderboard.personal_best') IS NULL")
+        created = cur.fetchone()[0]
+
+        cur.execute(_CREATE_TABLE_SQL)
+        cur.execute(_CREATE_FUNCTIONS_SQL)
+        cur.execute(_CREATE_TRIGGERS_SQL)
+
+        if created:
+            cur.execute(_REBUILD_SQL, {"leaderboard_ids": None})
+            logger.info("[personal_best] created and backfilled %d rows", cur.rowcount)
+        cur.execute(_BUMP_VERSIONS_SQL, {"leaderboard_ids": None})
+    conn.commit()
+    return created
+
+
+def rebuild(conn, leaderboard_ids: list[int] | None = None) -> int:
+    """
+    Recompute personal bests from scratch, for all leaderboards or only the
+    given ones. Runs in a single transaction. Returns the number of rows written.
+    """
+    with conn.cursor() as cur:
+        if leaderboard_ids is None:
+            cur.execute("LOCK TABLE leaderboard.personal_best IN EXCLUSIVE MODE")
+            cur.execute("DELETE FROM leaderboard.personal_best")
+        else:
+            cur.execute(
+                "DELETE FROM leaderboard.personal_best WHERE leaderboard_id = ANY(%s)",
+                (leaderboard_ids,),
+            )
+        cur.execute(_REBUILD_SQL, {"leaderboard_ids": leaderboard_ids})
+        written = cur.rowcount
+        cur.execute(_BUMP_VERSIONS_SQL, {"leaderboard_ids": leaderboard_ids})
+    conn.commit()
+    return written
+
+
+def check(conn, leaderboard_ids: list[int] | None = None) -> list[dict]:
+    """
+    Compare personal_best against the ranking CTE it replaces.
+
+    Returns a list of mismatches, each a dict with the key, and the
+    `expected` (CTE) and `actual` (table) (score, submission_count) values.
+    A user tied with themselves on their best score is expected once.
+    """
+    params = {"leaderboard_ids": leaderboard_ids}
+    with conn.cursor() as cur:
+        cur.execute(_REFERENCE_SQL, params)
+        expected = {
+            (lb_id, runner, user_id): (score, count)
+            for lb_id, runner, user_id, score, count in cur.fetchall()
+        }
+        cur.execute(
+            """
+            SELECT leaderboard_id, runner, user_id, score, submission_count
+            FROM leaderboard.personal_best
+            WHERE %(leaderboard_ids)s::INTEGER[] IS NULL
+                OR leaderboard_id = ANY(%(leaderboard_ids)s::INTEGER[])
+            """,
+            params,
+        )
+        actual = {
+            (lb_id, runner, user_id): (score, count)
+            for lb_id, runner, user_id, score, count in cur.fetchall()
+        }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        if expected.get(key) != actual.get(key):
+            lb_id, runner, user_id = key
+            mismatches.append({
+                "leaderboard_id": lb_id,
+                "runner": runner,
+                "user_id": user_id,
+                "expected": expected.get(key),
+                "actual": actual.get(key),
+            })
+    return mismatches
+
+
+# =============================================================================
+# Flask CLI
+# =============================================================================
+
+personal_best_cli = AppGroup("personal-best", help="Manage the materialized personal_best table.")
+
+
+@personal_best_cli.command("install")
+def install_command():
+    """Create table, functions and triggers; backfill on first install."""
+    start = time.perf_counter()
+    created = install(get_db_connection())
+    click.echo(
+        f"personal_best installed ({'created and backfilled' if created else 'already present'}) "
+        f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+    )
+
+
+@personal_best_cli.command("rebuild")
+@click.option("--leaderboard-id", "leaderboard_ids", type=int, multiple=True,
+              help="Only rebuild these leaderboards (repeatable).")
+def rebuild_command(leaderboard_ids):
+    """Recompute personal bests from the runs table."""
+    start = time.perf_counter()
+    written = rebuild(get_db_connection(), list(leaderboard_ids) or None)
+    click.echo(f"personal_best rebuilt: {written} rows in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+@personal_best_cli.command("check")
+@click.option("--leaderboard-id", "leaderboard_ids", type=int, multiple=True,
+              help="Only check these leaderboards (repeatable).")
+def check_command(leaderboard_ids):
+    """Verify personal_best against the full ranking CTE. Exits 1 on drift."""
+    mismatches = check(get_db_connection(), list(leaderboard_ids) or None)
+    for m in mismatches:
+        click.echo(
+            f"leaderboard={m['leaderboard_id']} runner={m['runner']} user={m['user_id']} "
+            f"expected={m['expected']} actual={m['actual']}"
+        )
+    if mismatches:
+        click.echo(f"{len(mismatches)} mismatch(es) found; run `personal-best rebuild` to fix")
+        sys.exit(1)
+    click.echo("personal_best is consistent")
@@ -0,0 +1,405 @@
+"""
+Persisted fastest-submission history (`leaderboard.record_history`).
+
+One row per run that set a new record on its (leaderboard_id, runner) when it
+was submitted: its score beats every passed, non-secret run submitted before
+it (ordered by submission time, then run id). The rows of a key are the
+"world record" line of `/api/leaderboard/<id>/fastest_trend`, so readers
+never have to walk all runs.
+
+A statement-level trigger on `leaderboard.runs` appends new records as runs
+are inserted. A run submitted before the latest record (runs finish out of
+order) is slotted in and drops the later records it beats. Updated or
+deleted runs, and submissions moved between leaderboards, recompute the
+affected keys.
+
+Management commands (run with the app's environment):
+
+    flask --app kernelboard record-history install   # idempotent, backfills on first install
+    flask --app kernelboard record-history backfill [--leaderboard-id ID ...]
+    flask --app kernelboard record-history check [--leaderboard-id ID ...]
+"""
+
+import logging
+import sys
+import time
+
+import click
+from flask.cli import AppGroup
+
+from kernelboard.lib.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Serializes concurrent installs (e.g. several release dynos).
+_INSTALL_LOCK_KEY = 7_301_002
+
+_CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS leaderboard.record_history (
+        leaderboard_id   INTEGER NOT NULL,
+        runner           TEXT NOT NULL,
+        submission_time  TIMESTAMPTZ NOT NULL,
+        run_id           INTEGER NOT NULL,
+        submission_id    INTEGER NOT NULL,
+        score            NUMERIC NOT NULL,
+        recorded_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (leaderboard_id, runner, submission_time, run_id)
+    );
+"""
+
+# Runs that count towards records; `unknown` runners are never charted.
+_ELIGIBLE_RUNS = """
+    NOT r.secret AND r.passed AND r.score IS NOT NULL
+        AND r.runner NOT IN ('', 'unknown')
+"""
+
+# Records from scratch: runs beating the best score submitted before them.
+# Expects a `scope` CTE of (leaderboard_id, runner) keys; NULL runner matches
+# every runner of the leaderboard.
+_RECORDS_SELECT = (
+    """
+    SELECT leaderboard_id, runner, submission_time, run_id, submission_id, score
+    FROM (
+        SELECT s.leaderboard_id,
+            r.runner,
+            s.submission_time,
+            r.id AS run_id,
+            s.id AS submission_id,
+            r.score,
+            MIN(r.score) OVER (
+                PARTITION BY s.leaderboard_id, r.runner
+                ORDER BY s.submission_time, r.id
+                ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+            ) AS previous_best
+        FROM leaderboard.runs r
+        JOIN leaderboard.submission s ON r.submission_id = s.id
+        JOIN scope k
+            ON k.leaderboard_id = s.leaderboard_id
+            AND (k.runner IS NULL OR k.runner = r.runner)
+        WHERE """
+    + _ELIGIBLE_RUNS
+    + """
+    ) c
+    WHERE previous_best IS NULL OR score < previous_best
+"""
+)
+
+_INSERT_COLUMNS = """
+    INSERT INTO leaderboard.record_history (
+        leaderboard_id, runner, submission_time, run_id, submission_id, score
+    )
+"""
+
+_CREATE_FUNCTIONS_SQL = (
+    """
+    CREATE OR REPLACE FUNCTION leaderboard.record_history_refresh(
+        p_leaderboard_ids INTEGER[],
+        p_runners TEXT[]
+    ) RETURNS VOID
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        IF p_leaderboard_ids IS NULL OR cardinality(p_leaderboard_ids) = 0 THEN
+            RETURN;
+        END IF;
+
+        PERFORM pg_advisory_xact_lock(
+            hashtext(format('record_history:%s:%s', k.leaderboard_id, k.runner))
+        )
+        FROM (
+            SELECT DISTINCT leaderboard_id, runner
+            FROM unnest(p_leaderboard_ids, p_runners) AS k(leaderboard_id, runner)
+            ORDER BY 1, 2
+        ) k;
+
+        DELETE FROM leaderboard.record_history h
+        USING unnest(p_leaderboard_ids, p_runners) AS k(leaderboard_id, runner)
+        WHERE h.leaderboard_id = k.leaderboard_id AND h.runner = k.runner;
+
+        WITH scope AS (
+            SELECT DISTINCT leaderboard_id, runner
+            FROM unnest(p_leaderboard_ids, p_runners) AS k(leaderboard_id, runner)
+        )
+    """
+    + _INSERT_COLUMNS
+    + _RECORDS_SELECT
+    + """;
+    END;
+    $fn$;
+
+    CREATE OR REPLACE FUNCTION leaderboard.record_history_on_runs_change()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql AS $fn$
+    DECLARE
+        lb_ids INTEGER[];
+        runners TEXT[];
+        rec RECORD;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            -- Key order keeps advisory locks deadlock-free; submission order
+            -- lets each run see the records of the ones before it.
+            FOR rec IN
+                SELECT s.leaderboard_id, r.runner, s.submission_time,
+                    r.id AS run_id, s.id AS submission_id, r.score
+                FROM new_runs r
+                JOIN leaderboard.submission s ON s.id = r.submission_id
+                WHERE """
+    + _ELIGIBLE_RUNS
+    + """
+                ORDER BY s.leaderboard_id, r.runner, s.submission_time, r.id
+            LOOP
+                PERFORM pg_advisory_xact_lock(
+                    hashtext(format('record_history:%s:%s', rec.leaderboard_id, rec.runner))
+                );
+
+                CONTINUE WHEN EXISTS (
+                    SELECT 1 FROM leaderboard.record_history h
+                    WHERE h.leaderboard_id = rec.leaderboard_id
+                        AND h.runner = rec.runner
+                        AND (h.submission_time, h.run_id) < (rec.submission_time, rec.run_id)
+                        AND h.score <= rec.score
+                );
+
+                INSERT INTO leaderboard.record_history (
+                    leaderboard_id, runner, submission_time, run_id, submission_id, score
+                ) VALUES (
+                    rec.leaderboard_id, rec.runner, rec.submission_time,
+                    rec.run_id, rec.submission_id, rec.score
+                );
+
+                -- Submitted earlier than existing records: they no longer
+                -- count if this run is at least as fast.
+                DELETE FROM leaderboard.record_history h
+                WHERE h.leaderboard_id = rec.leaderboard_id
+                    AND h.runner = rec.runner
+                    AND (h.submission_time, h.run_id) > (rec.submission_time, rec.run_id)
+                    AND h.score >= rec.score;
+            END LOOP;
+            RETURN NULL;
+        ELSIF TG_OP = 'UPDATE' THEN
+            SELECT array_agg(s.leaderboard_id), array_agg(r.runner)
+            INTO lb_ids, runners
+            FROM (
+                SELECT submission_id, runner FROM new_runs
+                UNION
+                SELECT submission_id, runner FROM old_runs
+            ) r
+            JOIN leaderboard.submission s ON s.id = r.submission_id;
+        ELSE
+            SELECT array_agg(s.leaderboard_id), array_agg(r.runner)
+            INTO lb_ids, runners
+            FROM (SELECT DISTINCT submission_id, runner FROM old_runs) r
+            JOIN leaderboard.submission s ON s.id = r.submission_id;
+        END IF;
+
+        PERFORM leaderboard.record_history_refresh(lb_ids, runners);
+        RETURN NULL;
+    EXCEPTION WHEN OTHERS THEN
+        -- Never block run ingestion; `record-history check` reports any drift.
+        RAISE WARNING 'record_history refresh failed: %', SQLERRM;
+        RETURN NULL;
+    END;
+    $fn$;
+
+    CREATE OR REPLACE FUNCTION leaderboard.record_history_on_submission_update()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql AS $fn$
+    DECLARE
+        lb_ids INTEGER[];
+        runners TEXT[];
+    BEGIN
+        SELECT array_agg(k.leaderboard_id), array_agg(k.runner)
+        INTO lb_ids, runners
+        FROM (
+            SELECT o.leaderboard_id, r.runner
+            FROM old_submissions o
+            JOIN new_submissions n ON n.id = o.id
+            JOIN leaderboard.runs r ON r.submission_id = o.id
+            WHERE o.leaderboard_id IS DISTINCT FROM n.leaderboard_id
+                OR o.submission_time IS DISTINCT FROM n.submission_time
+            UNION
+            SELECT n.leaderboard_id, r.runner
+            FROM old_submissions o
+            JOIN new_submissions n ON n.id = o.id
+            JOIN leaderboard.runs r ON r.submission_id = n.id
+            WHERE o.leaderboard_id IS DISTINCT FROM n.leaderboard_id
+                OR o.submission_time IS DISTINCT FROM n.submission_time
+        ) k;
+
+        PERFORM leaderboard.record_history_refresh(lb_ids, runners);
+        RETURN NULL;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE WARNING 'record_history refresh failed: %', SQLERRM;
+        RETURN NULL;
+    END;
+    $fn$;
+    """
+)
+
+_CREATE_TRIGGERS_SQL = """
+    DROP TRIGGER IF EXISTS record_history_runs_insert ON leaderboard.runs;
+    CREATE TRIGGER record_history_runs_insert
+        AFTER INSERT ON leaderboard.runs
+        REFERENCING NEW TABLE AS new_runs
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.record_history_on_runs_change();
+
+    DROP TRIGGER IF EXISTS record_history_runs_update ON leaderboard.runs;
+    CREATE TRIGGER record_history_runs_update
+        AFTER UPDATE ON leaderboard.runs
+        REFERENCING OLD TABLE AS old_runs NEW TABLE AS new_runs
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.record_history_on_runs_change();
+
+    DROP TRIGGER IF EXISTS record_history_runs_delete ON leaderboard.runs;
+    CREATE TRIGGER record_history_runs_delete
+        AFTER DELETE ON leaderboard.runs
+        REFERENCING OLD TABLE AS old_runs
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.record_history_on_runs_change();
+
+    DROP TRIGGER IF EXISTS record_history_submission_update ON leaderboard.submission;
+    CREATE TRIGGER record_history_submission_update
+        AFTER UPDATE ON leaderboard.submission
+        REFERENCING OLD TABLE AS old_submissions NEW TABLE AS new_submissions
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.record_history_on_submission_update();
+"""
+
+_SCOPE_SQL = """
+    WITH scope AS (
+        SELECT id AS leaderboard_id, NULL::TEXT AS runner
+        FROM leaderboard.leaderboard
+        WHERE %(leaderboard_ids)s::INTEGER[] IS NULL
+            OR id = ANY(%(leaderboard_ids)s::INTEGER[])
+    )
+"""
+
+_BACKFILL_SQL = _SCOPE_SQL + _INSERT_COLUMNS + _RECORDS_SELECT
+
+
+def install(conn) -> bool:
+    """
+    Create the table, refresh functions and triggers (idempotent). Backfills
+    the table when it is created for the first time.
+
+    Returns True if the table was newly created and backfilled.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (_INSTALL_LOCK_KEY,))
+        cur.execute("SELECT to_regclass('leaderboard.record_history') IS NULL")
+        created = cur.fetchone()[0]
+
+        cur.execute(_CREATE_TABLE_SQL)
+        cur.execute(_CREATE_FUNCTIONS_SQL)
+        cur.execute(_CREATE_TRIGGERS_SQL)
+
+        if created:
+            cur.execute(_BACKFILL_SQL, {"leaderboard_ids": None})
+            logger.info("[record_history] created and backfilled %d rows", cur.rowcount)
+    conn.commit()
+    return created
+
+
+def backfill(conn, leaderboard_ids: list[int] | None = None) -> int:
+    """
+    Recompute the record history from the runs table, for all leaderboards
+    or only the given ones. Runs in a single transaction. Returns the number
+    of rows written.
+    """
+    with conn.cursor() as cur:
+        if leaderboard_ids is None:
+            cur.execute("LOCK TABLE leaderboard.record_history IN EXCLUSIVE MODE")
+            cur.execute("DELETE FROM leaderboard.record_history")
+        else:
+            cur.execute(
+                "DELETE FROM leaderboard.record_history WHERE leaderboard_id = ANY(%s)",
+                (leaderboard_ids,),
+            )
+        cur.execute(_BACKFILL_SQL, {"leaderboard_ids": leaderboard_ids})
+        written = cur.rowcount
+    conn.commit()
+    return written
+
+
+def check(conn, leaderboard_ids: list[int] | None = None) -> list[dict]:
+    """
+    Compare record_history against the records recomputed from the runs.
+
+    Returns a list of mismatches, each a dict with the key and the
+    `expected` (recomputed) and `actual` (table) run ids, in order.
+    """
+    params = {"leaderboard_ids": leaderboard_ids}
+    with conn.cursor() as cur:
+        cur.execute(_SCOPE_SQL + _RECORDS_SELECT + " ORDER BY submission_time, run_id", params)
+        expected = _run_ids_by_key(cur.fetchall())
+        cur.execute(
+            """
+            SELECT leaderboard_id, runner, submission_time, run_id
+            FROM leaderboard.record_history
+            WHERE %(leaderboard_ids)s::INTEGER[] IS NULL
+                OR leaderboard_id = ANY(%(leaderboard_ids)s::INTEGER[])
+            ORDER BY submission_time, run_id
+            """,
+            params,
+        )
+        actual = _run_ids_by_key(cur.fetchall())
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        if expected.get(key) != actual.get(key):
+            lb_id, runner = key
+            mismatches.append({
+                "leaderboard_id": lb_id,
+                "runner": runner,
+                "expected": expected.get(key),
+                "actual": actual.get(key),
+            })
+    return mismatches
+
+
+def _run_ids_by_key(rows) -> dict[tuple[int, str], list[int]]:
+    by_key = {}
+    for lb_id, runner, _, run_id, *_ in rows:
+        by_key.setdefault((lb_id, runner), []).append(run_id)
+    return by_key
+
+
+# =============================================================================
+# Flask CLI
+# =============================================================================
+
+record_history_cli = AppGroup("record-history", help="Manage the persisted record_history table.")
+
+
+@record_history_cli.command("install")
+def install_command():
+    """Create table, functions and triggers; backfill on first install."""
+    start = time.perf_counter()
+    created = install(get_db_connection())
+    click.echo(
+        f"record_history installed ({'created and backfilled' if created else 'already present'}) "
+        f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+    )
+
+
+@record_history_cli.command("backfill")
+@click.option("--leaderboard-id", "leaderboard_ids", type=int, multiple=True,
+              help="Only backfill these leaderboards (repeatable).")
+def backfill_command(leaderboard_ids):
+    """Recompute the record history from the runs table."""
+    start = time.perf_counter()
+    written = backfill(get_db_connection(), list(leaderboard_ids) or None)
+    click.echo(f"record_history backfilled: {written} rows in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+@record_history_cli.command("check")
+@click.option("--leaderboard-id", "leaderboard_ids", type=int, multiple=True,
+              help="Only check these leaderboards (repeatable).")
+def check_command(leaderboard_ids):
+    """Verify record_history against the runs table. Exits 1 on drift."""
+    mismatches = check(get_db_connection(), list(leaderboard_ids) or None)
+    for m in mismatches:
+        click.echo(
+            f"leaderboard={m['leaderboard_id']} runner={m['runner']} "
+            f"expected={m['expected']} actual={m['actual']}"
+        )
+    if mismatches:
+        click.echo(f"{len(mismatches)} mismatch(es) found; run `record-history backfill` to fix")
+        sys.exit(1)
+    click.echo("record_history is consistent")
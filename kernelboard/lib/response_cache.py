@@ -0,0 +1,108 @@
+"""
+Whole-response cache: pre-serialized, compressed JSON bodies in Redis.
+
+A body is stored as the raw-deflate compression of everything but a small
+dynamic suffix (e.g. the `now` timestamp), ended with a full flush. Serving
+compresses the suffix as a separate deflate stream, appends it and wraps
+both in one gzip member (the CRC is extended with `zlib.crc32(suffix, crc)`),
+so a request costs one Redis round trip and a few bytes of compression. The
+stored part is only inflated for clients that don't accept gzip.
+
+Each entry has a hard TTL (the Redis expiry) and a `:fresh` marker with a
+soft TTL. Once the marker is gone, expired or deleted by `invalidate()`,
+the entry is still served while the caller rebuilds it.
+"""
+
+import logging
+import struct
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Whole /api/leaderboard-summaries response
+SUMMARIES_RESPONSE_KEY = "lb_summaries:response"
+
+COMPRESS_LEVEL = 6
+
+# Fixed 10-byte gzip header: deflate, no flags, no mtime, unknown OS
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+# etag length, then crc32 and length of the uncompressed prefix
+_ENTRY_HEADER = struct.Struct(">HII")
+
+
+class CachedResponse:
+    """A compressed body prefix plus its ETag."""
+
+    __slots__ = ("etag", "crc", "size", "deflated")
+
+    def __init__(self, etag: str, crc: int, size: int, deflated: bytes):
+        self.etag = etag
+        self.crc = crc
+        self.size = size
+        self.deflated = deflated
+
+    @classmethod
+    def from_prefix(cls, prefix: bytes, etag: str) -> "CachedResponse":
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        # A full flush ends on a byte boundary without references past it,
+        # so another raw deflate stream can be appended.
+        deflated = compressor.compress(prefix) + compressor.flush(zlib.Z_FULL_FLUSH)
+        return cls(etag, zlib.crc32(prefix), len(prefix), deflated)
+
+    @classmethod
+    def unpack(cls, value: bytes) -> "CachedResponse":
+        etag_len, crc, size = _ENTRY_HEADER.unpack_from(value)
+        start = _ENTRY_HEADER.size
+        etag = value[start:start + etag_len].decode("ascii")
+        return cls(etag, crc, size, value[start + etag_len:])
+
+    def pack(self) -> bytes:
+        etag = self.etag.encode("ascii")
+        return _ENTRY_HEADER.pack(len(etag), self.crc, self.size & 0xFFFFFFFF) + etag + self.deflated
+
+    def gzip(self, suffix: bytes) -> bytes:
+        """The full body (prefix + suffix) as a single gzip member."""
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        tail = compressor.compress(suffix) + compressor.flush()
+        trailer = struct.pack("<II", zlib.crc32(suffix, self.crc), (self.size + len(suffix)) & 0xFFFFFFFF)
+        return _GZIP_HEADER + self.deflated + tail + trailer
+
+    def body(self, suffix: bytes) -> bytes:
+        """The full, uncompressed body."""
+        return zlib.decompressobj(-zlib.MAX_WBITS).decompress(self.deflated) + suffix
+
+
+def load(redis_conn, key: str) -> tuple[CachedResponse | None, bool]:
+    """Return `(entry, fresh)`; entry is None when missing or on errors."""
+    if not redis_conn:
+        return None, False
+    try:
+        value, fresh = redis_conn.mget(key, f"{key}:fresh")
+    except Exception:
+        logger.warning("Redis response cache read failed", exc_info=True)
+        return None, False
+    if value is None:
+        return None, False
+    return CachedResponse.unpack(value), fresh is not None
+
+
+def store(redis_conn, key: str, entry: CachedResponse, soft_ttl: int, hard_ttl: int):
+    if not redis_conn:
+        return
+    try:
+        pipe = redis_conn.pipeline()
+        pipe.set(key, entry.pack(), ex=hard_ttl)
+        pipe.set(f"{key}:fresh", 1, ex=soft_ttl)
+        pipe.execute()
+    except Exception:
+        logger.warning("Redis response cache write failed", exc_info=True)
+
+
+def invalidate(redis_conn, key: str):
+    """Mark the entry stale; it keeps being served until rebuilt."""
+    if not redis_conn:
+        return
+    try:
+        redis_conn.delete(f"{key}:fresh")
+    except Exception:
+        logger.warning("Redis response cache invalidation failed", exc_info=True)
@@ -0,0 +1,338 @@
+"""
+Live scoreboard fan-out.
+
+- ScoreboardWatcher: exactly one process (elected through a Redis lock)
+  polls a cheap per-(leaderboard, gpu_type) version of the active
+  leaderboards' rankings in leaderboard.personal_best. For each ranking that
+  changed it publishes a diff on the Redis channel `scoreboard:{id}` and
+  stores the full ranking under `scoreboard:state:{id}` for new viewers.
+- ScoreboardHub: each web process holds a single Redis pub/sub subscription
+  and fans messages out to the local SSE streams (`/api/leaderboard/live`).
+
+DB load therefore depends on the number of changed rankings, not on the
+number of viewers. The watcher only polls while some process reports
+viewers (`scoreboard:viewers`).
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from flask import Flask, current_app
+
+from kernelboard.lib import response_cache
+from kernelboard.lib.db import get_db_pool
+from kernelboard.lib.redis_connection import get_redis_connection
+from kernelboard.lib.response_cache import SUMMARIES_RESPONSE_KEY
+
+logger = logging.getLogger(__name__)
+
+HUB_EXTENSION_KEY = "kernelboard_scoreboard"
+
+CHANNEL_PREFIX = "scoreboard:"
+STATE_KEY_PREFIX = "scoreboard:state:"
+LOCK_KEY = "scoreboard:watcher"
+VIEWERS_KEY = "scoreboard:viewers"
+
+# Serialises hub creation between a worker's request threads.
+_hub_lock = threading.Lock()
+
+# Full rankings are kept for new viewers; refreshed on every change.
+STATE_TTL_SECONDS = 3600
+
+_VERSIONS_SQL = """
+    SELECT v.leaderboard_id, v.runner, v.version
+    FROM leaderboard.personal_best_version v
+    JOIN leaderboard.leaderboard l ON l.id = v.leaderboard_id
+    WHERE l.deadline > NOW() OR l.deadline IS NULL
+"""
+
+_RANKINGS_SQL = """
+    SELECT pb.leaderboard_id,
+        pb.runner,
+        pb.user_id,
+        u.user_name,
+        pb.score,
+        pb.submission_id,
+        pb.submission_time,
+        pb.file_name,
+        pb.submission_count,
+        ROW_NUMBER() OVER (
+            PARTITION BY pb.leaderboard_id, pb.runner
+            ORDER BY pb.score ASC, pb.submission_time ASC
+        ) AS rank
+    FROM leaderboard.personal_best pb
+    LEFT JOIN leaderboard.user_info u ON pb.user_id = u.id
+    WHERE (pb.leaderboard_id, pb.runner) IN (
+        SELECT * FROM unnest(%s::INTEGER[], %s::TEXT[])
+    )
+    ORDER BY pb.leaderboard_id, pb.runner, rank
+"""
+
+
+def diff_rankings(previous: list[dict] | None, current: list[dict]) -> dict:
+    """
+    Diff two rankings (lists of entries keyed by `user_id`).
+
+    Returns `{"reset": bool, "upserts": [...], "removed": [user_id, ...]}`.
+    Without a previous ranking, the diff is a reset carrying every entry.
+    """
+    if previous is None:
+        return {"reset": True, "upserts": current, "removed": []}
+
+    prev_by_user = {e["user_id"]: e for e in previous}
+    curr_users = {e["user_id"] for e in current}
+    return {
+        "reset": False,
+        "upserts": [e for e in current if prev_by_user.get(e["user_id"]) != e],
+        "removed": [uid for uid in prev_by_user if uid not in curr_users],
+    }
+
+
+class ScoreboardWatcher:
+    """
+    Detects ranking changes and publishes diffs. Every process may run one;
+    only the holder of the Redis lock does any work.
+    """
+
+    def __init__(self, app: Flask, redis_conn, poll_interval: float = 2.0):
+        self.app = app
+        self.redis = redis_conn
+        self.poll_interval = poll_interval
+        self.lock_ttl = max(5, int(poll_interval * 3))
+
+        self._token = uuid.uuid4().hex
+        # (leaderboard_id, gpu_type) -> version / ranking last published
+        self._versions: dict[tuple[int, str], int] = {}
+        self._rankings: dict[tuple[int, str], list[dict]] = {}
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="scoreboard-watcher", daemon=True
+            )
+            self._thread.start()
+
+    def tick(self) -> int:
+        """
+        Run one detection cycle if this process is the leader and anybody is
+        watching. Returns the number of rankings published.
+        """
+        if not self.redis.exists(VIEWERS_KEY):
+            return 0
+        if not self._acquire_leadership():
+            # Another process publishes; start from scratch if we take over.
+            self._versions.clear()
+            self._rankings.clear()
+            return 0
+
+        pool = get_db_pool(self.app)
+        conn = pool.getconn()
+        discard = False
+        try:
+            with conn.cursor() as cur:
+                cur.execute(_VERSIONS_SQL)
+                versions = {(r[0], r[1]): r[2] for r in cur.fetchall()}
+
+                changed = [k for k, v in versions.items() if self._versions.get(k) != v]
+                rankings = self._fetch_rankings(cur, changed) if changed else {}
+            conn.rollback()
+        except Exception:
+            discard = True
+            raise
+        finally:
+            pool.putconn(conn, discard=discard)
+
+        for key in changed:
+            self._publish(key, versions[key], rankings.get(key, []))
+        if changed:
+            # Top users shown on the home page may have changed too
+            response_cache.invalidate(self.redis, SUMMARIES_RESPONSE_KEY)
+
+        # Forget leaderboards that ended or lost their rankings.
+        for key in set(self._versions) - set(versions):
+            del self._versions[key]
+            self._rankings.pop(key, None)
+
+        return len(changed)
+
+    def _fetch_rankings(self, cur, keys: list[tuple[int, str]]) -> dict:
+        cur.execute(_RANKINGS_SQL, ([k[0] for k in keys], [k[1] for k in keys]))
+        rankings: dict[tuple[int, str], list[dict]] = {}
+        for row in cur.fetchall():
+            rankings.setdefault((row[0], row[1]), []).append(
+                {
+                    "user_id": str(row[2]),
+                    "user_name": row[3],
+                    "score": _to_float(row[4]),
+                    "submission_id": row[5],
+                    "submission_time": row[6].isoformat() if row[6] else None,
+                    "file_name": row[7],
+                    "submission_count": row[8],
+                    "rank": row[9],
+                }
+            )
+        return rankings
+
+    def _publish(self, key: tuple[int, str], version: int, ranking: list[dict]):
+        leaderboard_id, gpu_type = key
+        diff = diff_rankings(self._rankings.get(key), ranking)
+        message = {
+            "leaderboard_id": leaderboard_id,
+            "gpu_type": gpu_type,
+            "total": len(ranking),
+            **diff,
+        }
+        state = {"leaderboard_id": leaderboard_id, "gpu_type": gpu_type, "ranking": ranking}
+
+        pipe = self.redis.pipeline()
+        pipe.hset(f"{STATE_KEY_PREFIX}{leaderboard_id}", gpu_type, json.dumps(state))
+        pipe.expire(f"{STATE_KEY_PREFIX}{leaderboard_id}", STATE_TTL_SECONDS)
+        pipe.publish(f"{CHANNEL_PREFIX}{leaderboard_id}", json.dumps(message))
+        pipe.execute()
+
+        self._versions[key] = version
+        self._rankings[key] = ranking
+
+    def _acquire_leadership(self) -> bool:
+        if self.redis.set(LOCK_KEY, self._token, nx=True, ex=self.lock_ttl):
+            logger.info("[scoreboard] this process is now the scoreboard watcher")
+            return True
+        holder = self.redis.get(LOCK_KEY)
+        if holder is not None and holder.decode("utf-8") == self._token:
+            self.redis.expire(LOCK_KEY, self.lock_ttl)
+            return True
+        return False
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.tick()
+            except Exception:
+                logger.warning("[scoreboard] watcher tick failed", exc_info=True)
+
+
+class ScoreboardHub:
+    """
+    Per-process Redis subscription shared by all local live-scoreboard
+    streams. Subscribers get the decoded diff messages of the leaderboards
+    they asked for.
+    """
+
+    def __init__(self, app: Flask, redis_conn, poll_interval: float = 2.0):
+        self.redis = redis_conn
+        self.watcher = ScoreboardWatcher(app, redis_conn, poll_interval)
+        self.viewers_ttl = max(10, int(poll_interval * 5))
+
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        # leaderboard_id -> subscriber queues
+        self._subscribers: dict[int, set[queue.Queue]] = {}
+        self._thread: threading.Thread | None = None
+
+    def subscribe(self, leaderboard_ids: list[int]) -> queue.Queue:
+        q: queue.Queue = queue.Queue()
+        with self._lock:
+            for lb_id in leaderboard_ids:
+                self._subscribers.setdefault(lb_id, set()).add(q)
+            self._ensure_listener()
+        self._mark_viewers()
+        self.watcher.start()
+        return q
+
+    def unsubscribe(self, leaderboard_ids: list[int], q: queue.Queue):
+        with self._lock:
+            for lb_id in leaderboard_ids:
+                subscribers = self._subscribers.get(lb_id)
+                if subscribers is None:
+                    continue
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[lb_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(set().union(*self._subscribers.values())) if self._subscribers else 0
+
+    def get_states(self, leaderboard_ids: list[int]) -> list[dict]:
+        """Latest full rankings published by the watcher, for new viewers."""
+        pipe = self.redis.pipeline()
+        for lb_id in leaderboard_ids:
+            pipe.hgetall(f"{STATE_KEY_PREFIX}{lb_id}")
+        states = []
+        for by_gpu in pipe.execute():
+            states.extend(json.loads(by_gpu[gpu]) for gpu in sorted(by_gpu))
+        return states
+
+    def dispatch(self, message: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(message["leaderboard_id"], ()))
+        for q in subscribers:
+            q.put(message)
+
+    def _mark_viewers(self):
+        try:
+            self.redis.set(VIEWERS_KEY, 1, ex=self.viewers_ttl)
+        except Exception:
+            logger.warning("[scoreboard] failed to mark viewers", exc_info=True)
+
+    def _ensure_listener(self):
+        # call with self._lock held
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._listen, name="scoreboard-listener", daemon=True
+        )
+        self._thread.start()
+
+    def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if self.subscriber_count():
+                        self._mark_viewers()
+                    if message is None or message["type"] != "pmessage":
+                        continue
+                    self.dispatch(json.loads(message["data"]))
+            except Exception:
+                logger.warning("[scoreboard] pub/sub listener failed, reconnecting", exc_info=True)
+                time.sleep(1.0)
+            finally:
+                pubsub.close()
+
+
+def get_scoreboard_hub(app: Flask | None = None) -> ScoreboardHub | None:
+    """
+    Get the hub for the current process, creating it on first use. Returns
+    None when Redis is not configured.
+    """
+    app = app or current_app._get_current_object()
+    hub = app.extensions.get(HUB_EXTENSION_KEY)
+    if hub is not None and hub._pid == os.getpid():
+        return hub
+    with _hub_lock:
+        hub = app.extensions.get(HUB_EXTENSION_KEY)
+        if hub is None or hub._pid != os.getpid():
+            redis_conn = get_redis_connection(cert_reqs=os.getenv("REDIS_SSL_CERT_REQS"))
+            if redis_conn is None:
+                return None
+            hub = ScoreboardHub(app, redis_conn, poll_interval=app.config["SCOREBOARD_POLL_INTERVAL"])
+            app.extensions[HUB_EXTENSION_KEY] = hub
+    return hub
+
+
+def _to_float(value):
+    return float(value) if isinstance(value, Decimal) else value
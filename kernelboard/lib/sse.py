@@ -0,0 +1,57 @@
+"""
+Helpers for Server-Sent Events endpoints.
+
+Streams are bounded by SSE_MAX_DURATION (below gunicorn's worker timeout)
+and rely on EventSource reconnecting, using the `retry:` hint sent first.
+Under gunicorn's `sync` worker class an open stream holds a whole worker,
+so the default bound drops to SSE_SYNC_MAX_DURATION there.
+"""
+
+import json
+import os
+from typing import Callable, Iterable
+
+from flask import Response
+
+# Reconnect delay hint for EventSource clients, in milliseconds
+SSE_RETRY_MS = 3000
+
+# Default stream lifetimes, in seconds (overridden by SSE_MAX_DURATION)
+SSE_DEFAULT_MAX_DURATION = 25
+SSE_SYNC_MAX_DURATION = 2
+
+KEEPALIVE_COMMENT = ": keep-alive\n\n"
+
+
+def default_max_duration() -> float:
+    """
+    Default SSE_MAX_DURATION: short when gunicorn runs one request per
+    worker (GUNICORN_WORKER_CLASS=sync, see gunicorn.conf.py).
+    """
+    if os.getenv("GUNICORN_WORKER_CLASS", "gthread") == "sync":
+        return SSE_SYNC_MAX_DURATION
+    return SSE_DEFAULT_MAX_DURATION
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(stream: Iterable[str], on_close: Callable[[], None] | None = None) -> Response:
+    """
+    Wrap a generator of SSE chunks in a streaming response. `on_close` runs
+    when the server closes the response, even if the stream never started.
+    """
+
+    def _with_retry_hint():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        yield from stream
+
+    response = Response(
+        _with_retry_hint(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    if on_close is not None:
+        response.call_on_close(on_close)
+    return response
@@ -1,6 +1,8 @@
+import json
+from datetime import datetime
 from http import HTTPStatus
 
-from flask import jsonify
+from flask import current_app, jsonify, request
 
 
 class HttpError(Exception):
@@ -19,8 +21,113 @@ def make_response(data=None, message="Success", code=0, status_code=HTTPStatus.O
     return jsonify({"code": code, "message": message, "data": data}), int(status_code)
 
 
-def http_success(data=None, message="Success"):
-    return make_response(data=data, message=message, code=0, status_code=HTTPStatus.OK)
+def http_success(
+    data=None,
+    message="Success",
+    etag: bool | str = False,
+    last_modified: datetime | None = None,
+    max_age: int | None = None,
+):
+    """
+    Success response. Pass `etag=True` to derive a strong ETag from the
+    response body, or a string (e.g. a data version) to use as the ETag, and
+    optionally `last_modified`; the response is then answered with
+    `304 Not Modified` when the request's validators still match.
+
+    Conditional responses must be revalidated on every use unless `max_age`
+    (seconds) is given, in which case clients may reuse them until it expires.
+    """
+    response, status_code = make_response(
+        data=data, message=message, code=0, status_code=HTTPStatus.OK
+    )
+    if etag or last_modified:
+        return _make_conditional(response, etag, last_modified, max_age)
+    return response, status_code
+
+
+def http_success_json(
+    data_json: str,
+    message="Success",
+    etag: bool | str = False,
+    last_modified: datetime | None = None,
+    max_age: int | None = None,
+):
+    """
+    Like http_success, but `data_json` is an already-serialized JSON value
+    (e.g. read from a cache), so it is spliced into the envelope as-is.
+    """
+    body = f"{envelope_prefix()}{data_json}{envelope_suffix(message)}"
+    return http_success_raw(body, etag=etag, last_modified=last_modified, max_age=max_age)
+
+
+def http_success_raw(
+    body: str | bytes,
+    etag: bool | str = False,
+    last_modified: datetime | None = None,
+    max_age: int | None = None,
+    content_encoding: str | None = None,
+):
+    """
+    Success response from a complete, already-serialized envelope (built
+    with envelope_prefix() / envelope_suffix()), optionally already
+    compressed with `content_encoding`.
+    """
+    response = current_app.response_class(body, mimetype="application/json")
+    if content_encoding:
+        response.content_encoding = content_encoding
+    if etag or last_modified:
+        return _make_conditional(response, etag, last_modified, max_age)
+    return response, int(HTTPStatus.OK)
+
+
+def envelope_prefix() -> str:
+    """Serialized success envelope up to the `data` value."""
+    return '{"code":0,"data":'
+
+
+def envelope_suffix(message="Success") -> str:
+    """Serialized success envelope after the `data` value."""
+    return f',"message":{json.dumps(message)}}}\n'
+
+
+def check_not_modified(etag: str, max_age: int | None = None):
+    """
+    Return a `304 Not Modified` response if the request's If-None-Match
+    already holds `etag`, else None. Lets handlers that know their data
+    version up front skip building the body entirely.
+    """
+    if not request.if_none_match.contains(etag):
+        return None
+    response = current_app.response_class(status=HTTPStatus.NOT_MODIFIED)
+    response.set_etag(etag)
+    _set_cache_control(response, max_age)
+    return response, int(HTTPStatus.NOT_MODIFIED)
+
+
+def _make_conditional(
+    response,
+    etag: bool | str,
+    last_modified: datetime | None,
+    max_age: int | None,
+):
+    if etag is True:
+        response.add_etag()
+    elif etag:
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    _set_cache_control(response, max_age)
+    response.make_conditional(request)
+    return response, response.status_code
+
+
+def _set_cache_control(response, max_age: int | None):
+    if max_age is None:
+        # Let browsers keep the payload but revalidate it on every use.
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
 
 
 def http_error(
@@ -0,0 +1,237 @@
+"""
+Per-process fan-out of submission status changes for the SSE endpoint
+(`/api/submissions/<id>/events`).
+
+Instead of every connected client polling the database, a single background
+thread per worker process polls the status of all *currently watched*
+submissions in one query and pushes changed states to the subscribers'
+queues. The thread only runs queries while at least one client is
+subscribed.
+"""
+
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+
+from flask import Flask, current_app
+
+from kernelboard.lib.db import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Key under app.extensions holding the process-wide hub.
+HUB_EXTENSION_KEY = "kernelboard_submission_events"
+
+# Serialises hub creation between a worker's request threads.
+_hub_lock = threading.Lock()
+
+# Job statuses after which nothing about the submission changes any more.
+TERMINAL_STATUSES = ("succeeded", "failed", "timed_out")
+
+_STATES_SQL = """
+    SELECT
+        s.id,
+        s.done,
+        j.status,
+        j.error,
+        j.last_heartbeat,
+        COALESCE(
+            (
+            SELECT jsonb_agg(
+                jsonb_build_object(
+                    'mode', r.mode,
+                    'runner', r.runner,
+                    'passed', r.passed,
+                    'score', r.score,
+                    'start_time', r.start_time,
+                    'end_time', r.end_time
+                )
+                ORDER BY r.start_time
+            )
+            FROM leaderboard.runs AS r
+            WHERE r.submission_id = s.id AND r.secret = false
+            ),
+            '[]'::jsonb
+        ) AS runs
+    FROM leaderboard.submission AS s
+    LEFT JOIN leaderboard.submission_job_status AS j
+      ON j.submission_id = s.id
+    WHERE s.id = ANY(%s)
+"""
+
+
+def fetch_submission_states(conn, submission_ids: list[int]) -> dict[int, dict]:
+    """
+    Fetch the lightweight status of each submission: job status, heartbeat
+    and run summaries (no result/compilation blobs).
+    """
+    with conn.cursor() as cur:
+        cur.execute(_STATES_SQL, (list(submission_ids),))
+        rows = cur.fetchall()
+
+    return {
+        row[0]: {
+            "submission_id": row[0],
+            "submission_done": bool(row[1]),
+            "status": row[2],
+            "error": row[3],
+            "last_heartbeat": _isoformat(row[4]),
+            "runs": row[5] or [],
+        }
+        for row in rows
+    }
+
+
+def is_finished(state: dict) -> bool:
+    return state["submission_done"] or state["status"] in TERMINAL_STATUSES
+
+
+def diff_events(previous: dict | None, state: dict) -> list[tuple[str, dict]]:
+    """
+    SSE events (name, payload) describing what changed from `previous` to
+    `state`. Everything is reported when there is no previous state.
+    """
+    events = []
+    if previous is None or any(
+        previous[k] != state[k] for k in ("status", "error", "submission_done")
+    ):
+        events.append(
+            (
+                "status",
+                {
+                    "submission_id": state["submission_id"],
+                    "status": state["status"],
+                    "error": state["error"],
+                    "submission_done": state["submission_done"],
+                },
+            )
+        )
+    if previous is None or previous["runs"] != state["runs"]:
+        events.append(
+            ("runs", {"submission_id": state["submission_id"], "runs": state["runs"]})
+        )
+    if previous is None or previous["last_heartbeat"] != state["last_heartbeat"]:
+        events.append(
+            (
+                "heartbeat",
+                {
+                    "submission_id": state["submission_id"],
+                    "last_heartbeat": state["last_heartbeat"],
+                },
+            )
+        )
+    return events
+
+
+class SubmissionEventHub:
+    """
+    Shared poller for submission states. Subscribers receive the full state
+    dict on their queue whenever it changes.
+    """
+
+    def __init__(self, app: Flask, poll_interval: float = 1.0):
+        self.app = app
+        self.poll_interval = poll_interval
+
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        # submission_id -> subscriber queues
+        self._subscribers: dict[int, set[queue.Queue]] = {}
+        # submission_id -> last state seen by the poller
+        self._states: dict[int, dict] = {}
+        self._thread: threading.Thread | None = None
+
+    def subscribe(self, submission_id: int) -> queue.Queue:
+        q: queue.Queue = queue.Queue()
+        with self._cond:
+            self._subscribers.setdefault(submission_id, set()).add(q)
+            self._ensure_thread()
+            self._cond.notify()
+        return q
+
+    def unsubscribe(self, submission_id: int, q: queue.Queue):
+        with self._cond:
+            subscribers = self._subscribers.get(submission_id)
+            if subscribers is None:
+                return
+            subscribers.discard(q)
+            if not subscribers:
+                del self._subscribers[submission_id]
+                self._states.pop(submission_id, None)
+
+    def subscriber_count(self) -> int:
+        with self._cond:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def poll_once(self):
+        """Query all watched submissions once and publish changed states."""
+        with self._cond:
+            submission_ids = list(self._subscribers)
+        if not submission_ids:
+            return
+
+        pool = get_db_pool(self.app)
+        conn = pool.getconn()
+        discard = False
+        try:
+            states = fetch_submission_states(conn, submission_ids)
+            conn.rollback()
+        except Exception:
+            discard = True
+            raise
+        finally:
+            pool.putconn(conn, discard=discard)
+
+        with self._cond:
+            for submission_id, state in states.items():
+                if self._states.get(submission_id) == state:
+                    continue
+                self._states[submission_id] = state
+                for q in self._subscribers.get(submission_id, ()):
+                    q.put(state)
+
+    def _ensure_thread(self):
+        # call with self._cond held
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="submission-events-poller", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._subscribers:
+                    self._cond.wait()
+            try:
+                self.poll_once()
+            except Exception:
+                logger.warning("[submission_events] poll failed", exc_info=True)
+            with self._cond:
+                self._cond.wait(self.poll_interval)
+
+
+def get_submission_event_hub(app: Flask | None = None) -> SubmissionEventHub:
+    """
+    Get the hub for the current process, creating it on first use. Like the
+    connection pool it is created lazily, so each gunicorn worker owns one.
+    """
+    app = app or current_app._get_current_object()
+    hub = app.extensions.get(HUB_EXTENSION_KEY)
+    if hub is not None and hub._pid == os.getpid():
+        return hub
+    with _hub_lock:
+        hub = app.extensions.get(HUB_EXTENSION_KEY)
+        if hub is None or hub._pid != os.getpid():
+            hub = SubmissionEventHub(
+                app, poll_interval=app.config["SUBMISSION_EVENTS_POLL_INTERVAL"]
+            )
+            app.extensions[HUB_EXTENSION_KEY] = hub
+    return hub
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
@@ -2,26 +2,70 @@
 """
 Discord ranking notification worker.
 
-Polls the database every 5 minutes, detects changes in top 3 rankings
-for active leaderboards, and sends Discord webhook notifications to
-congratulate people who move up and trash-talk people who get bumped.
-
-Standalone script -- no Flask dependency. Only needs:
+Detects changes in the top rankings of every GPU type of active leaderboards
+and sends Discord webhook notifications to congratulate people who move up
+and trash-talk people who get bumped.
+
+Rankings are tracked RANKING_DEPTH (default 3) ranks deep; a row in
+leaderboard.ranking_depth overrides that per leaderboard:
+
+    INSERT INTO leaderboard.ranking_depth (leaderboard_id, depth) VALUES (339, 10);
+
+The last notified standings live in leaderboard.ranking_standings, one row
+per (leaderboard, GPU) with the ranks, users and scores as parallel arrays.
+Postgres diffs the fresh ranking against it, so only partitions that changed
+reach Python.
+
+Every POLL_INTERVAL seconds the worker compares the highest run id with the
+high-water mark stored in leaderboard.ranking_watermark (one indexed lookup)
+and, if new runs arrived, re-ranks only the (leaderboard, GPU) partitions
+they touched. Every FULL_REFRESH_INTERVAL seconds it re-ranks everything,
+which also picks up expired deadlines, deleted or rejudged runs, and runs
+that committed out of id order.
+
+By default the continuous worker is event-driven instead: a trigger on
+leaderboard.runs NOTIFYs the ranking_runs channel with the leaderboard id of
+each new scored run, and the worker waits on that channel with select(). A
+cycle starts once a leaderboard has been quiet for DEBOUNCE_SECONDS (or after
+DEBOUNCE_MAX_SECONDS of continuous activity). If the listening connection
+drops, the worker polls every POLL_INTERVAL seconds until it can LISTEN again.
+
+The worker keeps one database connection, reconnecting after failures, and
+runs the ranking query as a server-side prepared statement so Postgres does
+not re-parse it every cycle. Per-statement timing histograms are logged as
+[Perf] lines every STATS_LOG_INTERVAL seconds.
+
+Standalone script -- runs without the Flask app. Only needs:
   - DATABASE_URL (env var)
+  - the leaderboard.personal_best table
+    (`flask --app kernelboard personal-best install`, run on release)
   - DISCORD_RANKING_WEBHOOK_URL (env var)
   - psycopg2-binary (already in requirements.txt)
   - requests (already in requirements.txt)
+
+Upgrading from the ranking_snapshot layout: `python ranking_worker.py
+--migrate` (run on release) copies it into ranking_standings and leaves it
+in place for workers still on the old code. Once none are left, drop it
+with `python ranking_worker.py --migrate --drop-old-snapshot`.
 """
 
 import argparse
+import bisect
+import logging
+import math
 import os
+import random
+import select
 import sys
 import time
-import random
-import logging
+import weakref
+from collections import namedtuple
+from contextlib import contextmanager
+
 import psycopg2
-import requests
-from datetime import datetime, timezone
+from psycopg2.extras import execute_values
+
+from kernelboard.lib.http_client import get_http_client
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,7 +73,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger("ranking_worker")
 
-POLL_INTERVAL = 300  # 5 minutes
+# Compact standings of one (leaderboard, GPU) partition, as stored in a
+# ranking_standings row: parallel lists of ranks, user ids, user names and
+# scores, ordered by rank.
+Standings = namedtuple("Standings", ["ranks", "user_ids", "user_names", "scores"])
+
+POLL_INTERVAL = 5  # seconds between watermark checks
+FULL_REFRESH_INTERVAL = 300  # seconds between full re-rankings
+
+NOTIFY_CHANNEL = "ranking_runs"
+DEBOUNCE_SECONDS = 2  # quiet time on a leaderboard before re-ranking it
+DEBOUNCE_MAX_SECONDS = 15  # upper bound on the delay during a long burst
+LISTEN_RETRY_INTERVAL = 30  # seconds between attempts to LISTEN again
+
+STATS_LOG_INTERVAL = 600  # seconds between statement timing summaries
+TIMING_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Ranks tracked per (leaderboard, GPU); leaderboard.ranking_depth overrides it.
+DEFAULT_DEPTH = int(os.environ.get("RANKING_DEPTH", "3"))
 
 CONGRATS_TEMPLATES = [
     "{mention} just claimed **#{rank}** on **{leaderboard}** ({gpu}) with {score}! Absolutely cracked.",
@@ -38,14 +99,16 @@ CONGRATS_TEMPLATES = [
 ]
 
 TRASH_TALK_TEMPLATES = [
-    "{mention} got bounced from the top 3 on **{leaderboard}**. Skill issue? Probably.",
-    "RIP {mention}'s top 3 spot on **{leaderboard}**. Might want to rethink that kernel.",
-    "{mention} just got evicted from **{leaderboard}** top 3. Back to the drawing board.",
+    "{mention} got bounced from the top {depth} on **{leaderboard}** ({gpu}). Skill issue? Probably.",
+    "RIP {mention}'s top {depth} spot on **{leaderboard}** ({gpu}). Might want to rethink that kernel.",
+    "{mention} just got evicted from **{leaderboard}** ({gpu}) top {depth}. Back to the drawing board.",
 ]
 
 DETHRONE_TEMPLATES = [
-    "{new_mention} just dethroned {old_mention} for **#1** on **{leaderboard}** ({gpu}) with {score}! The crown has a new owner.",
-    "{new_mention} snatches **#1** from {old_mention} on **{leaderboard}** ({gpu}) with {score}. Long live the new king.",
+    "{new_mention} just dethroned {old_mention} for **#1** on **{leaderboard}** ({gpu}) with {score}! "
+    "The crown has a new owner.",
+    "{new_mention} snatches **#1** from {old_mention} on **{leaderboard}** ({gpu}) with {score}. "
+    "Long live the new king.",
     "It's over for {old_mention} — {new_mention} takes **#1** on **{leaderboard}** ({gpu}) with {score}.",
 ]
 
@@ -63,253 +126,617 @@ def mention(user_id):
 def get_connection():
     """Create a fresh DB connection."""
     url = os.environ["DATABASE_URL"]
-    return psycopg2.connect(url)
+    # TCP keepalives let a long-lived connection notice a dead server.
+    return psycopg2.connect(url, keepalives=1, keepalives_idle=60, keepalives_interval=10, keepalives_count=3)
+
+
+class WorkerConnection:
+    """
+    The worker's one long-lived connection. `get()` reconnects if there is
+    no open connection; `recover()` after a failed cycle rolls back, or
+    drops the connection if the rollback fails too.
+    """
+
+    def __init__(self):
+        self._conn = None
+
+    def get(self):
+        if self._conn is None or self._conn.closed:
+            if self._conn is not None:
+                logger.info("Reconnecting to the database")
+            self._conn = get_connection()
+        return self._conn
+
+    def recover(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.rollback()
+        except psycopg2.Error:
+            logger.warning("Database connection unusable, reconnecting on the next cycle")
+            self.close()
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+            self._conn = None
+
+
+class StatementTimings:
+    """
+    Cumulative latency histograms per named statement. Bucket i counts
+    calls that took at most TIMING_BUCKETS_MS[i] milliseconds; the last
+    bucket counts slower ones.
+    """
+
+    def __init__(self, buckets_ms=None):
+        self.buckets_ms = tuple(buckets_ms or TIMING_BUCKETS_MS)
+        self.stats = {}
+
+    @contextmanager
+    def time(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def observe(self, name, elapsed_ms):
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = {
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "buckets": [0] * (len(self.buckets_ms) + 1),
+            }
+        stat["count"] += 1
+        stat["total_ms"] += elapsed_ms
+        stat["max_ms"] = max(stat["max_ms"], elapsed_ms)
+        stat["buckets"][bisect.bisect_left(self.buckets_ms, elapsed_ms)] += 1
+
+    def percentile(self, name, q):
+        """Upper bound (ms) of the bucket holding the q-quantile; inf if past the last bound."""
+        stat = self.stats[name]
+        target = q * stat["count"]
+        seen = 0
+        for bound, count in zip(self.buckets_ms + (math.inf,), stat["buckets"]):
+            seen += count
+            if seen >= target:
+                return bound
+        return math.inf
+
+    def log_summary(self):
+        for name, stat in sorted(self.stats.items()):
+            logger.info(
+                "[Perf] %s: n=%d mean=%.2fms max=%.2fms p50<=%sms p95<=%sms p99<=%sms buckets=%s",
+                name, stat["count"], stat["total_ms"] / stat["count"], stat["max_ms"],
+                self.percentile(name, 0.5), self.percentile(name, 0.95), self.percentile(name, 0.99),
+                " ".join(f"{b}:{n}" for b, n in zip(self.buckets_ms + ("inf",), stat["buckets"]) if n),
+            )
+
+
+timings = StatementTimings()
+
+# Names of the statements prepared in each connection's session. Prepared
+# statements outlive transactions but not the connection.
+_prepared = weakref.WeakKeyDictionary()
+
+
+def _execute_prepared(cur, name, sql, param_types, params):
+    """
+    EXECUTE the server-side prepared statement `name`, preparing it from
+    `sql` (with $1..$n placeholders) the first time on this connection.
+    """
+    names = _prepared.setdefault(cur.connection, set())
+    if name not in names:
+        types = f" ({', '.join(param_types)})" if param_types else ""
+        cur.execute(f"PREPARE {name}{types} AS {sql}")
+        names.add(name)
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
 
 
 def ensure_snapshot_table(conn):
-    """Create ranking_snapshot if it doesn't exist (idempotent)."""
+    """
+    Create ranking_standings, ranking_depth and ranking_watermark if they
+    don't exist (idempotent). A ranking_snapshot table from before the
+    standings layout is left alone; see migrate_snapshot_table.
+    """
     with conn.cursor() as cur:
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS leaderboard.ranking_snapshot (
+            CREATE TABLE IF NOT EXISTS leaderboard.ranking_standings (
                 leaderboard_id  INTEGER NOT NULL,
                 gpu_type        TEXT NOT NULL,
-                rank            INTEGER NOT NULL,
-                user_id         TEXT NOT NULL,
-                user_name       TEXT,
-                score           NUMERIC NOT NULL,
+                ranks           INTEGER[] NOT NULL,
+                user_ids        TEXT[] NOT NULL,
+                user_names      TEXT[] NOT NULL,
+                scores          NUMERIC[] NOT NULL,
                 snapshot_time   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                PRIMARY KEY (leaderboard_id, gpu_type, rank)
+                PRIMARY KEY (leaderboard_id, gpu_type)
+            );
+
+            CREATE TABLE IF NOT EXISTS leaderboard.ranking_depth (
+                leaderboard_id  INTEGER PRIMARY KEY,
+                depth           INTEGER NOT NULL CHECK (depth > 0)
+            );
+
+            CREATE TABLE IF NOT EXISTS leaderboard.ranking_watermark (
+                id              BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                last_run_id     INTEGER NOT NULL,
+                updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
             );
         """)
     conn.commit()
 
 
-RANKING_QUERY = """
-WITH
-priority_gpu AS (
-    SELECT DISTINCT ON (leaderboard_id)
-        leaderboard_id,
-        gpu_type
-    FROM leaderboard.gpu_type
-    ORDER BY leaderboard_id,
-        CASE gpu_type
-            WHEN 'B200' THEN 1
-            WHEN 'H100' THEN 2
-            WHEN 'MI300' THEN 3
-            WHEN 'A100' THEN 4
-            WHEN 'L4'   THEN 5
-            WHEN 'T4'   THEN 6
-            ELSE 7
-        END,
-        gpu_type
-),
+def migrate_snapshot_table(conn, drop=False):
+    """
+    Copy a ranking_snapshot table from before the standings layout into
+    ranking_standings, so existing partitions keep notifying instead of
+    being re-seeded. Partitions already in ranking_standings are kept.
+    Copying is idempotent and leaves the old table for workers still on
+    the old code; `drop` removes it, once none are left.
+
+    Returns the number of partitions copied, or None if there is no
+    ranking_snapshot table.
+    """
+    copied = None
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('leaderboard.ranking_snapshot') IS NOT NULL")
+        if cur.fetchone()[0]:
+            cur.execute("""
+                INSERT INTO leaderboard.ranking_standings
+                    (leaderboard_id, gpu_type, ranks, user_ids, user_names, scores, snapshot_time)
+                SELECT
+                    leaderboard_id,
+                    gpu_type,
+                    array_agg(rank ORDER BY rank),
+                    array_agg(user_id ORDER BY rank),
+                    array_agg(user_name ORDER BY rank),
+                    array_agg(score ORDER BY rank),
+                    MAX(snapshot_time)
+                FROM leaderboard.ranking_snapshot
+                GROUP BY leaderboard_id, gpu_type
+                ON CONFLICT DO NOTHING
+            """)
+            copied = cur.rowcount
+            logger.info("Copied ranking_snapshot into %d ranking_standings partition(s)", copied)
+            if drop:
+                cur.execute("DROP TABLE leaderboard.ranking_snapshot")
+                logger.info("Dropped ranking_snapshot")
+    conn.commit()
+    return copied
+
+
+def ensure_notify_trigger(conn):
+    """
+    Create the trigger that NOTIFYs NOTIFY_CHANNEL with the leaderboard id
+    of every statement's new scored runs (idempotent). Notifications are
+    sent on commit and Postgres folds duplicates within a transaction.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION leaderboard.ranking_notify_runs()
+            RETURNS TRIGGER
+            LANGUAGE plpgsql AS $fn$
+            DECLARE
+                lb_id INTEGER;
+            BEGIN
+                FOR lb_id IN
+                    SELECT DISTINCT s.leaderboard_id
+                    FROM new_runs r
+                    JOIN leaderboard.submission s ON s.id = r.submission_id
+                    WHERE NOT r.secret AND r.score IS NOT NULL AND r.passed
+                LOOP
+                    PERFORM pg_notify('{NOTIFY_CHANNEL}', lb_id::TEXT);
+                END LOOP;
+                RETURN NULL;
+            EXCEPTION WHEN OTHERS THEN
+                -- Never block run inserts; the worker's periodic refresh catches up.
+                RAISE WARNING 'ranking notify failed: %', SQLERRM;
+                RETURN NULL;
+            END;
+            $fn$;
+
+            DROP TRIGGER IF EXISTS ranking_notify_runs_insert ON leaderboard.runs;
+            CREATE TRIGGER ranking_notify_runs_insert
+                AFTER INSERT ON leaderboard.runs
+                REFERENCING NEW TABLE AS new_runs
+                FOR EACH STATEMENT EXECUTE FUNCTION leaderboard.ranking_notify_runs();
+        """)
+    conn.commit()
+
 
+def open_listener():
+    """Open an autocommit connection that LISTENs on NOTIFY_CHANNEL."""
+    conn = get_connection()
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+    return conn
+
+
+def wait_for_notifications(listener, timeout):
+    """
+    Wait up to `timeout` seconds for notifications on the listener.
+    Returns the set of leaderboard ids notified. Raises psycopg2.Error or
+    OSError if the connection is gone.
+    """
+    if listener.closed:
+        raise psycopg2.InterfaceError("listener connection is closed")
+    if select.select([listener], [], [], max(timeout, 0)) == ([], [], []):
+        return set()
+    listener.poll()
+    lb_ids = set()
+    for notify in listener.notifies:
+        try:
+            lb_ids.add(int(notify.payload))
+        except ValueError:
+            logger.warning("Ignoring notification with payload %r", notify.payload)
+    listener.notifies.clear()
+    return lb_ids
+
+
+def _record_notifications(pending, lb_ids, now):
+    """Track (first_seen, last_seen) per notified leaderboard in `pending`."""
+    for lb_id in lb_ids:
+        first_seen, _ = pending.get(lb_id, (now, now))
+        pending[lb_id] = (first_seen, now)
+
+
+def _next_due(pending):
+    """Monotonic time at which the earliest pending leaderboard is due, or None."""
+    if not pending:
+        return None
+    return min(
+        min(last_seen + DEBOUNCE_SECONDS, first_seen + DEBOUNCE_MAX_SECONDS)
+        for first_seen, last_seen in pending.values()
+    )
+
+
+def fetch_watermark(conn):
+    """
+    Returns (last_run_id, max_run_id): the highest run id already ranked
+    (None before the first cycle) and the highest run id in the table.
+    """
+    with conn.cursor() as cur, timings.time("watermark"):
+        _execute_prepared(cur, "ranking_watermark", """
+            SELECT
+                (SELECT last_run_id FROM leaderboard.ranking_watermark),
+                (SELECT MAX(id) FROM leaderboard.runs)
+        """, [], [])
+        return cur.fetchone()
+
+
+def advance_watermark(conn, run_id):
+    """Record that every run up to run_id has been ranked."""
+    if run_id is None:
+        return
+    with conn.cursor() as cur, timings.time("advance_watermark"):
+        cur.execute("""
+            INSERT INTO leaderboard.ranking_watermark (id, last_run_id, updated_at)
+            VALUES (TRUE, %s, NOW())
+            ON CONFLICT (id) DO UPDATE SET
+                last_run_id = GREATEST(ranking_watermark.last_run_id, EXCLUDED.last_run_id),
+                updated_at = EXCLUDED.updated_at
+        """, (run_id,))
+    conn.commit()
+
+
+def fetch_changed_partitions(conn, after_run_id, upto_run_id):
+    """
+    (leaderboard_id, runner) pairs with a new passed, scored, non-secret run
+    in (after_run_id, upto_run_id]. Returns a sorted list of tuples.
+    """
+    with conn.cursor() as cur, timings.time("changed_partitions"):
+        cur.execute("""
+            SELECT DISTINCT s.leaderboard_id, r.runner
+            FROM leaderboard.runs r
+            JOIN leaderboard.submission s ON s.id = r.submission_id
+            WHERE r.id > %s AND r.id <= %s
+                AND NOT r.secret AND r.score IS NOT NULL AND r.passed
+            ORDER BY s.leaderboard_id, r.runner
+        """, (after_run_id, upto_run_id))
+        return cur.fetchall()
+
+
+def fetch_leaderboard_partitions(conn, leaderboard_ids):
+    """
+    Every (leaderboard_id, runner) pair of the given leaderboards that is
+    ranked or has a passed, scored, non-secret run. Returns a sorted list
+    of tuples.
+    """
+    with conn.cursor() as cur, timings.time("leaderboard_partitions"):
+        cur.execute("""
+            SELECT s.leaderboard_id, r.runner
+            FROM leaderboard.runs r
+            JOIN leaderboard.submission s ON s.id = r.submission_id
+            WHERE s.leaderboard_id = ANY(%(ids)s)
+                AND NOT r.secret AND r.score IS NOT NULL AND r.passed
+            UNION
+            SELECT leaderboard_id, gpu_type
+            FROM leaderboard.ranking_standings
+            WHERE leaderboard_id = ANY(%(ids)s)
+            ORDER BY 1, 2
+        """, {"ids": sorted(leaderboard_ids)})
+        return cur.fetchall()
+
+
+def _query_params(partitions, changed_only=True):
+    """Parameters of RANKING_DIFF_QUERY for the given partitions (None = all)."""
+    return {
+        "leaderboard_ids": None if partitions is None else [lb_id for lb_id, _ in partitions],
+        "runners": None if partitions is None else [runner for _, runner in partitions],
+        "default_depth": DEFAULT_DEPTH,
+        "changed_only": changed_only,
+    }
+
+
+# Parameters of the prepared form of RANKING_DIFF_QUERY, in $n order.
+_RANKING_DIFF_PARAMS = [
+    ("leaderboard_ids", "INTEGER[]"),
+    ("runners", "TEXT[]"),
+    ("default_depth", "INTEGER"),
+    ("changed_only", "BOOLEAN"),
+]
+
+
+# Ranks every registered GPU type of the selected active leaderboards down to
+# each leaderboard's depth, aggregates each (leaderboard, GPU) partition into
+# parallel arrays, and diffs them against ranking_standings in one pass: only
+# partitions whose standings differ (or that appeared or disappeared) are
+# returned unless changed_only is false.
+RANKING_DIFF_QUERY = """
+WITH
 active_leaderboards AS (
-    SELECT id, name
+    SELECT id
     FROM leaderboard.leaderboard
-    WHERE deadline > NOW() OR deadline IS NULL
+    WHERE (deadline > NOW() OR deadline IS NULL)
+        AND (%(leaderboard_ids)s::INTEGER[] IS NULL OR id = ANY(%(leaderboard_ids)s::INTEGER[]))
 ),
 
-personal_best_candidates AS (
+-- Partitions to re-rank; all of them when no filter is given.
+partitions AS (
+    SELECT leaderboard_id, runner
+    FROM unnest(%(leaderboard_ids)s::INTEGER[], %(runners)s::TEXT[]) AS t(leaderboard_id, runner)
+),
+
+ranked_users AS (
     SELECT
-        r.runner,
-        s.leaderboard_id,
-        s.user_id,
+        pb.leaderboard_id,
+        pb.runner,
+        pb.user_id,
         u.user_name,
-        r.score,
+        pb.score,
         RANK() OVER (
-            PARTITION BY s.leaderboard_id, r.runner, s.user_id
-            ORDER BY r.score ASC
-        ) AS personal_submission_rank
-    FROM leaderboard.runs r
-    JOIN leaderboard.submission s ON r.submission_id = s.id
-    JOIN active_leaderboards a ON s.leaderboard_id = a.id
-    JOIN priority_gpu p ON p.leaderboard_id = s.leaderboard_id
-        AND p.gpu_type = r.runner
-    LEFT JOIN leaderboard.user_info u ON s.user_id = u.id
-    WHERE NOT r.secret
-        AND r.score IS NOT NULL
-        AND r.passed
+            PARTITION BY pb.leaderboard_id, pb.runner
+            ORDER BY pb.score ASC
+        ) AS user_rank
+    FROM leaderboard.personal_best pb
+    JOIN active_leaderboards a ON pb.leaderboard_id = a.id
+    JOIN leaderboard.gpu_type g ON g.leaderboard_id = pb.leaderboard_id
+        AND g.gpu_type = pb.runner
+    LEFT JOIN leaderboard.user_info u ON pb.user_id = u.id
+    WHERE %(leaderboard_ids)s::INTEGER[] IS NULL
+        OR (pb.leaderboard_id, pb.runner) IN (SELECT leaderboard_id, runner FROM partitions)
 ),
 
-personal_best_runs AS (
-    SELECT * FROM personal_best_candidates
-    WHERE personal_submission_rank = 1
+current_standings AS (
+    SELECT
+        r.leaderboard_id,
+        r.runner AS gpu_type,
+        array_agg(r.user_rank::INTEGER ORDER BY r.user_rank, r.user_id) AS ranks,
+        array_agg(r.user_id ORDER BY r.user_rank, r.user_id) AS user_ids,
+        array_agg(r.user_name ORDER BY r.user_rank, r.user_id) AS user_names,
+        array_agg(r.score ORDER BY r.user_rank, r.user_id) AS scores
+    FROM ranked_users r
+    LEFT JOIN leaderboard.ranking_depth d ON d.leaderboard_id = r.leaderboard_id
+    WHERE r.user_rank <= COALESCE(d.depth, %(default_depth)s)
+    GROUP BY r.leaderboard_id, r.runner
 ),
 
-ranked_users AS (
-    SELECT
-        leaderboard_id,
-        runner,
-        user_id,
-        user_name,
-        score,
-        RANK() OVER (
-            PARTITION BY leaderboard_id, runner
-            ORDER BY score ASC
-        ) AS user_rank
-    FROM personal_best_runs
+previous_standings AS (
+    SELECT leaderboard_id, gpu_type, ranks, user_ids, user_names, scores
+    FROM leaderboard.ranking_standings
+    WHERE %(leaderboard_ids)s::INTEGER[] IS NULL
+        OR (leaderboard_id, gpu_type) IN (SELECT leaderboard_id, runner FROM partitions)
 )
 
 SELECT
-    a.id AS leaderboard_id,
-    a.name AS leaderboard_name,
-    p.gpu_type,
-    r.user_rank AS rank,
-    r.user_id,
-    r.user_name,
-    r.score
-FROM active_leaderboards a
-JOIN priority_gpu p ON p.leaderboard_id = a.id
-JOIN ranked_users r ON r.leaderboard_id = a.id AND r.runner = p.gpu_type
-WHERE r.user_rank <= 3
-ORDER BY a.id, r.user_rank;
+    COALESCE(c.leaderboard_id, p.leaderboard_id) AS leaderboard_id,
+    l.name AS leaderboard_name,
+    COALESCE(c.gpu_type, p.gpu_type) AS gpu_type,
+    COALESCE(d.depth, %(default_depth)s) AS depth,
+    c.ranks, c.user_ids, c.user_names, c.scores,
+    p.ranks, p.user_ids, p.user_names, p.scores
+FROM current_standings c
+FULL JOIN previous_standings p ON p.leaderboard_id = c.leaderboard_id
+    AND p.gpu_type = c.gpu_type
+LEFT JOIN leaderboard.leaderboard l ON l.id = COALESCE(c.leaderboard_id, p.leaderboard_id)
+LEFT JOIN leaderboard.ranking_depth d ON d.leaderboard_id = COALESCE(c.leaderboard_id, p.leaderboard_id)
+WHERE NOT %(changed_only)s
+    OR (c.ranks, c.user_ids, c.user_names, c.scores)
+        IS DISTINCT FROM (p.ranks, p.user_ids, p.user_names, p.scores)
+ORDER BY 1, 3
 """
 
+_RANKING_DIFF_PREPARED = RANKING_DIFF_QUERY
+for _i, (_name, _) in enumerate(_RANKING_DIFF_PARAMS, 1):
+    _RANKING_DIFF_PREPARED = _RANKING_DIFF_PREPARED.replace(f"%({_name})s", f"${_i}")
 
-def fetch_current_top3(conn):
-    """Run the ranking query. Returns list of dicts."""
-    with conn.cursor() as cur:
-        cur.execute(RANKING_QUERY)
-        columns = [desc[0] for desc in cur.description]
-        rows = cur.fetchall()
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def fetch_previous_snapshot(conn):
-    """Load all rows from ranking_snapshot. Returns list of dicts."""
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT leaderboard_id, gpu_type, rank, user_id, user_name, score
-            FROM leaderboard.ranking_snapshot
-        """)
-        columns = [desc[0] for desc in cur.description]
-        rows = cur.fetchall()
-    return [dict(zip(columns, row)) for row in rows]
 
+def _standings(ranks, user_ids, user_names, scores):
+    return None if ranks is None else Standings(ranks, user_ids, user_names, scores)
 
-def update_snapshot(conn, current_rankings):
-    """Upsert current top 3 into snapshot table."""
-    with conn.cursor() as cur:
-        for entry in current_rankings:
-            cur.execute("""
-                INSERT INTO leaderboard.ranking_snapshot
-                    (leaderboard_id, gpu_type, rank, user_id, user_name, score, snapshot_time)
-                VALUES (%s, %s, %s, %s, %s, %s, NOW())
-                ON CONFLICT (leaderboard_id, gpu_type, rank)
-                DO UPDATE SET
-                    user_id = EXCLUDED.user_id,
-                    user_name = EXCLUDED.user_name,
-                    score = EXCLUDED.score,
-                    snapshot_time = EXCLUDED.snapshot_time
-            """, (
-                entry["leaderboard_id"], entry["gpu_type"], entry["rank"],
-                entry["user_id"], entry["user_name"], entry["score"],
-            ))
-    conn.commit()
 
+def fetch_ranking_changes(conn, partitions=None, changed_only=True):
+    """
+    Diff current standings against ranking_standings, for all active
+    leaderboards or only the given (leaderboard_id, gpu_type) partitions.
 
-def cleanup_inactive(conn, inactive_lb_ids):
-    """Remove snapshot rows for leaderboards that are no longer active."""
-    if not inactive_lb_ids:
-        return
-    with conn.cursor() as cur:
-        cur.execute(
-            "DELETE FROM leaderboard.ranking_snapshot WHERE leaderboard_id = ANY(%s)",
-            (list(inactive_lb_ids),),
+    Returns a list of dicts with leaderboard_id, leaderboard_name, gpu_type,
+    depth, and the `current` and `previous` Standings (None when the
+    partition is new, or no longer ranked).
+    """
+    params = _query_params(partitions, changed_only)
+    with conn.cursor() as cur, timings.time("ranking_diff"):
+        _execute_prepared(
+            cur,
+            "ranking_diff",
+            _RANKING_DIFF_PREPARED,
+            [param_type for _, param_type in _RANKING_DIFF_PARAMS],
+            [params[name] for name, _ in _RANKING_DIFF_PARAMS],
         )
-    conn.commit()
-
-
-def _group_by_leaderboard(entries):
-    """Group ranking entries by leaderboard_id. Returns {lb_id: {rank: entry}}."""
-    grouped = {}
-    for entry in entries:
-        lb_id = entry["leaderboard_id"]
-        rank = entry["rank"]
-        if lb_id not in grouped:
-            grouped[lb_id] = {}
-        grouped[lb_id][rank] = entry
-    return grouped
-
-
-def detect_changes(previous, current):
+        rows = cur.fetchall()
+    return [
+        {
+            "leaderboard_id": row[0],
+            "leaderboard_name": row[1] or f"Leaderboard {row[0]}",
+            "gpu_type": row[2],
+            "depth": row[3],
+            "current": _standings(*row[4:8]),
+            "previous": _standings(*row[8:12]),
+        }
+        for row in rows
+    ]
+
+
+def update_snapshot(conn, changes):
     """
-    Compare previous and current rankings.
-
-    Returns:
-        messages: list of Discord message strings
-        inactive_lb_ids: set of leaderboard IDs no longer active
+    Write changed partitions into ranking_standings and drop the ones no
+    longer ranked, in a single statement. Rows whose standings are already
+    up to date are left untouched. Returns the number of rows written.
     """
-    prev_by_lb = _group_by_leaderboard(previous)
-    curr_by_lb = _group_by_leaderboard(current)
-
-    messages = []
+    if not changes:
+        return 0
+    rows = [
+        (c["leaderboard_id"], c["gpu_type"], *(c["current"] or (None, None, None, None)))
+        for c in changes
+    ]
+    with conn.cursor() as cur, timings.time("update_snapshot"):
+        result = execute_values(cur, """
+            WITH v (leaderboard_id, gpu_type, ranks, user_ids, user_names, scores) AS (
+                VALUES %s
+            ),
+            deleted AS (
+                DELETE FROM leaderboard.ranking_standings s
+                USING v
+                WHERE v.ranks IS NULL
+                    AND s.leaderboard_id = v.leaderboard_id AND s.gpu_type = v.gpu_type
+                RETURNING 1
+            ),
+            upserted AS (
+                INSERT INTO leaderboard.ranking_standings AS s
+                    (leaderboard_id, gpu_type, ranks, user_ids, user_names, scores, snapshot_time)
+                SELECT leaderboard_id, gpu_type, ranks, user_ids, user_names, scores, NOW()
+                FROM v
+                WHERE v.ranks IS NOT NULL
+                ON CONFLICT (leaderboard_id, gpu_type)
+                DO UPDATE SET
+                    ranks = EXCLUDED.ranks,
+                    user_ids = EXCLUDED.user_ids,
+                    user_names = EXCLUDED.user_names,
+                    scores = EXCLUDED.scores,
+                    snapshot_time = EXCLUDED.snapshot_time
+                WHERE (s.ranks, s.user_ids, s.user_names, s.scores)
+                    IS DISTINCT FROM (EXCLUDED.ranks, EXCLUDED.user_ids, EXCLUDED.user_names, EXCLUDED.scores)
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM deleted) + (SELECT COUNT(*) FROM upserted)
+        """, rows,
+            template="(%s::INTEGER, %s::TEXT, %s::INTEGER[], %s::TEXT[], %s::TEXT[], %s::NUMERIC[])",
+            page_size=len(rows), fetch=True)
+    conn.commit()
+    return result[0][0]
 
-    for lb_id, curr_ranks in curr_by_lb.items():
-        prev_ranks = prev_by_lb.get(lb_id, {})
 
-        # Get leaderboard metadata from any current entry
-        sample = next(iter(curr_ranks.values()))
-        lb_name = sample.get("leaderboard_name", f"Leaderboard {lb_id}")
-        gpu = sample.get("gpu_type", "")
+def _describe_change(change):
+    """Discord message lines for one partition whose standings changed."""
+    curr, prev = change["current"], change["previous"]
+    lb_name, gpu = change["leaderboard_name"], change["gpu_type"]
 
-        prev_user_ids = {e["user_id"] for e in prev_ranks.values()}
-        curr_user_ids = {e["user_id"] for e in curr_ranks.values()}
+    # Only ranks still tracked count, so lowering the depth bumps nobody.
+    # Tied users share a rank; the last one listed stands for it.
+    prev_by_rank = {rank: user_id for rank, user_id in zip(prev.ranks, prev.user_ids) if rank <= change["depth"]}
+    curr_by_rank = {rank: (user_id, score) for rank, user_id, score in zip(curr.ranks, curr.user_ids, curr.scores)}
 
-        parts = []
+    parts = []
 
-        # Check each rank position for changes
-        for rank in sorted(curr_ranks.keys()):
-            curr_entry = curr_ranks[rank]
-            prev_entry = prev_ranks.get(rank)
+    # Check each rank position for changes
+    for rank in sorted(curr_by_rank):
+        user_id, score = curr_by_rank[rank]
+        prev_user_id = prev_by_rank.get(rank)
 
-            if prev_entry is None:
-                # New rank slot (first time we see this leaderboard/rank)
-                continue
-            if prev_entry["user_id"] == curr_entry["user_id"]:
-                # Same person at same rank — no notification
-                continue
+        if prev_user_id is None:
+            # New rank slot (first time this rank is filled)
+            continue
+        if prev_user_id == user_id:
+            # Same person at same rank — no notification
+            continue
 
-            # Different person at this rank
-            if rank == 1 and prev_entry["user_id"] != curr_entry["user_id"]:
-                # Special dethrone message for #1
-                tmpl = random.choice(DETHRONE_TEMPLATES)
-                parts.append(tmpl.format(
-                    new_mention=mention(curr_entry["user_id"]),
-                    old_mention=mention(prev_entry["user_id"]),
-                    leaderboard=lb_name,
-                    gpu=gpu,
-                    score=format_score(curr_entry["score"]),
-                ))
-            else:
-                tmpl = random.choice(CONGRATS_TEMPLATES)
-                parts.append(tmpl.format(
-                    mention=mention(curr_entry["user_id"]),
-                    rank=rank,
-                    leaderboard=lb_name,
-                    gpu=gpu,
-                    score=format_score(curr_entry["score"]),
-                ))
-
-        # Users bumped out of top 3 entirely
-        bumped = prev_user_ids - curr_user_ids
-        for uid in bumped:
-            # Find their old entry for the name
-            old_entry = next(e for e in prev_ranks.values() if e["user_id"] == uid)
-            tmpl = random.choice(TRASH_TALK_TEMPLATES)
+        # Different person at this rank
+        if rank == 1:
+            # Special dethrone message for #1
+            tmpl = random.choice(DETHRONE_TEMPLATES)
+            parts.append(tmpl.format(
+                new_mention=mention(user_id),
+                old_mention=mention(prev_user_id),
+                leaderboard=lb_name,
+                gpu=gpu,
+                score=format_score(score),
+            ))
+        else:
+            tmpl = random.choice(CONGRATS_TEMPLATES)
             parts.append(tmpl.format(
-                mention=mention(old_entry["user_id"]),
+                mention=mention(user_id),
+                rank=rank,
                 leaderboard=lb_name,
+                gpu=gpu,
+                score=format_score(score),
             ))
 
-        if parts:
-            messages.append("\n".join(parts))
+    # Users bumped out of the tracked ranks entirely
+    curr_user_ids = set(curr.user_ids)
+    tracked = (user_id for rank, user_id in zip(prev.ranks, prev.user_ids) if rank <= change["depth"])
+    for uid in dict.fromkeys(tracked):
+        if uid in curr_user_ids:
+            continue
+        tmpl = random.choice(TRASH_TALK_TEMPLATES)
+        parts.append(tmpl.format(
+            mention=mention(uid),
+            leaderboard=lb_name,
+            gpu=gpu,
+            depth=change["depth"],
+        ))
 
-    # Find leaderboards that were in previous snapshot but are no longer active
-    inactive_lb_ids = set(prev_by_lb.keys()) - set(curr_by_lb.keys())
+    return parts
 
-    return messages, inactive_lb_ids
+
+def detect_changes(changes):
+    """
+    Turn changed partitions into notifications. Partitions seen for the
+    first time are seeded silently.
+
+    Returns:
+        messages: list of Discord message strings, one per partition
+        removed: set of (leaderboard_id, gpu_type) no longer ranked
+    """
+    messages = []
+    removed = set()
+    for change in changes:
+        if change["current"] is None:
+            removed.add((change["leaderboard_id"], change["gpu_type"]))
+        elif change["previous"] is not None:
+            parts = _describe_change(change)
+            if parts:
+                messages.append("\n".join(parts))
+    return messages, removed
 
 
 def send_webhook(webhook_url, messages):
@@ -320,64 +747,71 @@ def send_webhook(webhook_url, messages):
                 "content": msg,
                 "allowed_mentions": {"parse": ["users"]},
             }
-            resp = requests.post(webhook_url, json=payload, timeout=10)
-            if resp.status_code == 429:
-                retry_after = resp.json().get("retry_after", 5)
-                logger.warning("Rate limited, sleeping %s seconds", retry_after)
-                time.sleep(retry_after)
-                requests.post(webhook_url, json=payload, timeout=10)
-            elif not resp.ok:
+            # Rate limits (429 + retry_after) are retried by the client
+            resp = get_http_client().post(webhook_url, json=payload, timeout=10)
+            if not resp.ok:
                 logger.error("Webhook returned %s: %s", resp.status_code, resp.text)
         except Exception:
             logger.exception("Failed to send webhook message")
         time.sleep(1)  # Respect Discord rate limits
 
 
-def _print_rankings(label, entries):
-    """Pretty-print a set of ranking entries grouped by leaderboard."""
-    by_lb = {}
-    for entry in entries:
-        lb_id = entry["leaderboard_id"]
-        if lb_id not in by_lb:
-            by_lb[lb_id] = {
-                "name": entry.get("leaderboard_name", f"Leaderboard {lb_id}"),
-                "gpu": entry.get("gpu_type", "?"),
-                "entries": [],
-            }
-        by_lb[lb_id]["entries"].append(entry)
-
-    print(f"\n=== {label} ({len(entries)} entries) ===\n")
-    if not entries:
+def _print_rankings(label, changes, side):
+    """Pretty-print the `current` or `previous` standings of each partition."""
+    partitions = [c for c in changes if c[side] is not None]
+    print(f"\n=== {label} ({len(partitions)} partitions) ===\n")
+    if not partitions:
         print("  (empty)\n")
         return
-    for lb_id, data in sorted(by_lb.items()):
-        print(f"  {data['name']} ({data['gpu']}):")
-        for e in sorted(data["entries"], key=lambda x: x["rank"]):
-            print(f"    #{e['rank']}  {e['user_name'] or e['user_id']}  {format_score(e['score'])}")
+    for change in partitions:
+        standings = change[side]
+        print(f"  {change['leaderboard_name']} ({change['gpu_type']}):")
+        for rank, user_id, user_name, score in zip(*standings):
+            print(f"    #{rank}  {user_name or user_id}  {format_score(score)}")
         print()
 
 
-def poll_cycle(conn, webhook_url, seed_only=False):
+def poll_cycle(conn, webhook_url, incremental=False, leaderboard_ids=()):
     """
-    Run a single poll cycle: fetch rankings, compare, notify, update snapshot.
+    Run a single poll cycle: diff rankings, notify, update snapshot.
 
     Args:
         conn: database connection
         webhook_url: Discord webhook URL (None to skip sending)
-        seed_only: if True and snapshot is empty, seed without notifications
+        incremental: if True, only re-rank partitions with runs newer than
+            the watermark, and return immediately if there are none
+        leaderboard_ids: leaderboards to re-rank in full on an incremental
+            cycle, e.g. because they were notified. A run that commits
+            after a higher run id is behind the watermark and only found
+            this way (or by the next full cycle).
 
     Returns:
-        (current, previous, messages, inactive_lbs)
+        (changes, messages)
     """
-    current = fetch_current_top3(conn)
-    previous = fetch_previous_snapshot(conn)
-
-    if seed_only and not previous:
-        logger.info("Seeding snapshot with %d entries (no notifications)", len(current))
-        update_snapshot(conn, current)
-        return current, previous, [], set()
+    last_run_id, max_run_id = fetch_watermark(conn)
+    partitions = None
+
+    if incremental and last_run_id is not None:
+        partitions = set()
+        if max_run_id is not None and max_run_id > last_run_id:
+            partitions.update(fetch_changed_partitions(conn, last_run_id, max_run_id))
+            logger.info(
+                "Runs %d..%d touched %d partition(s)",
+                last_run_id + 1, max_run_id, len(partitions),
+            )
+        if leaderboard_ids:
+            partitions.update(fetch_leaderboard_partitions(conn, leaderboard_ids))
+        if not partitions:
+            if max_run_id is not None and max_run_id > last_run_id:
+                advance_watermark(conn, max_run_id)
+            else:
+                conn.rollback()
+            return [], []
+        partitions = sorted(partitions)
+        logger.info("Re-ranking %d partition(s)", len(partitions))
 
-    messages, inactive_lbs = detect_changes(previous, current)
+    changes = fetch_ranking_changes(conn, partitions)
+    messages, removed = detect_changes(changes)
 
     if messages and webhook_url:
         logger.info("Detected %d ranking change(s), sending notifications", len(messages))
@@ -385,9 +819,14 @@ def poll_cycle(conn, webhook_url, seed_only=False):
     elif not messages:
         logger.info("No ranking changes detected")
 
-    update_snapshot(conn, current)
-    cleanup_inactive(conn, inactive_lbs)
-    return current, previous, messages, inactive_lbs
+    written = update_snapshot(conn, changes)
+    if written:
+        logger.info(
+            "Snapshot: wrote %d partition(s) (%d new, %d removed)",
+            written, sum(c["previous"] is None for c in changes), len(removed),
+        )
+    advance_watermark(conn, max_run_id)
+    return changes, messages
 
 
 def main():
@@ -402,8 +841,39 @@ def main():
         action="store_true",
         help="Run a single cycle (seed snapshot if empty, detect changes, send webhook, then exit)",
     )
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="Create the tables and copy a pre-standings ranking_snapshot table into them, then exit",
+    )
+    parser.add_argument(
+        "--drop-old-snapshot",
+        action="store_true",
+        help="With --migrate, also drop ranking_snapshot (once no worker on the old code is running)",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help=f"Poll every {POLL_INTERVAL}s instead of waiting for notifications on {NOTIFY_CHANNEL}",
+    )
     args = parser.parse_args()
 
+    if args.drop_old_snapshot and not args.migrate:
+        parser.error("--drop-old-snapshot requires --migrate")
+
+    if args.migrate:
+        if not os.environ.get("DATABASE_URL"):
+            logger.error("DATABASE_URL not set, exiting")
+            sys.exit(1)
+        conn = get_connection()
+        try:
+            ensure_snapshot_table(conn)
+            if migrate_snapshot_table(conn, drop=args.drop_old_snapshot) is None:
+                logger.info("No ranking_snapshot table, nothing to migrate")
+        finally:
+            conn.close()
+        return
+
     webhook_url = os.environ.get("DISCORD_RANKING_WEBHOOK_URL")
     if not webhook_url and not args.dry_run:
         logger.error("DISCORD_RANKING_WEBHOOK_URL not set, exiting")
@@ -418,24 +888,24 @@ def main():
 
     if args.dry_run:
         try:
-            current = fetch_current_top3(conn)
-            previous = fetch_previous_snapshot(conn)
-
-            _print_rankings("Current Top 3 Rankings", current)
-            _print_rankings("Previous Snapshot", previous)
-
-            if previous:
-                messages, inactive_lbs = detect_changes(previous, current)
-                print(f"=== Changes Detected: {len(messages)} message(s) ===\n")
-                for i, msg in enumerate(messages, 1):
-                    print(f"  Message {i}:")
-                    for line in msg.split("\n"):
-                        print(f"    {line}")
-                    print()
-                if inactive_lbs:
-                    print(f"  Inactive leaderboards to clean up: {inactive_lbs}\n")
-            else:
-                print("=== No previous snapshot — would seed without sending messages ===\n")
+            changes = fetch_ranking_changes(conn, changed_only=False)
+
+            _print_rankings("Current Rankings", changes, "current")
+            _print_rankings("Previous Snapshot", changes, "previous")
+
+            changes = [c for c in changes if c["current"] != c["previous"]]
+            messages, removed = detect_changes(changes)
+            print(f"=== Changes Detected: {len(messages)} message(s) ===\n")
+            for i, msg in enumerate(messages, 1):
+                print(f"  Message {i}:")
+                for line in msg.split("\n"):
+                    print(f"    {line}")
+                print()
+            seeded = sorted((c["leaderboard_id"], c["gpu_type"]) for c in changes if c["previous"] is None)
+            if seeded:
+                print(f"  New partitions to seed without messages: {seeded}\n")
+            if removed:
+                print(f"  Partitions no longer ranked, to clean up: {sorted(removed)}\n")
 
             print("(dry run — no changes written to DB or Discord)")
         finally:
@@ -444,28 +914,109 @@ def main():
 
     if args.test:
         try:
-            current, previous, messages, _ = poll_cycle(conn, webhook_url, seed_only=True)
-            if not previous:
+            changes, _ = poll_cycle(conn, webhook_url)
+            if changes and all(c["previous"] is None for c in changes):
                 logger.info("Snapshot seeded. Run --test again to detect changes.")
+            timings.log_summary()
         finally:
             conn.close()
         return
 
-    # Normal continuous polling
-    conn.close()
-    logger.info("Ranking worker started. Polling every %d seconds.", POLL_INTERVAL)
+    # Normal continuous operation
+    try:
+        if not args.poll:
+            ensure_notify_trigger(conn)
+    finally:
+        conn.close()
+    run_forever(webhook_url, listen=not args.poll)
+
+
+def run_forever(webhook_url, listen=True):
+    """
+    Run cycles until killed. With `listen`, cycles are driven by
+    notifications on NOTIFY_CHANNEL, debounced per leaderboard; otherwise,
+    or while the listener is down, the watermark is polled every
+    POLL_INTERVAL seconds. A full re-rank runs every FULL_REFRESH_INTERVAL.
+    Cycles share one connection, reopened after failures; statement
+    timings are logged every STATS_LOG_INTERVAL.
+    """
+    logger.info(
+        "Ranking worker started (%s). Full re-rank every %d seconds.",
+        f"listening on {NOTIFY_CHANNEL}" if listen else f"polling every {POLL_INTERVAL} seconds",
+        FULL_REFRESH_INTERVAL,
+    )
+
+    db = WorkerConnection()
+    listener = None
+    next_listen_attempt = 0.0
+    next_stats_log = time.monotonic() + STATS_LOG_INTERVAL
+    pending = {}  # leaderboard_id -> (first_seen, last_seen)
+    last_full_refresh = None
+    catch_up = True
 
     while True:
-        try:
-            conn = get_connection()
+        now = time.monotonic()
+
+        if now >= next_stats_log:
+            timings.log_summary()
+            next_stats_log = now + STATS_LOG_INTERVAL
+
+        if listen and listener is None and now >= next_listen_attempt:
             try:
-                poll_cycle(conn, webhook_url, seed_only=True)
-            finally:
-                conn.close()
-        except Exception:
-            logger.exception("Error in poll cycle")
+                listener = open_listener()
+                logger.info("Listening on %s", NOTIFY_CHANNEL)
+                # Notifications sent while not listening are lost; the
+                # watermark check of the next cycle picks those runs up.
+                catch_up = True
+            except Exception:
+                logger.exception("Could not LISTEN on %s, polling every %d seconds", NOTIFY_CHANNEL, POLL_INTERVAL)
+                next_listen_attempt = now + LISTEN_RETRY_INTERVAL
+
+        full = last_full_refresh is None or now - last_full_refresh >= FULL_REFRESH_INTERVAL
+        due = _next_due(pending)
+        if full or catch_up or listener is None or (due is not None and due <= now):
+            if pending:
+                logger.info("Re-ranking after notifications for leaderboard(s) %s", sorted(pending))
+            # Notified leaderboards are re-ranked in full on top of the
+            # watermark delta, which misses runs committed out of id order.
+            notified = dict(pending)
+            pending.clear()
+            catch_up = False
+            try:
+                poll_cycle(db.get(), webhook_url, incremental=not full, leaderboard_ids=set(notified))
+                if full:
+                    last_full_refresh = now
+            except Exception:
+                logger.exception("Error in poll cycle")
+                db.recover()
+                # Retry the same work once the connection is back.
+                pending.update(notified)
+                catch_up = True
+                time.sleep(POLL_INTERVAL)
+                continue
+
+        if listener is None:
+            time.sleep(POLL_INTERVAL)
+            continue
 
-        time.sleep(POLL_INTERVAL)
+        next_wake = last_full_refresh + FULL_REFRESH_INTERVAL if last_full_refresh is not None else now
+        due = _next_due(pending)
+        if due is not None:
+            next_wake = min(next_wake, due)
+        try:
+            lb_ids = wait_for_notifications(listener, next_wake - time.monotonic())
+        except (psycopg2.Error, OSError):
+            logger.warning(
+                "Lost the %s listener, polling every %d seconds", NOTIFY_CHANNEL, POLL_INTERVAL, exc_info=True
+            )
+            try:
+                listener.close()
+            except Exception:
+                pass
+            listener = None
+            next_listen_attempt = time.monotonic() + LISTEN_RETRY_INTERVAL
+            continue
+        _record_notifications(pending, lb_ids, time.monotonic())
 
 
 if __name__ == "__main__":
@@ -12,12 +12,12 @@ if "--restore" in sys.argv:
     print("Run: python3 ranking_worker.py --test")
 else:
     cur.execute("""
-        UPDATE leaderboard.ranking_snapshot
-        SET user_id = 'fake_user_123', user_name = 'FakeUser'
-        WHERE (leaderboard_id, gpu_type, rank) = (
-            SELECT leaderboard_id, gpu_type, rank
-            FROM leaderboard.ranking_snapshot
-            WHERE rank = 1
+        UPDATE leaderboard.ranking_standings
+        SET user_ids[1] = 'fake_user_123', user_names[1] = 'FakeUser'
+        WHERE (leaderboard_id, gpu_type) = (
+            SELECT leaderboard_id, gpu_type
+            FROM leaderboard.ranking_standings
+            WHERE ranks[1] = 1
             LIMIT 1
         )
     """)
@@ -70,7 +70,7 @@ def test_callback_token_request_fails(client):
     mock_response.status_code = 401
 
     with patch(
-        "kernelboard.api.auth.requests.post", return_value=mock_response
+        "kernelboard.lib.http_client.HttpClient.post", return_value=mock_response
     ):
         response = client.get("/api/auth/discord/callback?state=123&code=456")
         assert_redirect_with_error(response, "token_error")
@@ -90,7 +90,7 @@ def test_callback_token_response_does_not_contain_access_token(client):
         "scope": "identity",
     }
     with patch(
-        "kernelboard.api.auth.requests.post", return_value=mock_response
+        "kernelboard.lib.http_client.HttpClient.post", return_value=mock_response
     ):
         response = client.get("/api/auth/discord/callback?state=123&code=456")
         assert_redirect_with_error(response, "token_error")
@@ -111,13 +111,13 @@ def test_callback_userinfo_response_fails(client):
     }
 
     with patch(
-        "kernelboard.api.auth.requests.post", return_value=token_response
+        "kernelboard.lib.http_client.HttpClient.post", return_value=token_response
     ):
         userinfo_response = MagicMock()
         userinfo_response.status_code = 401
 
         with patch(
-            "kernelboard.api.auth.requests.get", return_value=userinfo_response
+            "kernelboard.lib.http_client.HttpClient.get", return_value=userinfo_response
         ):
             response = client.get(
                 "/api/auth/discord/callback?state=123&code=456"
@@ -140,14 +140,14 @@ def test_callback_happy_path(client):
     }
 
     with patch(
-        "kernelboard.api.auth.requests.post", return_value=token_response
+        "kernelboard.lib.http_client.HttpClient.post", return_value=token_response
     ):
         userinfo_response = MagicMock()
         userinfo_response.status_code = 200
         userinfo_response.json.return_value = {"id": "789"}
 
         with patch(
-            "kernelboard.api.auth.requests.get", return_value=userinfo_response
+            "kernelboard.lib.http_client.HttpClient.get", return_value=userinfo_response
         ):
             response = client.get(
                 "api/auth/discord/callback?state=123&code=456"
@@ -0,0 +1,133 @@
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from kernelboard.api import events
+from kernelboard.lib.redis_connection import get_redis_connection
+
+_DISCORD_EVENTS = [
+    {"id": "2", "name": "Later", "scheduled_start_time": "2026-02-01T00:00:00Z"},
+    {"id": "1", "name": "Sooner", "scheduled_start_time": "2026-01-01T00:00:00Z"},
+]
+
+
+class _InlineThread:
+    """Runs the refresh synchronously so tests can observe its effect."""
+
+    def __init__(self, target, args=(), **kwargs):
+        self.target = target
+        self.args = args
+
+    def start(self):
+        self.target(*self.args)
+
+
+@pytest.fixture
+def redis_conn(app, monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "bot-token")
+    monkeypatch.setenv("DISCORD_GUILD_ID", "42")
+    monkeypatch.setattr(events, "_cache", {"data": None, "timestamp": 0})
+    monkeypatch.setattr(events.threading, "Thread", _InlineThread)
+    with app.app_context():
+        conn = get_redis_connection()
+    keys = [events.EVENTS_CACHE_KEY, events.EVENTS_REFRESH_LOCK_KEY]
+    conn.delete(*keys)
+    yield conn
+    conn.delete(*keys)
+
+
+def _discord_response(payload=_DISCORD_EVENTS):
+    response = MagicMock()
+    response.json.return_value = payload
+    return response
+
+
+def _cache_events(redis_conn, names, age):
+    entry = {"events": [{"name": n} for n in names], "fetched_at": time.time() - age}
+    redis_conn.set(events.EVENTS_CACHE_KEY, json.dumps(entry))
+
+
+def test_cold_cache_is_fetched_once(client, redis_conn):
+    with patch("kernelboard.lib.http_client.HttpClient.get", return_value=_discord_response()) as get:
+        first = client.get("/api/events")
+        second = client.get("/api/events")
+
+    get.assert_called_once()
+    for resp in (first, second):
+        assert [e["name"] for e in resp.get_json()["data"]] == ["Sooner", "Later"]
+        assert resp.headers["Age"] == "0"
+    assert redis_conn.ttl(events.EVENTS_CACHE_KEY) > events.EVENTS_SOFT_TTL_SECONDS
+
+
+def test_cold_cache_is_warming_while_another_worker_fetches(client, redis_conn):
+    redis_conn.set(events.EVENTS_REFRESH_LOCK_KEY, "other-worker")
+
+    with patch("kernelboard.lib.http_client.HttpClient.get") as get:
+        resp = client.get("/api/events")
+
+    get.assert_not_called()
+    assert resp.status_code == 200
+    assert resp.get_json()["data"] == []
+    assert resp.get_json()["message"] == events.EVENTS_WARMING_MESSAGE
+    assert resp.headers["Retry-After"] == str(events.EVENTS_WARMING_RETRY_AFTER_SECONDS)
+    assert "Age" not in resp.headers
+
+
+def test_local_copy_is_served_when_redis_has_none(client, redis_conn):
+    with patch("kernelboard.lib.http_client.HttpClient.get", return_value=_discord_response()):
+        client.get("/api/events")
+    redis_conn.delete(events.EVENTS_CACHE_KEY)
+
+    with patch("kernelboard.lib.http_client.HttpClient.get") as get:
+        resp = client.get("/api/events")
+
+    get.assert_not_called()
+    assert [e["name"] for e in resp.get_json()["data"]] == ["Sooner", "Later"]
+
+
+def test_fresh_cache_is_served_without_refresh(client, redis_conn):
+    _cache_events(redis_conn, ["Cached"], age=30)
+
+    with patch("kernelboard.lib.http_client.HttpClient.get") as get:
+        resp = client.get("/api/events")
+
+    get.assert_not_called()
+    assert [e["name"] for e in resp.get_json()["data"]] == ["Cached"]
+    assert 30 <= int(resp.headers["Age"]) < 40
+
+
+def test_stale_cache_is_served_and_refreshed(client, redis_conn):
+    _cache_events(redis_conn, ["Stale"], age=events.EVENTS_SOFT_TTL_SECONDS + 1)
+
+    with patch("kernelboard.lib.http_client.HttpClient.get", return_value=_discord_response()):
+        resp = client.get("/api/events")
+
+    assert [e["name"] for e in resp.get_json()["data"]] == ["Stale"]
+    cached = json.loads(redis_conn.get(events.EVENTS_CACHE_KEY))
+    assert [e["name"] for e in cached["events"]] == ["Sooner", "Later"]
+    assert redis_conn.get(events.EVENTS_REFRESH_LOCK_KEY) is None
+
+
+def test_refresh_is_skipped_while_another_worker_holds_the_lock(client, redis_conn):
+    _cache_events(redis_conn, ["Stale"], age=events.EVENTS_SOFT_TTL_SECONDS + 1)
+    redis_conn.set(events.EVENTS_REFRESH_LOCK_KEY, "other-worker")
+
+    with patch("kernelboard.lib.http_client.HttpClient.get") as get:
+        resp = client.get("/api/events")
+
+    get.assert_not_called()
+    assert [e["name"] for e in resp.get_json()["data"]] == ["Stale"]
+
+
+def test_failed_refresh_keeps_last_good_value(client, redis_conn):
+    _cache_events(redis_conn, ["Stale"], age=events.EVENTS_SOFT_TTL_SECONDS + 1)
+
+    with patch("kernelboard.lib.http_client.HttpClient.get", side_effect=requests.ConnectionError("down")):
+        client.get("/api/events")
+        resp = client.get("/api/events")
+
+    assert [e["name"] for e in resp.get_json()["data"]] == ["Stale"]
+    assert redis_conn.get(events.EVENTS_REFRESH_LOCK_KEY) is None
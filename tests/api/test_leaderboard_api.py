@@ -1,3 +1,8 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
 from kernelboard.lib.db import get_db_connection
 
 
@@ -26,3 +31,276 @@ def test_leaderboard_no_submissions(client, app):
 
     res = response.get_json()
     assert res["data"]["rankings"] == {}
+
+
+def test_leaderboard_served_from_cache(client):
+    first = client.get("/api/leaderboard/339")
+    assert first.status_code == 200
+
+    with patch("kernelboard.api.leaderboard.to_api_leaderboard_item") as transform:
+        second = client.get("/api/leaderboard/339")
+        transform.assert_not_called()
+
+    assert second.status_code == 200
+    assert second.get_json() == first.get_json()
+
+
+def test_leaderboard_cache_invalidated_by_new_run(client, app):
+    first = client.get("/api/leaderboard/339").get_json()
+
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT s.id, r.runner, r.score
+                FROM leaderboard.runs r
+                JOIN leaderboard.submission s ON s.id = r.submission_id
+                WHERE s.leaderboard_id = 339 AND NOT r.secret AND r.passed
+                  AND r.score IS NOT NULL
+                ORDER BY r.score
+                LIMIT 1
+                """
+            )
+            submission_id, runner, score = cur.fetchone()
+            cur.execute(
+                """
+                INSERT INTO leaderboard.runs
+                    (submission_id, start_time, end_time, mode, secret, runner,
+                     score, passed, system_info)
+                VALUES (%s, NOW(), NOW(), 'leaderboard', FALSE, %s, %s, TRUE, '{}')
+                """,
+                (submission_id, runner, score / 2),
+            )
+        conn.commit()
+
+    second = client.get("/api/leaderboard/339").get_json()
+    assert second != first
+    assert second["data"]["rankings"][runner][0]["score"] == float(score / 2)
+
+
+def test_leaderboard_not_modified(client):
+    first = client.get("/api/leaderboard/339")
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/leaderboard/339", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+
+    third = client.get("/api/leaderboard/339", headers={"If-None-Match": '"stale"'})
+    assert third.status_code == 200
+    assert third.headers["ETag"] == etag
+
+
+def test_fastest_trend_not_modified(client):
+    first = client.get("/api/leaderboard/339/fastest_trend")
+    assert first.status_code == 200
+
+    second = client.get(
+        "/api/leaderboard/339/fastest_trend",
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert second.status_code == 304
+
+
+def test_leaderboard_metadata(client):
+    response = client.get("/api/leaderboard/339/metadata")
+    assert response.status_code == 200
+    assert response.cache_control.max_age == 3600
+
+    data = response.get_json()["data"]
+    assert "conv2d" in data["name"]
+    assert "rankings" not in data
+    assert data["gpu_types"] == sorted(data["gpu_types"])
+
+    assert client.get("/api/leaderboard/1000000/metadata").status_code == 404
+
+
+def _approx_rankings(rankings):
+    # prev_score is exact NUMERIC arithmetic here and float arithmetic in
+    # the detail endpoint.
+    return {
+        gpu: [{**e, "prev_score": e["prev_score"] and pytest.approx(e["prev_score"])} for e in ranking]
+        for gpu, ranking in rankings.items()
+    }
+
+
+def test_leaderboard_rankings_match_detail(client):
+    detail = client.get("/api/leaderboard/339").get_json()["data"]["rankings"]
+
+    response = client.get("/api/leaderboard/339/rankings")
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+
+    assert _approx_rankings(data["rankings"]) == detail
+    assert data["totals"] == {gpu: len(ranking) for gpu, ranking in detail.items()}
+
+
+def test_leaderboard_rankings_pagination(client):
+    detail = client.get("/api/leaderboard/339").get_json()["data"]["rankings"]
+    gpu_type = max(detail, key=lambda gpu: len(detail[gpu]))
+
+    response = client.get(f"/api/leaderboard/339/rankings?gpu_type={gpu_type}&limit=2&offset=1")
+    data = response.get_json()["data"]
+
+    assert list(data["rankings"]) == [gpu_type]
+    assert _approx_rankings(data["rankings"])[gpu_type] == detail[gpu_type][1:3]
+    assert data["totals"] == {gpu_type: len(detail[gpu_type])}
+
+
+def test_leaderboard_rankings_not_modified(client):
+    first = client.get("/api/leaderboard/339/rankings?limit=3")
+
+    with patch("kernelboard.api.leaderboard._get_rankings_query") as query:
+        second = client.get(
+            "/api/leaderboard/339/rankings?limit=3",
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+        query.assert_not_called()
+    assert second.status_code == 304
+
+    other = client.get(
+        "/api/leaderboard/339/rankings?limit=4",
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert other.status_code == 200
+
+
+_TREND_USER = "trend-user"
+_TREND_DAYS = 40
+
+
+@pytest.fixture
+def long_trend(app):
+    """A user with one H100 run per day for _TREND_DAYS days on 339."""
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute("INSERT INTO leaderboard.user_info (id, user_name) VALUES (%s, 'Trend')", (_TREND_USER,))
+            for day in range(_TREND_DAYS):
+                cur.execute(
+                    """
+                    INSERT INTO leaderboard.submission
+                        (leaderboard_id, file_name, user_id, code_id, submission_time, done)
+                    SELECT 339, 'trend.py', %s, code_id,
+                        TIMESTAMPTZ '2025-01-01 12:00+00' + make_interval(days => %s), TRUE
+                    FROM leaderboard.submission LIMIT 1
+                    RETURNING id
+                    """,
+                    (_TREND_USER, day),
+                )
+                cur.execute(
+                    """
+                    INSERT INTO leaderboard.runs
+                        (submission_id, start_time, end_time, mode, secret, runner,
+                         score, passed, system_info)
+                    VALUES (%s, NOW(), NOW(), 'leaderboard', FALSE, 'H100', %s, TRUE, '{}')
+                    """,
+                    (cur.fetchone()[0], 1 + (day * 7) % 13),
+                )
+        conn.commit()
+
+
+def _user_trend(client, **params):
+    data = client.get(
+        "/api/leaderboard/339/user_trend", query_string={"user_id": _TREND_USER, **params}
+    ).get_json()["data"]
+    return data, data["time_series"]["H100"][_TREND_USER]
+
+
+def test_user_trend_downsamples_long_series(client, long_trend):
+    data, series = _user_trend(client)
+    assert data["max_points"] == 1000
+    assert len(series) == _TREND_DAYS
+
+    _, downsampled = _user_trend(client, max_points=5)
+    assert len(downsampled) <= 5
+    # The fastest run always survives, and points stay in time order.
+    assert min(float(p["score"]) for p in downsampled) == 1
+    times = [p["submission_time"] for p in downsampled]
+    assert times == sorted(times)
+
+
+def test_user_trend_time_window_and_bucket(client, long_trend):
+    _, windowed = _user_trend(client, **{"from": "2025-01-11T00:00:00Z", "to": "2025-01-20T23:59:59Z"})
+    assert len(windowed) == 10
+    assert all("2025-01-11" <= p["submission_time"] < "2025-01-21" for p in windowed)
+
+    data, weekly = _user_trend(client, bucket="1w")
+    assert data["bucket_seconds"] == 7 * 86400
+    assert 6 <= len(weekly) <= 7
+    # One point per week: the fastest run of that week.
+    assert min(float(p["score"]) for p in weekly) == 1
+
+
+def test_downsampling_keeps_max_points_for_unaligned_series(app):
+    from kernelboard.api.leaderboard import _downsampled_trend_sql
+
+    # 41 hourly runs starting at 02:17, so the series start is not a
+    # multiple of the 10h bucket width.
+    points_sql = """
+        SELECT TIMESTAMPTZ '2025-01-01 02:17:00+00' + i * INTERVAL '1 hour' AS submission_time,
+            MOD(i, 7)::NUMERIC AS score, i AS run_id, 'H100' AS runner
+        FROM generate_series(0, 40) AS i
+    """
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            for max_points in (2, 3, 5, 7):
+                cur.execute(
+                    _downsampled_trend_sql(points_sql, series="runner", columns="run_id"),
+                    {"bucket": None, "max_points": max_points},
+                )
+                points = cur.fetchall()
+                assert 1 <= len(points) <= max_points
+
+            # 7h buckets from the first run: hours 0-6, 7-13, ..., 35-40.
+            cur.execute(
+                _downsampled_trend_sql(points_sql, series="runner", columns="run_id"),
+                {"bucket": 7 * 3600, "max_points": 1000},
+            )
+            assert [r[0] for r in cur.fetchall()] == [0, 7, 14, 21, 28, 35]
+
+
+@pytest.mark.parametrize(
+    "query", ["max_points=1", "max_points=abc", "bucket=5x", "bucket=0h", "from=yesterday", "format=csv"]
+)
+def test_trend_rejects_invalid_params(client, query):
+    assert client.get(f"/api/leaderboard/339/user_trend?user_id=1&{query}").status_code == 400
+    assert client.get(f"/api/leaderboard/339/custom_trend?{query}").status_code == 400
+
+
+def test_custom_trend_downsampling_params(client):
+    response = client.get("/api/leaderboard/339/custom_trend?max_points=5&bucket=1d")
+    assert response.status_code == 200
+    assert response.get_json()["data"]["bucket_seconds"] == 86400
+
+
+def _epoch_ms(iso):
+    return round(datetime.fromisoformat(iso).timestamp() * 1000)
+
+
+def test_user_trend_columnar_matches_rows(client, long_trend):
+    _, rows = _user_trend(client, max_points=10)
+    data, series = _user_trend(client, max_points=10, format="columnar")
+
+    assert data["format"] == "columnar"
+    assert series["user_name"] == "Trend"
+    assert series["submission_id"] == [p["submission_id"] for p in rows]
+    assert series["score"] == [float(p["score"]) for p in rows]
+    assert series["submission_time"] == [_epoch_ms(p["submission_time"]) for p in rows]
+
+
+def test_fastest_trend_columnar_matches_rows(client):
+    rows = client.get("/api/leaderboard/339/fastest_trend").get_json()["data"]["time_series"]
+    data = client.get("/api/leaderboard/339/fastest_trend?format=columnar").get_json()["data"]
+
+    assert data["format"] == "columnar"
+    assert set(data["time_series"]) == set(rows)
+    for gpu_type, line in data["time_series"].items():
+        points = rows[gpu_type]["fastest"]
+        assert line["fastest"]["submission_id"] == [p["submission_id"] for p in points]
+        assert line["fastest"]["user_name"] == [p["user_name"] for p in points]
+        assert line["fastest"]["submission_time"] == [_epoch_ms(p["submission_time"]) for p in points]
+
+    assert client.get("/api/leaderboard/339/fastest_trend?format=csv").status_code == 400
@@ -1,3 +1,17 @@
+import gzip
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from kernelboard.api import leaderboard_summaries as summaries
+from kernelboard.lib import response_cache
+from kernelboard.lib.db import get_db_connection
+from kernelboard.lib.redis_connection import get_redis_connection
+from kernelboard.lib.response_cache import SUMMARIES_RESPONSE_KEY
+
+
 def test_index(client):
     response = client.get("/api/leaderboard-summaries")
     assert response.status_code == 200
@@ -24,3 +38,224 @@ def test_leaderboard_metadata(client):
     assert all(
         ids[i] > ids[i + 1] for i in range(len(ids) - 1)
     ), f"Leaderboard IDs are not in decreasing order: {ids}"
+
+
+# ----------------------------
+# single-flight recomputation
+# ----------------------------
+
+_LB_ID = 339
+
+
+@pytest.fixture
+def summaries_redis(app):
+    with app.app_context():
+        conn = get_redis_connection()
+    keys = [
+        f"{summaries.CACHE_KEY_PREFIX}{_LB_ID}",
+        f"{summaries.ACTIVE_CACHE_KEY_PREFIX}{_LB_ID}",
+        f"{summaries.RECOMPUTE_LOCK_PREFIX}{_LB_ID}",
+    ]
+    conn.delete(*keys)
+    yield conn
+    conn.delete(*keys)
+
+
+def _single_flight(app, redis_conn, ended: bool, previous=None):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            return summaries._compute_top_users_single_flight(
+                cur, redis_conn, [_LB_ID], {_LB_ID} if ended else set(), previous or {}
+            )
+
+
+def test_single_flight_computes_caches_and_releases_lock(app, summaries_redis):
+    result = _single_flight(app, summaries_redis, ended=True)
+
+    assert result[_LB_ID]
+    assert json.loads(summaries_redis.get(f"{summaries.CACHE_KEY_PREFIX}{_LB_ID}")) == result[_LB_ID]
+    assert summaries_redis.get(f"{summaries.RECOMPUTE_LOCK_PREFIX}{_LB_ID}") is None
+
+
+def test_single_flight_reuses_previous_value_while_locked(app, summaries_redis):
+    summaries_redis.set(f"{summaries.RECOMPUTE_LOCK_PREFIX}{_LB_ID}", "other-worker")
+
+    with patch.object(summaries, "_get_query_for_ids") as query:
+        result = _single_flight(app, summaries_redis, ended=False, previous={_LB_ID: ["previous"]})
+
+    query.assert_not_called()
+    assert result == {_LB_ID: ["previous"]}
+    assert summaries_redis.get(f"{summaries.RECOMPUTE_LOCK_PREFIX}{_LB_ID}") == b"other-worker"
+
+
+def test_single_flight_waits_for_lock_holder(app, summaries_redis):
+    summaries_redis.set(f"{summaries.RECOMPUTE_LOCK_PREFIX}{_LB_ID}", "other-worker")
+    timer = threading.Timer(
+        0.2, summaries_redis.set, args=(f"{summaries.CACHE_KEY_PREFIX}{_LB_ID}", json.dumps(["from-holder"]))
+    )
+    timer.start()
+
+    with patch.object(summaries, "_get_query_for_ids") as query:
+        result = _single_flight(app, summaries_redis, ended=True)
+    timer.join()
+
+    query.assert_not_called()
+    assert result == {_LB_ID: ["from-holder"]}
+
+
+def test_single_flight_computes_after_waiting_for_stuck_holder(app, summaries_redis, monkeypatch):
+    monkeypatch.setattr(summaries, "RECOMPUTE_WAIT_SECONDS", 0.1)
+    summaries_redis.set(f"{summaries.RECOMPUTE_LOCK_PREFIX}{_LB_ID}", "stuck-worker")
+
+    result = _single_flight(app, summaries_redis, ended=False)
+
+    assert result[_LB_ID]
+    entry = json.loads(summaries_redis.get(f"{summaries.ACTIVE_CACHE_KEY_PREFIX}{_LB_ID}"))
+    assert entry["top_users"] == result[_LB_ID]
+    assert 0 < summaries_redis.ttl(f"{summaries.ACTIVE_CACHE_KEY_PREFIX}{_LB_ID}") <= summaries.ACTIVE_CACHE_TTL_SECONDS
+
+
+def test_should_recompute_early_expiration():
+    now = 1000.0
+    assert summaries._should_recompute({"delta": 0.5, "expires_at": now - 1}, now)
+    assert not summaries._should_recompute({"delta": 0.0, "expires_at": now + 10}, now)
+    # An unlucky draw recomputes well before expiry, scaled by compute time
+    with patch.object(summaries.random, "random", return_value=1 - 1e-6):
+        assert summaries._should_recompute({"delta": 1.0, "expires_at": now + 10}, now)
+        assert not summaries._should_recompute({"delta": 0.1, "expires_at": now + 10}, now)
+
+
+def _active_versions(app) -> dict:
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(summaries._get_leaderboards_with_versions_query())
+            rows = cur.fetchall()
+        conn.rollback()
+    return {row[0]: summaries._top_users_version(row[4]) for row in rows if not row[3]}
+
+
+def test_active_version_changes_on_new_priority_gpu_run(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE leaderboard.leaderboard SET deadline = NOW() + INTERVAL '7 days' WHERE id = %s",
+                (_LB_ID,),
+            )
+        conn.commit()
+
+    before = _active_versions(app)
+    assert before[_LB_ID] is not None
+
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT s.id, r.runner, r.score
+                FROM leaderboard.runs r
+                JOIN leaderboard.submission s ON s.id = r.submission_id
+                WHERE s.leaderboard_id = %s AND NOT r.secret AND r.passed AND r.score IS NOT NULL
+                  AND r.runner = (
+                      SELECT gpu_type FROM leaderboard.gpu_type WHERE leaderboard_id = %s
+                      ORDER BY CASE gpu_type WHEN 'B200' THEN 1 WHEN 'H100' THEN 2 WHEN 'MI300' THEN 3
+                          WHEN 'A100' THEN 4 WHEN 'L4' THEN 5 WHEN 'T4' THEN 6 ELSE 7 END, gpu_type
+                      LIMIT 1
+                  )
+                ORDER BY r.score
+                LIMIT 1
+                """,
+                (_LB_ID, _LB_ID),
+            )
+            submission_id, runner, score = cur.fetchone()
+            cur.execute(
+                """
+                INSERT INTO leaderboard.runs
+                    (submission_id, start_time, end_time, mode, secret, runner,
+                     score, passed, system_info)
+                VALUES (%s, NOW(), NOW(), 'leaderboard', FALSE, %s, %s, TRUE, '{}')
+                """,
+                (submission_id, runner, score / 2),
+            )
+        conn.commit()
+
+    assert _active_versions(app)[_LB_ID] != before[_LB_ID]
+
+
+def test_active_entry_keeps_version_and_drops_ended_entry(app, summaries_redis):
+    summaries_redis.set(f"{summaries.CACHE_KEY_PREFIX}{_LB_ID}", json.dumps(["stale"]))
+
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            result = summaries._compute_top_users_single_flight(
+                cur, summaries_redis, [_LB_ID], set(), {}, {_LB_ID: "3:v"}
+            )
+
+    entry = json.loads(summaries_redis.get(f"{summaries.ACTIVE_CACHE_KEY_PREFIX}{_LB_ID}"))
+    assert entry["version"] == "3:v"
+    assert entry["top_users"] == result[_LB_ID]
+    assert summaries_redis.get(f"{summaries.CACHE_KEY_PREFIX}{_LB_ID}") is None
+
+
+# ----------------------------
+# whole-response cache
+# ----------------------------
+
+_FAKE_LEADERBOARDS = [{"id": 1, "name": "matmul", "gpu_types": ["H100"], "top_users": None}]
+
+
+@pytest.fixture
+def response_redis(app):
+    with app.app_context():
+        conn = get_redis_connection()
+    keys = [
+        SUMMARIES_RESPONSE_KEY,
+        f"{SUMMARIES_RESPONSE_KEY}:fresh",
+        summaries.RESPONSE_REBUILD_LOCK_KEY,
+    ]
+    conn.delete(*keys)
+    yield conn
+    conn.delete(*keys)
+
+
+def test_summaries_served_from_response_cache(client, response_redis):
+    with patch.object(summaries, "_build_leaderboards_cached", return_value=_FAKE_LEADERBOARDS) as build:
+        first = client.get("/api/leaderboard-summaries")
+        second = client.get("/api/leaderboard-summaries", headers={"Accept-Encoding": "gzip"})
+
+    build.assert_called_once()
+    assert first.get_json()["data"]["leaderboards"] == _FAKE_LEADERBOARDS
+    assert "now" in first.get_json()["data"]
+
+    assert second.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in second.headers["Vary"]
+    body = json.loads(gzip.decompress(second.data))
+    assert body["code"] == 0
+    assert body["data"]["leaderboards"] == _FAKE_LEADERBOARDS
+    # Byte-different encodings must not share a strong validator.
+    assert second.headers["ETag"] == first.headers["ETag"][:-1] + '-gzip"'
+
+    for resp, headers in ((first, {}), (second, {"Accept-Encoding": "gzip"})):
+        again = client.get("/api/leaderboard-summaries", headers={**headers, "If-None-Match": resp.headers["ETag"]})
+        assert again.status_code == 304
+    mixed = client.get("/api/leaderboard-summaries", headers={"If-None-Match": second.headers["ETag"]})
+    assert mixed.status_code == 200
+
+
+
+def test_stale_response_is_served_while_rebuilding(client, response_redis):
+    with patch.object(summaries, "_build_leaderboards_cached", return_value=_FAKE_LEADERBOARDS):
+        client.get("/api/leaderboard-summaries")
+    response_cache.invalidate(response_redis, SUMMARIES_RESPONSE_KEY)
+
+    with patch.object(summaries, "_build_leaderboards_cached") as build:
+        with patch.object(summaries.threading, "Thread") as thread:
+            resp = client.get("/api/leaderboard-summaries")
+
+    build.assert_not_called()
+    thread.return_value.start.assert_called_once()
+    assert resp.get_json()["data"]["leaderboards"] == _FAKE_LEADERBOARDS
+    assert response_redis.get(summaries.RESPONSE_REBUILD_LOCK_KEY) is not None
@@ -51,3 +51,13 @@ def test_only_return_valid_content_with_mock(client):
         data = res.get_json()
         assert len(data["data"]) == 1
         assert data["data"][0]["id"] == "good-news"
+
+
+def test_news_not_modified(client):
+    res = client.get("/api/news")
+    assert res.headers["ETag"]
+    assert res.headers["Last-Modified"]
+
+    res = client.get("/api/news", headers={"If-None-Match": res.headers["ETag"]})
+    assert res.status_code == HTTPStatus.NOT_MODIFIED
+    assert res.data == b""
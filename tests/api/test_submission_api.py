@@ -1,6 +1,9 @@
 # tests/test_submission_api.py
 import datetime as dt
 import http
+import json
+import threading
+import time
 from io import BytesIO
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
@@ -9,6 +12,8 @@ import flask_login
 import pytest
 import requests
 from psycopg2.extras import execute_values
+from werkzeug.formparser import parse_form_data
+from werkzeug.test import EnvironBuilder
 
 from kernelboard.lib.db import get_db_connection
 
@@ -202,7 +207,7 @@ def test_submission_happy_path(app, client, prepare):
     submission_response.status_code = 200
     submission_response.json.return_value = {"message": "queued", "job_id": "j_1"}
 
-    with patch("kernelboard.api.submission.requests.post", return_value=submission_response) as mock_post:
+    with patch("kernelboard.lib.http_client.HttpClient.post", return_value=submission_response) as mock_post:
         resp = _post_submission(client)
 
     assert resp.status_code == http.HTTPStatus.OK
@@ -219,6 +224,53 @@ def test_submission_happy_path(app, client, prepare):
     assert called_headers["X-Web-Auth-Id"] == "111"
 
 
+def test_submission_streams_multipart_body(app, client, prepare):
+    prepare()
+    # A multi-byte character straddles the validator's 64KB read chunks.
+    source = ("x = '" + "a" * (64 * 1024 - 6) + "é'\n").encode("utf-8")
+    forwarded = {}
+
+    def _fake_post(url, headers=None, data=None, **kwargs):
+        forwarded["content_type"] = headers["Content-Type"]
+        forwarded["length"] = len(data)
+        forwarded["body"] = data.read(8192) + data.read()
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {"message": "queued"}
+        return response
+
+    with patch("kernelboard.lib.http_client.HttpClient.post", side_effect=_fake_post):
+        resp = _post_submission(
+            client, file_tuple=(BytesIO(source), "solution.py", "text/x-python")
+        )
+
+    assert resp.status_code == http.HTTPStatus.OK
+    assert forwarded["length"] == len(forwarded["body"])
+
+    environ = EnvironBuilder(
+        method="POST",
+        input_stream=BytesIO(forwarded["body"]),
+        content_type=forwarded["content_type"],
+        content_length=forwarded["length"],
+    ).get_environ()
+    _, _, files = parse_form_data(environ)
+    assert files["file"].filename == "solution.py"
+    assert files["file"].mimetype == "text/x-python"
+    assert files["file"].read() == source
+
+
+def test_submission_rejects_invalid_utf8(app, client, prepare):
+    prepare()
+    bad_file = (BytesIO(b"x = '\xff'\n"), "solution.py", "text/x-python")
+
+    with patch("kernelboard.lib.http_client.HttpClient.post") as mock_post:
+        resp = _post_submission(client, file_tuple=bad_file)
+
+    assert resp.status_code == http.HTTPStatus.UNPROCESSABLE_ENTITY
+    assert "utf-8" in resp.get_json()["message"].lower()
+    mock_post.assert_not_called()
+
+
 def test_submission_unauthorized(app, client, prepare):
     # No auth
     prepare(auth=False)
@@ -288,7 +340,7 @@ def test_submission_file_invalid_file(app, client, prepare):
 def test_submission_forward_request_exception_returns_502(app, client, prepare):
     prepare()
 
-    with patch("kernelboard.api.submission.requests.post", side_effect=requests.RequestException("boom")):
+    with patch("kernelboard.lib.http_client.HttpClient.post", side_effect=requests.RequestException("boom")):
         resp = _post_submission(client)
 
     assert resp.status_code == http.HTTPStatus.BAD_GATEWAY  # 502
@@ -304,7 +356,7 @@ def test_submission_upstream_non_200_maps_to_http_error(app, client, prepare):
     error_response.reason = "Bad Request"
     error_response.json.return_value = {"detail": "invalid format"}
 
-    with patch("kernelboard.api.submission.requests.post", return_value=error_response):
+    with patch("kernelboard.lib.http_client.HttpClient.post", return_value=error_response):
         resp = _post_submission(client)
 
     assert resp.status_code == http.HTTPStatus.BAD_REQUEST
@@ -359,3 +411,155 @@ def test_list_submissions_happy_path(client,seed_submissions, prepare):
     assert js["data"]["items"][0]["status"] == "running"
     assert js["data"]["items"][1]["submission_id"] == 102
     assert js["data"]["items"][1]["status"] == "pending"
+
+
+def _set_done(app, submission_id, done):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn, conn.cursor() as cur:
+            cur.execute("UPDATE leaderboard.submission SET done = %s WHERE id = %s", (done, submission_id))
+
+
+def _add_run(app, submission_id):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO leaderboard.runs
+                    (submission_id, start_time, end_time, mode, secret, runner,
+                     score, passed, compilation, meta, result, system_info)
+                VALUES (%s, NOW(), NOW(), 'test', FALSE, 'A100', NULL, TRUE,
+                        '{}', '{}', '{"test-count": "0"}', '{}')
+                """,
+                (submission_id,),
+            )
+
+
+def test_get_submission(app, client, prepare, seed_submissions):
+    prepare()
+    _add_run(app, 101)
+
+    r = client.get("/api/submissions/101")
+    assert r.status_code == http.HTTPStatus.OK, r.get_data(as_text=True)
+    data = r.get_json()["data"]
+    assert data["submission_id"] == 101
+    assert data["status"] == "running"
+    assert data["runs"][-1]["mode"] == "test"
+    assert all(run["report"] is not None for run in data["runs"])
+    assert all(run["result"] == {} for run in data["runs"])
+
+
+def test_get_submission_projection(app, client, prepare, seed_submissions):
+    prepare()
+    _set_done(app, 102, False)
+    r = client.get("/api/submissions/102?fields=status,submission_done")
+    assert r.get_json()["data"] == {
+        "submission_id": 102,
+        "status": "pending",
+        "submission_done": False,
+    }
+
+    r = client.get("/api/submissions/102?fields=status,bogus")
+    assert r.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_get_submission_skips_report_until_done(app, client, prepare, seed_submissions):
+    prepare()
+    _set_done(app, 102, False)
+    _add_run(app, 102)
+
+    with patch("kernelboard.api.submission.toReport") as to_report:
+        r = client.get("/api/submissions/102?report=done")
+        to_report.assert_not_called()
+    assert all(run["report"] is None for run in r.get_json()["data"]["runs"])
+
+    _set_done(app, 102, True)
+    r = client.get("/api/submissions/102?report=done")
+    assert all(run["report"] is not None for run in r.get_json()["data"]["runs"])
+
+
+def test_get_submission_of_other_user(app, client, prepare, seed_submissions):
+    prepare()
+    r = client.get("/api/submissions/1")
+    assert r.status_code == http.HTTPStatus.NOT_FOUND
+
+
+def _read_sse(resp):
+    """Parse a text/event-stream body into (event, data) tuples."""
+    events = []
+    for block in resp.get_data(as_text=True).split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":")
+        )
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_submission_events_requires_owner(app, client, prepare, seed_submissions):
+    prepare()
+    resp = client.get("/api/submissions/1/events")
+    assert resp.status_code == http.HTTPStatus.NOT_FOUND
+
+
+def test_submission_events_finished_submission(app, client, prepare, seed_submissions):
+    prepare()
+    with app.app_context():
+        conn = get_db_connection()
+        with conn, conn.cursor() as cur:
+            cur.execute("UPDATE leaderboard.submission SET done = FALSE WHERE id = 101")
+            cur.execute("UPDATE leaderboard.submission_job_status SET status = 'succeeded' WHERE submission_id = 101")
+
+    resp = client.get("/api/submissions/101/events")
+    assert resp.status_code == http.HTTPStatus.OK
+    assert resp.mimetype == "text/event-stream"
+
+    events = _read_sse(resp)
+    assert [name for name, _ in events] == ["status", "runs", "heartbeat", "done"]
+    assert events[0][1]["status"] == "succeeded"
+
+
+def test_submission_events_pushes_changes(app, client, prepare, seed_submissions):
+    prepare()
+    app.config["SUBMISSION_EVENTS_POLL_INTERVAL"] = 0.05
+    app.config["SSE_MAX_DURATION"] = 5
+    with app.app_context():
+        conn = get_db_connection()
+        with conn, conn.cursor() as cur:
+            cur.execute("UPDATE leaderboard.submission SET done = FALSE WHERE id = 101")
+
+    def finish_job():
+        time.sleep(0.2)
+        with app.app_context():
+            conn = get_db_connection()
+            with conn, conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE leaderboard.submission_job_status SET status = 'failed', error = 'boom' "
+                    "WHERE submission_id = 101"
+                )
+
+    worker = threading.Thread(target=finish_job)
+    worker.start()
+    resp = client.get("/api/submissions/101/events")
+    events = _read_sse(resp)
+    resp.close()
+    worker.join()
+
+    statuses = [data["status"] for name, data in events if name == "status"]
+    assert statuses == ["running", "failed"]
+    assert events[-1][0] == "done"
+
+    with app.app_context():
+        from kernelboard.lib.submission_events import get_submission_event_hub
+
+        assert get_submission_event_hub().subscriber_count() == 0
+
+
+def test_sse_streams_are_short_under_sync_workers(monkeypatch):
+    from kernelboard.lib import sse
+
+    monkeypatch.setenv("GUNICORN_WORKER_CLASS", "sync")
+    assert sse.default_max_duration() == sse.SSE_SYNC_MAX_DURATION
+    monkeypatch.setenv("GUNICORN_WORKER_CLASS", "gthread")
+    assert sse.default_max_duration() == sse.SSE_DEFAULT_MAX_DURATION
@@ -8,6 +8,8 @@ import psycopg2
 import pytest
 
 from kernelboard import create_app
+from kernelboard.lib import participants, personal_best, record_history
+from kernelboard.lib.db import close_db_pool
 
 
 def get_test_redis_url(port: int):
@@ -137,6 +139,15 @@ def db_server():
         if result.returncode != 0:
             pytest.exit("Error loading data.sql", returncode=1)
 
+        # Install derived tables and triggers, as the release phase does.
+        template_conn = psycopg2.connect(f"{db_url}/{db_name}")
+        try:
+            personal_best.install(template_conn)
+            record_history.install(template_conn)
+            participants.install(template_conn)
+        finally:
+            template_conn.close()
+
         # Yield the template database URL and name so that the tests can use it:
         yield {"db_url": db_url, "db_name": db_name}
 
@@ -289,6 +300,8 @@ def app(db_server: dict, redis_server: str):
 
     yield app
 
+    # Pooled connections keep the test DB open; close them before dropping it.
+    close_db_pool(app)
     _execute_sql(db_url, f"DROP DATABASE {test_db}")
 
 
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+import pytest
+
+from kernelboard.api import leaderboard as leaderboard_api
+from kernelboard.api import leaderboard_summaries
+from kernelboard.lib import cache_warmer
+from kernelboard.lib.db import get_db_connection
+from kernelboard.lib.redis_connection import get_redis_connection
+from kernelboard.lib.response_cache import SUMMARIES_RESPONSE_KEY
+
+_LB_ID = 339
+_KEY_PATTERNS = [
+    f"{leaderboard_api.DETAIL_CACHE_KEY_PREFIX}{_LB_ID}:*",
+    f"{leaderboard_api.FASTEST_TREND_CACHE_KEY_PREFIX}{_LB_ID}:*",
+    "news:*",
+    f"{SUMMARIES_RESPONSE_KEY}*",
+]
+
+
+def _delete_keys(conn):
+    for pattern in _KEY_PATTERNS:
+        keys = list(conn.scan_iter(pattern))
+        if keys:
+            conn.delete(*keys)
+
+
+@pytest.fixture
+def warm_redis(app):
+    with app.app_context():
+        conn = get_redis_connection()
+        db = get_db_connection()
+        with db.cursor() as cur:
+            cur.execute(
+                "UPDATE leaderboard.leaderboard SET deadline = NOW() + INTERVAL '7 days' WHERE id = %s",
+                (_LB_ID,),
+            )
+        db.commit()
+    _delete_keys(conn)
+    yield conn
+    _delete_keys(conn)
+
+
+def _warm(app) -> dict:
+    with patch.object(leaderboard_summaries, "_build_leaderboards_cached", return_value=[]):
+        with app.app_context():
+            return {r.target: r for r in cache_warmer.warm_all()}
+
+
+def test_warm_all_fills_caches(app, warm_redis):
+    results = _warm(app)
+
+    for target in ("summaries", f"detail:{_LB_ID}", f"fastest_trend:{_LB_ID}", "news"):
+        assert results[target].status == cache_warmer.WARMED
+        assert results[target].version
+    assert warm_redis.exists(SUMMARIES_RESPONSE_KEY)
+    assert warm_redis.exists(f"{leaderboard_api.DETAIL_CACHE_KEY_PREFIX}{_LB_ID}:{results[f'detail:{_LB_ID}'].version}")
+    assert warm_redis.exists(
+        f"{leaderboard_api.FASTEST_TREND_CACHE_KEY_PREFIX}{_LB_ID}:{results[f'fastest_trend:{_LB_ID}'].version}"
+    )
+
+    # Nothing changed, so the second pass finds every target up to date.
+    again = _warm(app)
+    assert {r.status for r in again.values()} == {cache_warmer.FRESH}
+
+
+def test_warmed_fastest_trend_is_served_from_cache(app, client, warm_redis):
+    _warm(app)
+
+    with patch.object(leaderboard_api, "_build_fastest_trend") as build:
+        resp = client.get(f"/api/leaderboard/{_LB_ID}/fastest_trend")
+
+    build.assert_not_called()
+    assert resp.status_code == 200
+    assert resp.get_json()["data"]["leaderboard_id"] == _LB_ID
+
+
+def test_warm_command_reports_each_target(app, runner, warm_redis):
+    with patch.object(leaderboard_summaries, "_build_leaderboards_cached", return_value=[]):
+        result = runner.invoke(args=["cache", "warm", "--once"])
+
+    assert result.exit_code == 0, result.output
+    assert f"detail:{_LB_ID}" in result.output
+    assert "failed=0" in result.output
@@ -1,7 +1,7 @@
-import psycopg2
-import pytest
+import threading
+import time
 
-from kernelboard.lib.db import get_db_connection
+from kernelboard.lib.db import close_db_pool, get_db_connection, get_db_pool, get_db_pool_stats
 
 
 def test_get_and_close_db_connection(app):
@@ -12,9 +12,57 @@ def test_get_and_close_db_connection(app):
         assert conn is get_db_connection()
         conn.cursor().execute("SELECT 1")
 
-    assert conn.closed
+    # The connection goes back to the pool instead of being closed.
+    assert not conn.closed
 
-    with pytest.raises(psycopg2.InterfaceError) as e:
-        conn.cursor().execute("SELECT 1")
+    with app.app_context():
+        assert get_db_connection() is conn
+        stats = get_db_pool_stats()
+        assert stats["checkouts"] == 2
+        assert stats["created"] == 1
+        assert stats["in_use"] == 1
+
+
+def test_db_connection_rolls_back_on_error(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute("CREATE TABLE leaderboard.pool_rollback_probe (id INT)")
+        app.do_teardown_appcontext(Exception("boom"))
+
+    with app.app_context():
+        with get_db_connection().cursor() as cur:
+            cur.execute("SELECT to_regclass('leaderboard.pool_rollback_probe')")
+            assert cur.fetchone()[0] is None
+
+
+def test_db_pool_is_per_app(app):
+    with app.app_context():
+        pool = get_db_pool()
+        assert get_db_pool() is pool
+        assert get_db_pool_stats()["max_size"] == app.config["DB_POOL_MAX_SIZE"]
+
+
+def test_concurrent_first_requests_share_one_pool(app, monkeypatch):
+    from kernelboard.lib import db
+
+    close_db_pool(app)
+    created = []
+    real_pool = db.ConnectionPool
+
+    def slow_pool(*args, **kwargs):
+        time.sleep(0.05)
+        created.append(real_pool(*args, **kwargs))
+        return created[-1]
+
+    monkeypatch.setattr(db, "ConnectionPool", slow_pool)
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(get_db_pool(app))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(created) == 1
+    assert all(p is created[0] for p in pools)
 
-    assert "connection already closed" in str(e.value)
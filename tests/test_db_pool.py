@@ -0,0 +1,127 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+from kernelboard.lib import db_pool
+from kernelboard.lib.db_pool import ConnectionPool, PoolTimeoutError
+
+
+@pytest.fixture
+def pool(db_server):
+    pool = ConnectionPool(db_server["db_url"], min_size=1, max_size=2, timeout=0.1)
+    yield pool
+    pool.closeall()
+
+
+def test_pool_reuses_connections(pool):
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["created"] == 1
+
+
+def test_pool_times_out_when_exhausted(pool):
+    a = pool.getconn()
+    b = pool.getconn()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+
+    stats = pool.stats()
+    assert stats["waits"] == 1
+    assert stats["timeouts"] == 1
+
+    pool.putconn(a)
+    pool.putconn(b)
+
+
+def test_pool_rolls_back_open_transaction_on_return(pool):
+    conn = pool.getconn()
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1")
+    pool.putconn(conn)
+
+    assert pool.getconn().get_transaction_status() == 0  # TRANSACTION_STATUS_IDLE
+
+
+def test_pool_recycles_expired_connections(pool):
+    conn = pool.getconn()
+    pool.max_lifetime = 0
+    pool.putconn(conn)
+
+    assert conn.closed
+    assert pool.stats()["recycled"] == 1
+
+
+def test_pool_closes_connections_it_does_not_own(pool, db_server):
+    other = ConnectionPool(db_server["db_url"], min_size=0, max_size=1)
+    conn = other.getconn()
+
+    pool.putconn(conn)
+
+    assert conn.closed
+    assert pool.stats()["foreign"] == 1
+    other.closeall()
+
+
+def test_pool_replaces_dead_connections(pool):
+    pool.health_check_interval = 0
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.close()
+
+    new_conn = pool.getconn()
+    assert new_conn is not conn
+    assert not new_conn.closed
+
+
+def test_pool_resets_after_fork(pool):
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    # Simulate running in a forked child process.
+    pool._pid = -1
+    new_conn = pool.getconn()
+
+    assert new_conn is not conn
+    assert not conn.closed  # the parent's socket is left alone
+    assert pool.stats()["checkouts"] == 1
+    conn.close()
+
+
+def test_slow_connect_does_not_block_other_checkouts(pool, monkeypatch):
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    release = threading.Event()
+    connect = psycopg2.connect
+
+    def slow_connect(dsn):
+        release.wait(5)
+        return connect(dsn)
+
+    monkeypatch.setattr(db_pool.psycopg2, "connect", slow_connect)
+    held = pool.getconn()
+    opened = []
+    opener = threading.Thread(target=lambda: opened.append(pool.getconn()))
+    opener.start()
+    time.sleep(0.05)
+
+    # The other thread is mid-handshake; returning and checking out the
+    # idle connection must not wait for it.
+    start = time.monotonic()
+    pool.putconn(held)
+    assert pool.getconn() is held
+    assert time.monotonic() - start < 0.05
+    assert pool.stats()["size"] == 2
+
+    release.set()
+    opener.join(5)
+    assert len(opened) == 1 and opened[0] is not held
+    pool.putconn(held)
+    pool.putconn(opened[0])
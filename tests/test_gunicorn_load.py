@@ -0,0 +1,151 @@
+"""
+Load test for the default gunicorn profile (gunicorn.conf.py): leaderboard
+reads must stay fast while slow submission forwards are in flight.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from kernelboard.lib.db import get_db_connection
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_USER_ID = "444"
+_UPSTREAM_DELAY = 3.0
+_IN_FLIGHT_SUBMISSIONS = 4
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _SlowClusterManager(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(_UPSTREAM_DELAY)
+        body = json.dumps({"message": "queued"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", _free_port()), _SlowClusterManager)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def gunicorn_server(app, upstream):
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "WEB_CONCURRENCY": "1",
+        "GUNICORN_THREADS": "8",
+        "FLASK_DEBUG": "1",  # plain HTTP, no forced HTTPS redirects
+        "DATABASE_URL": app.config["DATABASE_URL"],
+        "REDIS_URL": app.config["REDIS_URL"],
+        "SECRET_KEY": app.config["SECRET_KEY"],
+        "DISCORD_CLUSTER_MANAGER_API_BASE_URL": upstream,
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "kernelboard:create_app()"],
+        cwd=_REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                    break
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.1)
+        else:
+            pytest.fail("gunicorn did not start")
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+@pytest.fixture
+def session_cookie(app):
+    """Log the test user in through a server-side session shared via Redis."""
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO leaderboard.user_info (id, user_name, web_auth_id)
+                VALUES (%s, 'load-test', 'load-test-token')
+                ON CONFLICT (id) DO UPDATE SET web_auth_id = EXCLUDED.web_auth_id
+                """,
+                (_TEST_USER_ID,),
+            )
+        conn.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = f"discord:{_TEST_USER_ID}"
+        sess["_fresh"] = True
+    return client.get_cookie(app.config["SESSION_COOKIE_NAME"]).value
+
+
+def test_reads_stay_fast_while_submissions_in_flight(app, gunicorn_server, session_cookie):
+    cookies = {app.config["SESSION_COOKIE_NAME"]: session_cookie}
+
+    def submit(_):
+        return requests.post(
+            f"{gunicorn_server}/api/submission",
+            cookies=cookies,
+            data={
+                "leaderboard_id": "339",
+                "leaderboard": "conv2d",
+                "gpu_type": "H100",
+                "submission_mode": "test",
+            },
+            files={"file": ("solution.py", b'print("ok")\n', "text/x-python")},
+            timeout=30,
+        )
+
+    with ThreadPoolExecutor(max_workers=_IN_FLIGHT_SUBMISSIONS) as pool:
+        submissions = [pool.submit(submit, i) for i in range(_IN_FLIGHT_SUBMISSIONS)]
+        time.sleep(0.5)  # let every submission reach the slow upstream
+
+        latencies = []
+        for _ in range(10):
+            start = time.perf_counter()
+            resp = requests.get(f"{gunicorn_server}/api/leaderboard/339", timeout=30)
+            latencies.append(time.perf_counter() - start)
+            assert resp.status_code == 200
+
+        assert not any(s.done() for s in submissions), "submissions finished before the reads"
+        results = [s.result() for s in submissions]
+
+    assert all(r.status_code == 200 for r in results), [r.text for r in results]
+    # A sync worker would queue every read behind the in-flight submissions.
+    assert max(latencies) < _UPSTREAM_DELAY / 3, latencies
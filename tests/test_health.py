@@ -10,6 +10,7 @@ def test_health(client):
     data = response.get_json()
     assert data["data"]["service"] == "kernelboard"
     assert data["data"]["status"] == "healthy"
+    assert data["data"]["db_pool"]["checkouts"] >= 1
 
 
 def assert_unhealthy(response):
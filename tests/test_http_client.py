@@ -0,0 +1,151 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from kernelboard.lib.http_client import HttpClient, _retry_after
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    # Statuses to answer with, in order; 200 once exhausted
+    script: list[tuple[int, dict]] = []
+    peers: list[int] = []
+    hits = 0
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        cls = type(self)
+        cls.hits += 1
+        cls.peers.append(self.client_address[1])
+        status, headers = cls.script.pop(0) if cls.script else (200, {})
+        body = json.dumps({"ok": status == 200}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    _Upstream.script = []
+    _Upstream.peers = []
+    _Upstream.hits = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_reuses_connection_per_host(upstream):
+    client = HttpClient()
+    for _ in range(3):
+        assert client.get(f"{upstream}/ping", timeout=5).status_code == 200
+
+    assert len(set(_Upstream.peers)) == 1
+    host = upstream.removeprefix("http://")
+    stats = client.stats()[host]
+    assert stats["requests"] == 3
+    assert stats["errors"] == 0
+    assert stats["last_status"] == 200
+
+
+def test_retries_rate_limit_honoring_retry_after(upstream):
+    _Upstream.script = [(429, {"Retry-After": "2"})]
+    client = HttpClient(retries=2)
+
+    with patch("kernelboard.lib.http_client.time.sleep") as sleep:
+        resp = client.post(f"{upstream}/hook", json={"content": "hi"}, timeout=5)
+
+    assert resp.status_code == 200
+    sleep.assert_called_once_with(2.0)
+    assert _Upstream.hits == 2
+    assert client.stats()[upstream.removeprefix("http://")]["retries"] == 1
+
+
+def test_retry_after_beyond_the_deadline_returns_the_rate_limit(upstream):
+    _Upstream.script = [(429, {"Retry-After": "25"})]
+    client = HttpClient(retries=2, deadline=20)
+
+    with patch("kernelboard.lib.http_client.time.sleep") as sleep:
+        resp = client.post(f"{upstream}/hook", json={"content": "hi"}, timeout=5)
+
+    assert resp.status_code == 429
+    sleep.assert_not_called()
+    assert _Upstream.hits == 1
+
+
+def test_post_is_not_retried_on_server_error(upstream):
+    _Upstream.script = [(503, {})]
+    client = HttpClient(retries=2)
+
+    with patch("kernelboard.lib.http_client.time.sleep") as sleep:
+        resp = client.post(f"{upstream}/submit", data=b"x", timeout=5)
+
+    assert resp.status_code == 503
+    sleep.assert_not_called()
+    assert client.stats()[upstream.removeprefix("http://")]["errors"] == 1
+
+
+def test_get_gives_up_after_retries(upstream):
+    _Upstream.script = [(503, {})] * 5
+    client = HttpClient(retries=2)
+
+    with patch("kernelboard.lib.http_client.time.sleep"):
+        resp = client.get(f"{upstream}/flaky", timeout=5)
+
+    assert resp.status_code == 503
+    assert _Upstream.hits == 3
+
+
+def test_connection_errors_are_raised_after_retries():
+    client = HttpClient(retries=1)
+
+    with patch("kernelboard.lib.http_client.time.sleep") as sleep:
+        with pytest.raises(requests.ConnectionError):
+            client.get("http://127.0.0.1:9/unreachable", timeout=1)
+
+    assert sleep.call_count == 1
+    assert client.stats()["127.0.0.1:9"]["errors"] == 2
+
+
+def test_retry_after_parsing():
+    resp = requests.Response()
+    resp.status_code = 429
+    resp.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert _retry_after(resp) == 0.0
+
+    resp = requests.Response()
+    resp.status_code = 429
+    resp._content = b'{"retry_after": 1.5}'
+    assert _retry_after(resp) == 1.5
+
+    resp = requests.Response()
+    resp.status_code = 503
+    assert _retry_after(resp) is None
+
+
+def test_importable_without_the_flask_app():
+    code = "import sys, kernelboard.lib.http_client; sys.exit('flask' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
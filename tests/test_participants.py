@@ -0,0 +1,106 @@
+import pytest
+
+from kernelboard.lib import participants
+from kernelboard.lib.db import get_db_connection
+
+_LEADERBOARD_ID = 339
+
+
+@pytest.fixture(autouse=True)
+def clear_search_cache():
+    participants._search_cache.clear()
+    yield
+    participants._search_cache.clear()
+
+
+def _add_user(cur, user_id, user_name):
+    cur.execute("INSERT INTO leaderboard.user_info (id, user_name) VALUES (%s, %s)", (user_id, user_name))
+    cur.execute(
+        """
+        INSERT INTO leaderboard.submission
+            (leaderboard_id, file_name, user_id, code_id, submission_time, done)
+        SELECT %s, 'sub.py', %s, code_id, NOW(), TRUE
+        FROM leaderboard.submission LIMIT 1
+        RETURNING id
+        """,
+        (_LEADERBOARD_ID, user_id),
+    )
+    return cur.fetchone()[0]
+
+
+def _names(users):
+    return [u["username"] for u in users]
+
+
+def test_participants_match_submissions(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT DISTINCT u.id, u.user_name
+                FROM leaderboard.user_info u
+                JOIN leaderboard.submission s ON s.user_id = u.id
+                WHERE s.leaderboard_id = %s
+                ORDER BY u.user_name
+                """,
+                (_LEADERBOARD_ID,),
+            )
+            expected = [{"user_id": str(i), "username": n or str(i)} for i, n in cur.fetchall()]
+
+        users, hit = participants.search(conn, _LEADERBOARD_ID, "", 100)
+        assert users == expected
+        assert not hit
+
+
+def test_search_ranks_exact_and_prefix_matches_first(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            for user_id, name in [("p1", "xzorba"), ("p2", "Zorbas"), ("p3", "zorba"), ("p4", "zo_rba")]:
+                _add_user(cur, user_id, name)
+
+        users, _ = participants.search(conn, _LEADERBOARD_ID, "Zorba", 10)
+        assert _names(users) == ["zorba", "Zorbas", "xzorba"]
+
+        users, _ = participants.search(conn, _LEADERBOARD_ID, "zor", 10)
+        assert _names(users) == ["zorba", "Zorbas", "xzorba"]
+
+        # LIKE wildcards in the query are matched literally.
+        users, _ = participants.search(conn, _LEADERBOARD_ID, "o_r", 10)
+        assert _names(users) == ["zo_rba"]
+
+
+def test_participants_follow_submissions_and_renames(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            submission_id = _add_user(cur, "p5", "zed")
+            assert _names(participants.search(conn, _LEADERBOARD_ID, "zed", 10)[0]) == ["zed"]
+
+            cur.execute("UPDATE leaderboard.user_info SET user_name = 'zara' WHERE id = 'p5'")
+            assert _names(participants.search(conn, _LEADERBOARD_ID, "zar", 10)[0]) == ["zara"]
+
+            cur.execute("DELETE FROM leaderboard.submission WHERE id = %s", (submission_id,))
+            assert participants.search(conn, _LEADERBOARD_ID, "zar", 10)[0] == []
+
+
+def test_short_queries_are_cached(app):
+    with app.app_context():
+        conn = get_db_connection()
+        first, first_hit = participants.search(conn, _LEADERBOARD_ID, "a", 20)
+        second, second_hit = participants.search(conn, _LEADERBOARD_ID, "A", 20)
+        assert (first_hit, second_hit) == (False, True)
+        assert first == second
+
+        _, hit = participants.search(conn, _LEADERBOARD_ID, "abc", 20)
+        _, hit = participants.search(conn, _LEADERBOARD_ID, "abc", 20)
+        assert not hit
+
+
+def test_search_users_endpoint(client):
+    response = client.get(f"/api/leaderboard/{_LEADERBOARD_ID}/users?limit=5")
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert data["leaderboard_id"] == _LEADERBOARD_ID
+    assert 0 < len(data["users"]) <= 5
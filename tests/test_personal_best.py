@@ -0,0 +1,138 @@
+from kernelboard.lib import personal_best
+from kernelboard.lib.db import get_db_connection
+
+_LEADERBOARD_ID = 339
+
+
+def _best_row(cur):
+    cur.execute(
+        """
+        SELECT runner, user_id, submission_id, score, submission_count
+        FROM leaderboard.personal_best
+        WHERE leaderboard_id = %s
+        ORDER BY score
+        LIMIT 1
+        """,
+        (_LEADERBOARD_ID,),
+    )
+    return cur.fetchone()
+
+
+def _get_pb(cur, runner, user_id):
+    cur.execute(
+        """
+        SELECT run_id, score, submission_count
+        FROM leaderboard.personal_best
+        WHERE leaderboard_id = %s AND runner = %s AND user_id = %s
+        """,
+        (_LEADERBOARD_ID, runner, user_id),
+    )
+    return cur.fetchone()
+
+
+def test_personal_best_matches_ranking_cte(app):
+    with app.app_context():
+        conn = get_db_connection()
+        assert personal_best.check(conn, [_LEADERBOARD_ID]) == []
+
+
+def test_personal_best_follows_new_and_deleted_runs(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            runner, user_id, submission_id, score, count = _best_row(cur)
+
+            cur.execute(
+                """
+                INSERT INTO leaderboard.runs
+                    (submission_id, start_time, end_time, mode, secret, runner,
+                     score, passed, system_info)
+                VALUES (%s, NOW(), NOW(), 'leaderboard', FALSE, %s, %s, TRUE, '{}')
+                RETURNING id
+                """,
+                (submission_id, runner, score / 2),
+            )
+            run_id = cur.fetchone()[0]
+            assert _get_pb(cur, runner, user_id) == (run_id, score / 2, count)
+
+            cur.execute("DELETE FROM leaderboard.runs WHERE id = %s", (run_id,))
+            new_run_id, new_score, new_count = _get_pb(cur, runner, user_id)
+            assert new_run_id != run_id
+            assert new_score == score
+            assert new_count == count
+
+        assert personal_best.check(conn, [_LEADERBOARD_ID]) == []
+
+
+def test_personal_best_refresh_bumps_version(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            runner, _, submission_id, score, _ = _best_row(cur)
+
+            def version():
+                cur.execute(
+                    "SELECT version FROM leaderboard.personal_best_version WHERE leaderboard_id = %s AND runner = %s",
+                    (_LEADERBOARD_ID, runner),
+                )
+                return cur.fetchone()[0]
+
+            before = version()
+            cur.execute(
+                """
+                INSERT INTO leaderboard.runs
+                    (submission_id, start_time, end_time, mode, secret, runner,
+                     score, passed, system_info)
+                VALUES (%s, NOW(), NOW(), 'leaderboard', FALSE, %s, %s, TRUE, '{}')
+                """,
+                (submission_id, runner, score * 2),
+            )
+            assert version() == before + 1
+
+        personal_best.rebuild(conn, [_LEADERBOARD_ID])
+        with conn.cursor() as cur:
+            assert version() == before + 2
+
+
+def test_personal_best_follows_moved_submissions(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE leaderboard.submission SET leaderboard_id = 340 WHERE leaderboard_id = %s",
+                (_LEADERBOARD_ID,),
+            )
+            cur.execute(
+                "SELECT COUNT(*) FROM leaderboard.personal_best WHERE leaderboard_id = %s",
+                (_LEADERBOARD_ID,),
+            )
+            assert cur.fetchone()[0] == 0
+
+        assert personal_best.check(conn, [_LEADERBOARD_ID, 340]) == []
+
+
+def test_personal_best_rebuild_and_check_detect_drift(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            runner, user_id, *_ = _best_row(cur)
+            cur.execute(
+                """
+                UPDATE leaderboard.personal_best SET score = score + 1
+                WHERE leaderboard_id = %s AND runner = %s AND user_id = %s
+                """,
+                (_LEADERBOARD_ID, runner, user_id),
+            )
+
+        mismatches = personal_best.check(conn, [_LEADERBOARD_ID])
+        assert len(mismatches) == 1
+        assert mismatches[0]["user_id"] == user_id
+
+        assert personal_best.rebuild(conn, [_LEADERBOARD_ID]) > 0
+        assert personal_best.check(conn, [_LEADERBOARD_ID]) == []
+
+
+def test_personal_best_cli(runner):
+    result = runner.invoke(args=["personal-best", "check", "--leaderboard-id", str(_LEADERBOARD_ID)])
+    assert result.exit_code == 0
+    assert "consistent" in result.output
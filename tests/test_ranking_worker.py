@@ -0,0 +1,293 @@
+import importlib.util
+import os
+
+import psycopg2
+import pytest
+
+from kernelboard.lib.db import get_db_connection
+
+_LEADERBOARD_ID = 339
+_GPU = "H100"
+
+
+def _load_ranking_worker():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ranking_worker.py")
+    spec = importlib.util.spec_from_file_location("ranking_worker", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+ranking_worker = _load_ranking_worker()
+
+
+@pytest.fixture
+def conn(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE leaderboard.leaderboard SET deadline = NOW() + INTERVAL '7 days' WHERE id = %s",
+                (_LEADERBOARD_ID,),
+            )
+        conn.commit()
+        ranking_worker.ensure_snapshot_table(conn)
+        yield conn
+
+
+def _add_run(conn, user_id, score, runner=_GPU):
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO leaderboard.user_info (id, user_name) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            (user_id, user_id),
+        )
+        cur.execute(
+            """
+            INSERT INTO leaderboard.submission
+                (leaderboard_id, file_name, user_id, code_id, submission_time, done)
+            SELECT %s, 'sub.py', %s, code_id, NOW(), TRUE
+            FROM leaderboard.submission LIMIT 1
+            RETURNING id
+            """,
+            (_LEADERBOARD_ID, user_id),
+        )
+        submission_id = cur.fetchone()[0]
+        cur.execute(
+            """
+            INSERT INTO leaderboard.runs
+                (submission_id, start_time, end_time, mode, secret, runner,
+                 score, passed, system_info)
+            VALUES (%s, NOW(), NOW(), 'leaderboard', FALSE, %s, %s, TRUE, '{}')
+            RETURNING id
+            """,
+            (submission_id, runner, score),
+        )
+        run_id = cur.fetchone()[0]
+    conn.commit()
+    return run_id
+
+
+def _standings(conn, gpu=_GPU):
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT ranks, user_ids FROM leaderboard.ranking_standings WHERE leaderboard_id = %s AND gpu_type = %s",
+            (_LEADERBOARD_ID, gpu),
+        )
+        row = cur.fetchone()
+    return row and dict(zip(row[0], row[1]))
+
+
+def _partitions(changes):
+    return {(c["leaderboard_id"], c["gpu_type"]) for c in changes}
+
+
+def test_full_cycle_seeds_every_gpu_and_the_watermark(conn):
+    changes, messages = ranking_worker.poll_cycle(conn, None)
+
+    assert messages == []
+    assert all(c["previous"] is None for c in changes)
+    assert {(_LEADERBOARD_ID, gpu) for gpu in ("H100", "A100")} <= _partitions(changes)
+    assert len(_standings(conn)) == 3
+    last_run_id, max_run_id = ranking_worker.fetch_watermark(conn)
+    assert last_run_id == max_run_id
+
+    assert ranking_worker.fetch_ranking_changes(conn) == []
+
+
+def test_incremental_cycle_is_a_noop_without_new_runs(conn):
+    ranking_worker.poll_cycle(conn, None)
+
+    assert ranking_worker.poll_cycle(conn, None, incremental=True) == ([], [])
+
+
+def test_incremental_cycle_reranks_touched_partitions(conn):
+    ranking_worker.poll_cycle(conn, None)
+    before = _standings(conn)
+
+    run_id = _add_run(conn, "speedy", 1e-9)
+    changes, messages = ranking_worker.poll_cycle(conn, None, incremental=True)
+
+    assert _partitions(changes) == {(_LEADERBOARD_ID, _GPU)}
+    assert len(messages) == 1 and "<@speedy>" in messages[0]
+    assert _standings(conn) == {1: "speedy", 2: before[1], 3: before[2]}
+    assert ranking_worker.fetch_watermark(conn) == (run_id, run_id)
+
+
+def test_notified_leaderboards_are_reranked_behind_the_watermark(conn):
+    ranking_worker.poll_cycle(conn, None)
+
+    # A run that commits after a higher id has already been ranked.
+    run_id = _add_run(conn, "late", 1e-9)
+    ranking_worker.advance_watermark(conn, run_id)
+    assert ranking_worker.poll_cycle(conn, None, incremental=True) == ([], [])
+
+    changes, messages = ranking_worker.poll_cycle(conn, None, incremental=True, leaderboard_ids={_LEADERBOARD_ID})
+
+    assert _partitions(changes) == {(_LEADERBOARD_ID, _GPU)}
+    assert len(messages) == 1 and "<@late>" in messages[0]
+    assert _standings(conn)[1] == "late"
+
+
+def test_secondary_gpus_are_tracked(conn):
+    ranking_worker.poll_cycle(conn, None)
+    before = _standings(conn)
+
+    _add_run(conn, "elsewhere", 1e-9, runner="T4")
+    changes, messages = ranking_worker.poll_cycle(conn, None, incremental=True)
+
+    assert _partitions(changes) == {(_LEADERBOARD_ID, "T4")}
+    assert len(messages) == 1 and "(T4)" in messages[0]
+    assert _standings(conn, "T4")[1] == "elsewhere"
+    assert _standings(conn) == before
+
+
+def test_depth_is_configurable_per_leaderboard(conn):
+    ranking_worker.poll_cycle(conn, None)
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO leaderboard.ranking_depth VALUES (%s, 1)", (_LEADERBOARD_ID,))
+    conn.commit()
+
+    changes, messages = ranking_worker.poll_cycle(conn, None)
+
+    assert (_LEADERBOARD_ID, _GPU) in _partitions(changes)
+    assert messages == []
+    assert list(_standings(conn)) == [1]
+
+    _add_run(conn, "speedy", 1e-9)
+    _, messages = ranking_worker.poll_cycle(conn, None, incremental=True)
+    assert len(messages) == 1 and "<@speedy>" in messages[0] and "top 1" in messages[0]
+
+
+def test_update_snapshot_writes_only_changed_rows(conn):
+    changes = ranking_worker.fetch_ranking_changes(conn)
+    assert ranking_worker.update_snapshot(conn, changes) == len(changes) > 0
+    assert ranking_worker.update_snapshot(conn, changes) == 0
+    assert ranking_worker.update_snapshot(conn, []) == 0
+
+    # A partition that is no longer ranked is dropped.
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE leaderboard.leaderboard SET deadline = NOW() - INTERVAL '1 day' WHERE id = %s",
+            (_LEADERBOARD_ID,),
+        )
+    conn.commit()
+    gone = ranking_worker.fetch_ranking_changes(conn, [(_LEADERBOARD_ID, _GPU)])
+    assert [c["current"] for c in gone] == [None]
+    assert ranking_worker.update_snapshot(conn, gone) == 1
+    assert _standings(conn) is None
+
+
+def test_old_snapshot_table_is_migrated(conn):
+    ranking_worker.poll_cycle(conn, None)
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE leaderboard.ranking_snapshot (
+                leaderboard_id INTEGER, gpu_type TEXT, rank INTEGER, user_id TEXT,
+                user_name TEXT, score NUMERIC, snapshot_time TIMESTAMPTZ DEFAULT NOW()
+            );
+            INSERT INTO leaderboard.ranking_snapshot (leaderboard_id, gpu_type, rank, user_id, user_name, score)
+            SELECT leaderboard_id, gpu_type, r, u, n, s
+            FROM leaderboard.ranking_standings, unnest(ranks, user_ids, user_names, scores) AS t(r, u, n, s)
+            WHERE leaderboard_id = %s AND gpu_type = %s;
+            DELETE FROM leaderboard.ranking_standings;
+        """, (_LEADERBOARD_ID, _GPU))
+    conn.commit()
+
+    def old_table_exists():
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('leaderboard.ranking_snapshot') IS NOT NULL")
+            return cur.fetchone()[0]
+
+    # Startup never touches the old table.
+    ranking_worker.ensure_snapshot_table(conn)
+    assert _standings(conn) is None and old_table_exists()
+
+    assert ranking_worker.migrate_snapshot_table(conn) == 1
+    assert len(_standings(conn)) == 3
+    assert ranking_worker.fetch_ranking_changes(conn, [(_LEADERBOARD_ID, _GPU)]) == []
+    assert old_table_exists()
+
+    assert ranking_worker.migrate_snapshot_table(conn, drop=True) == 0
+    assert not old_table_exists()
+    assert ranking_worker.migrate_snapshot_table(conn) is None
+
+
+def test_run_inserts_notify_the_leaderboard(app, conn):
+    ranking_worker.ensure_notify_trigger(conn)
+    listener = psycopg2.connect(app.config["DATABASE_URL"])
+    listener.autocommit = True
+    try:
+        with listener.cursor() as cur:
+            cur.execute(f"LISTEN {ranking_worker.NOTIFY_CHANNEL}")
+
+        _add_run(conn, "notified", 1e-9)
+
+        assert ranking_worker.wait_for_notifications(listener, 5) == {_LEADERBOARD_ID}
+        assert ranking_worker.wait_for_notifications(listener, 0) == set()
+    finally:
+        listener.close()
+
+    with pytest.raises(psycopg2.InterfaceError):
+        ranking_worker.wait_for_notifications(listener, 0)
+
+
+def test_notifications_are_debounced_per_leaderboard():
+    pending = {}
+    ranking_worker._record_notifications(pending, {1}, 100.0)
+    ranking_worker._record_notifications(pending, {1, 2}, 101.0)
+
+    assert pending == {1: (100.0, 101.0), 2: (101.0, 101.0)}
+    assert ranking_worker._next_due(pending) == 101.0 + ranking_worker.DEBOUNCE_SECONDS
+
+    # A leaderboard that never goes quiet is still re-ranked eventually.
+    for t in range(102, 200):
+        ranking_worker._record_notifications(pending, {1}, float(t))
+    del pending[2]
+    assert ranking_worker._next_due(pending) == 100.0 + ranking_worker.DEBOUNCE_MAX_SECONDS
+    assert ranking_worker._next_due({}) is None
+
+
+def test_ranking_query_is_prepared_once_per_connection(conn):
+    ranking_worker.poll_cycle(conn, None)
+    ranking_worker.poll_cycle(conn, None)
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT name, generic_plans + custom_plans FROM pg_prepared_statements WHERE name = 'ranking_diff'")
+        assert cur.fetchall() == [("ranking_diff", 2)]
+
+
+def test_worker_connection_reconnects_after_failure(app, conn, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", app.config["DATABASE_URL"])
+    db = ranking_worker.WorkerConnection()
+    first = db.get()
+    assert db.get() is first
+    ranking_worker.fetch_watermark(first)
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_terminate_backend(%s)", (first.get_backend_pid(),))
+    with pytest.raises(psycopg2.OperationalError):
+        ranking_worker.fetch_watermark(first)
+    db.recover()
+
+    second = db.get()
+    assert second is not first
+    # Prepared statements belong to the old session and are prepared again.
+    assert ranking_worker.fetch_watermark(second)[1] is not None
+    db.close()
+
+
+def test_statement_timings_histogram():
+    timings = ranking_worker.StatementTimings(buckets_ms=(1, 10, 100))
+    for elapsed_ms in (0.5, 0.7, 5, 50, 500):
+        timings.observe("q", elapsed_ms)
+
+    stat = timings.stats["q"]
+    assert stat["buckets"] == [2, 1, 1, 1]
+    assert stat["count"] == 5 and stat["max_ms"] == 500
+    assert timings.percentile("q", 0.4) == 1
+    assert timings.percentile("q", 0.5) == 10
+    assert timings.percentile("q", 0.99) == float("inf")
+
+    with timings.time("timed"):
+        pass
+    assert timings.stats["timed"]["count"] == 1
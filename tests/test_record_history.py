@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from kernelboard.lib import record_history
+from kernelboard.lib.db import get_db_connection
+
+_LEADERBOARD_ID = 339
+
+
+def _records(cur, runner):
+    cur.execute(
+        """
+        SELECT run_id, score
+        FROM leaderboard.record_history
+        WHERE leaderboard_id = %s AND runner = %s
+        ORDER BY submission_time, run_id
+        """,
+        (_LEADERBOARD_ID, runner),
+    )
+    return cur.fetchall()
+
+
+def _latest_record(cur):
+    cur.execute(
+        """
+        SELECT h.runner, h.submission_id, h.score, s.submission_time
+        FROM leaderboard.record_history h
+        JOIN leaderboard.submission s ON s.id = h.submission_id
+        WHERE h.leaderboard_id = %s
+        ORDER BY h.submission_time DESC
+        LIMIT 1
+        """,
+        (_LEADERBOARD_ID,),
+    )
+    return cur.fetchone()
+
+
+def _insert_submission(cur, submission_time):
+    cur.execute(
+        """
+        INSERT INTO leaderboard.submission
+            (leaderboard_id, file_name, user_id, code_id, submission_time, done)
+        SELECT leaderboard_id, file_name, user_id, code_id, %s, TRUE
+        FROM leaderboard.submission WHERE leaderboard_id = %s LIMIT 1
+        RETURNING id
+        """,
+        (submission_time, _LEADERBOARD_ID),
+    )
+    return cur.fetchone()[0]
+
+
+def _insert_run(cur, submission_id, runner, score):
+    cur.execute(
+        """
+        INSERT INTO leaderboard.runs
+            (submission_id, start_time, end_time, mode, secret, runner,
+             score, passed, system_info)
+        VALUES (%s, NOW(), NOW(), 'leaderboard', FALSE, %s, %s, TRUE, '{}')
+        RETURNING id
+        """,
+        (submission_id, runner, score),
+    )
+    return cur.fetchone()[0]
+
+
+def test_record_history_matches_runs(app):
+    with app.app_context():
+        conn = get_db_connection()
+        assert record_history.check(conn, [_LEADERBOARD_ID]) == []
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT COUNT(*) FROM leaderboard.record_history WHERE leaderboard_id = %s",
+                (_LEADERBOARD_ID,),
+            )
+            assert cur.fetchone()[0] > 0
+
+
+def test_new_best_is_appended(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            runner, submission_id, score, _ = _latest_record(cur)
+            before = _records(cur, runner)
+
+            slower = _insert_run(cur, submission_id, runner, score * 2)
+            assert _records(cur, runner) == before
+
+            faster = _insert_run(cur, submission_id, runner, score / 2)
+            assert _records(cur, runner) == before + [(faster, score / 2)]
+
+            cur.execute("DELETE FROM leaderboard.runs WHERE id IN (%s, %s)", (slower, faster))
+            assert _records(cur, runner) == before
+
+        assert record_history.check(conn, [_LEADERBOARD_ID]) == []
+
+
+def test_out_of_order_run_replaces_later_records(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            runner, _, score, submission_time = _latest_record(cur)
+            before = _records(cur, runner)
+
+            # Finishes after the latest record but was submitted before it,
+            # and is faster: the latest record no longer counts.
+            submission_id = _insert_submission(cur, submission_time - timedelta(seconds=1))
+            run_id = _insert_run(cur, submission_id, runner, score / 2)
+
+            records = _records(cur, runner)
+            assert (run_id, score / 2) in records
+            assert before[-1] not in records
+
+        assert record_history.check(conn, [_LEADERBOARD_ID]) == []
+
+
+def test_backfill_rebuilds_from_runs(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM leaderboard.record_history WHERE leaderboard_id = %s", (_LEADERBOARD_ID,))
+        conn.commit()
+        assert record_history.check(conn, [_LEADERBOARD_ID]) != []
+
+        assert record_history.backfill(conn, [_LEADERBOARD_ID]) > 0
+        assert record_history.check(conn, [_LEADERBOARD_ID]) == []
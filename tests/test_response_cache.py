@@ -0,0 +1,55 @@
+import gzip
+import os
+import zlib
+
+import pytest
+
+from kernelboard.lib import response_cache
+from kernelboard.lib.redis_connection import get_redis_connection
+from kernelboard.lib.response_cache import CachedResponse
+
+_KEY = "test:response_cache"
+
+
+@pytest.fixture
+def redis_conn(app):
+    with app.app_context():
+        conn = get_redis_connection()
+    conn.delete(_KEY, f"{_KEY}:fresh")
+    yield conn
+    conn.delete(_KEY, f"{_KEY}:fresh")
+
+
+@pytest.mark.parametrize(
+    "prefix",
+    [b'{"code":0,"data":{"items":', b"", os.urandom(200_000), b'{"a":"' + b"x" * 100_000],
+)
+def test_spliced_gzip_round_trip(prefix):
+    entry = CachedResponse.from_prefix(prefix, etag="abc")
+    suffix = b'"Fri, 17 Oct 2026 02:05:23 GMT"}}\n'
+
+    # One gzip member with a valid trailer, as browsers expect
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert inflater.decompress(entry.gzip(suffix)) == prefix + suffix
+    assert inflater.eof and not inflater.unused_data
+    assert entry.body(suffix) == prefix + suffix
+
+    restored = CachedResponse.unpack(entry.pack())
+    assert restored.etag == "abc"
+    assert gzip.decompress(restored.gzip(b"later")) == prefix + b"later"
+
+
+def test_store_load_and_invalidate(redis_conn):
+    entry = CachedResponse.from_prefix(b'{"leaderboards":[]', etag="v1")
+
+    assert response_cache.load(redis_conn, _KEY) == (None, False)
+
+    response_cache.store(redis_conn, _KEY, entry, soft_ttl=60, hard_ttl=600)
+    loaded, fresh = response_cache.load(redis_conn, _KEY)
+    assert fresh
+    assert loaded.etag == "v1"
+    assert loaded.body(b"}") == b'{"leaderboards":[]}'
+
+    response_cache.invalidate(redis_conn, _KEY)
+    loaded, fresh = response_cache.load(redis_conn, _KEY)
+    assert loaded is not None and not fresh
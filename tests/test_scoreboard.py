@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from kernelboard.lib.db import get_db_connection
+from kernelboard.lib.redis_connection import get_redis_connection
+from kernelboard.lib.scoreboard import (
+    CHANNEL_PREFIX,
+    LOCK_KEY,
+    STATE_KEY_PREFIX,
+    VIEWERS_KEY,
+    ScoreboardHub,
+    ScoreboardWatcher,
+    diff_rankings,
+    get_scoreboard_hub,
+)
+
+_LEADERBOARD_ID = 339
+
+
+@pytest.fixture
+def redis_conn(app):
+    with app.app_context():
+        conn = get_redis_connection()
+    keys = [LOCK_KEY, VIEWERS_KEY, f"{STATE_KEY_PREFIX}{_LEADERBOARD_ID}"]
+    conn.delete(*keys)
+    yield conn
+    conn.delete(*keys)
+
+
+@pytest.fixture
+def active_leaderboard(app):
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE leaderboard.leaderboard SET deadline = NOW() + INTERVAL '7 days' WHERE id = %s",
+                (_LEADERBOARD_ID,),
+            )
+        conn.commit()
+
+
+def _next_message(pubsub):
+    for _ in range(50):
+        message = pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
+        if message is not None:
+            return json.loads(message["data"])
+    raise AssertionError("no message published")
+
+
+def test_diff_rankings():
+    a = {"user_id": "1", "score": 1.0, "rank": 1}
+    b = {"user_id": "2", "score": 2.0, "rank": 2}
+    c = {"user_id": "3", "score": 0.5, "rank": 1}
+
+    assert diff_rankings(None, [a]) == {"reset": True, "upserts": [a], "removed": []}
+    assert diff_rankings([a, b], [a, b]) == {"reset": False, "upserts": [], "removed": []}
+
+    diff = diff_rankings([a, b], [c, {**a, "rank": 2}])
+    assert diff["upserts"] == [c, {**a, "rank": 2}]
+    assert diff["removed"] == ["2"]
+
+
+def test_watcher_publishes_diffs(app, redis_conn, active_leaderboard):
+    redis_conn.set(VIEWERS_KEY, 1)
+    pubsub = redis_conn.pubsub()
+    pubsub.subscribe(f"{CHANNEL_PREFIX}{_LEADERBOARD_ID}")
+
+    watcher = ScoreboardWatcher(app, redis_conn)
+    published = watcher.tick()
+    assert published > 0
+    messages = [_next_message(pubsub) for _ in range(published)]
+    assert all(m["reset"] for m in messages)
+
+    first = messages[0]
+    gpu_type = first["gpu_type"]
+    leader = first["upserts"][0]
+
+    state = json.loads(redis_conn.hget(f"{STATE_KEY_PREFIX}{_LEADERBOARD_ID}", gpu_type))
+    assert state["ranking"][0] == leader
+
+    # Nothing changed: nothing is published.
+    assert watcher.tick() == 0
+
+    with app.app_context():
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO leaderboard.runs
+                    (submission_id, start_time, end_time, mode, secret, runner,
+                     score, passed, system_info)
+                VALUES (%s, NOW(), NOW(), 'leaderboard', FALSE, %s, %s, TRUE, '{}')
+                """,
+                (leader["submission_id"], gpu_type, leader["score"] / 2),
+            )
+        conn.commit()
+
+    assert watcher.tick() == 1
+    diff = _next_message(pubsub)
+    assert diff == {
+        "leaderboard_id": _LEADERBOARD_ID,
+        "gpu_type": gpu_type,
+        "total": first["total"],
+        "reset": False,
+        "upserts": [{**leader, "score": leader["score"] / 2}],
+        "removed": [],
+    }
+    pubsub.close()
+
+
+def test_watcher_idle_without_viewers_or_leadership(app, redis_conn, active_leaderboard):
+    watcher = ScoreboardWatcher(app, redis_conn)
+    assert watcher.tick() == 0
+
+    redis_conn.set(VIEWERS_KEY, 1)
+    redis_conn.set(LOCK_KEY, "another-process")
+    assert watcher.tick() == 0
+
+
+def test_live_scoreboard_stream(app, client, redis_conn):
+    app.config["SSE_MAX_DURATION"] = 0.2
+    state = {"leaderboard_id": _LEADERBOARD_ID, "gpu_type": "H100", "ranking": []}
+    redis_conn.hset(f"{STATE_KEY_PREFIX}{_LEADERBOARD_ID}", "H100", json.dumps(state))
+
+    resp = client.get(f"/api/leaderboard/live?ids={_LEADERBOARD_ID}")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    body = resp.get_data(as_text=True)
+    resp.close()
+
+    assert f"event: snapshot\ndata: {json.dumps(state)}\n\n" in body
+
+    assert client.get("/api/leaderboard/live?ids=").status_code == 400
+
+
+def test_live_scoreboard_unsubscribes_when_the_snapshot_fails(app, client, redis_conn, monkeypatch):
+    def fail(self, leaderboard_ids):
+        raise RuntimeError("redis down")
+
+    monkeypatch.setattr(ScoreboardHub, "get_states", fail)
+    with pytest.raises(RuntimeError):
+        client.get(f"/api/leaderboard/live?ids={_LEADERBOARD_ID}")
+
+    with app.app_context():
+        assert get_scoreboard_hub().subscriber_count() == 0